@@ -4,26 +4,67 @@ Copyright (C) 2013  Infobyte LLC (http://www.infobytesec.com/)
 See the file 'doc/LICENSE' for the license information
 
 """
+import re
+import zlib
 import socket
+import tempfile
 import threading
 import logging
 import base64
+from concurrent.futures import ThreadPoolExecutor
 
 from flask import Flask, request, jsonify
 from tornado.wsgi import WSGIContainer  # pylint: disable=import-error
 from tornado.httpserver import HTTPServer  # pylint: disable=import-error
 from tornado.ioloop import IOLoop  # pylint: disable=import-error
 from tornado import gen # pylint: disable=import-error
+from tornado.web import (  # pylint: disable=import-error
+    Application,
+    FallbackHandler,
+    RequestHandler,
+    stream_request_body
+)
 
 from faraday_client.config.configuration import getInstanceConfiguration
 from faraday_client.model.visitor import VulnsLookupVisitor
 
 CONF = getInstanceConfiguration()
 
+# Threads handling the requests, out of the IOLoop, and threads handling
+# the heavy requests (i.e. command outputs) apart, so the quick ones never
+# wait behind them
+REST_API_WORKERS = 8
+REST_API_HEAVY_REQUESTS = 2
+# Max size in bytes of a request body
+REST_API_MAX_BODY_SIZE = 256 * 1024 * 1024
+# Max size in bytes of a decompressed command output sent to
+# /cmd/output/stream, and size kept in memory before it's spooled to disk
+REST_API_MAX_OUTPUT_SIZE = 1024 * 1024 * 1024
+REST_API_OUTPUT_SPOOL_SIZE = 1024 * 1024
+# Max size in bytes decompressed at once from a gzipped output
+REST_API_DECOMPRESS_BLOCK_SIZE = 64 * 1024
 
 _plugin_controller_api = None
 _http_server = None
+_executor = None
+_heavy_executor = None
 ioloop_instance = None
+
+
+def _create_app(rest_controllers):
+    app = Flask('APISController')
+    app.config['MAX_CONTENT_LENGTH'] = REST_API_MAX_BODY_SIZE
+    routes = [r for c in rest_controllers for r in c.getRoutes()]
+
+    for route in routes:
+        app.add_url_rule(route.path, view_func=route.view_func, methods=route.methods)
+    return app
+
+
+def _heavy_paths(rest_controllers):
+    return [r.path for c in rest_controllers for r in c.getRoutes()
+            if getattr(r, 'heavy', False)]
+
 def startServer():
     global _http_server
     global ioloop_instance
@@ -40,19 +81,131 @@ def stopServer():
             _http_server.stop()
             await gen.sleep(1)
             ioloop_instance.stop()
+            _executor.shutdown(wait=False)
+            _heavy_executor.shutdown(wait=False)
         ioloop_instance.add_callback_from_signal(shutdown)
 
 
+@stream_request_body
+class CommandOutputStreamHandler(RequestHandler):
+    """Receives the output of a command as the raw, optionally gzipped,
+    request body: POST /cmd/output/stream?pid=<pid>&exit_code=<code>
+
+    The body is decompressed while it arrives and spooled to disk, so the
+    memory used doesn't depend on the size of the output. Unlike
+    /cmd/output, it's not base64 encoded inside a JSON document.
+    """
+
+    def initialize(self, plugin_controller, executor):
+        self.plugin_controller = plugin_controller
+        self.executor = executor
+        self.output = None
+        self.output_size = 0
+        self.decompressor = None
+        # (status code, message) if the body was rejected
+        self.error = None
+
+    def prepare(self):
+        self.request.connection.set_max_body_size(REST_API_MAX_BODY_SIZE)
+        if self.request.headers.get('Content-Encoding', '').lower() == 'gzip':
+            self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.output = tempfile.SpooledTemporaryFile(max_size=REST_API_OUTPUT_SPOOL_SIZE)
+
+    def data_received(self, chunk):
+        if self.error is not None:
+            return
+        if self.decompressor is None:
+            self.write_output(chunk)
+            return
+        try:
+            # a small body may decompress to a huge output, it's done in
+            # blocks so it's never kept whole in memory
+            while chunk and self.error is None:
+                block = self.decompressor.decompress(chunk, REST_API_DECOMPRESS_BLOCK_SIZE)
+                chunk = self.decompressor.unconsumed_tail
+                self.write_output(block)
+        except zlib.error as ex:
+            self.error = 400, 'invalid gzip body: {0}'.format(ex)
+
+    def write_output(self, data):
+        self.output_size += len(data)
+        if self.output_size > REST_API_MAX_OUTPUT_SIZE:
+            self.error = 413, 'command output too big'
+            return
+        self.output.write(data)
+
+    async def post(self):
+        if self.error is None and self.decompressor is not None:
+            self.write_output(self.decompressor.flush())
+        if self.error is not None:
+            self.send_json_error(*self.error)
+            return
+        try:
+            pid = int(self.get_query_argument('pid'))
+            exit_code = int(self.get_query_argument('exit_code'))
+        except ValueError:
+            self.send_json_error(400, 'invalid pid or exit_code parameter')
+            return
+        self.output.seek(0)
+        output, self.output = self.output, None
+        finished = await IOLoop.current().run_in_executor(
+            self.executor, self.plugin_controller.onCommandFinished, pid, exit_code, output)
+        if finished:
+            self.write({'code': 200, 'message': 'output successfully sent to plugin'})
+        else:
+            output.close()
+            self.write({'error': 400, 'message': 'output received but no active plugin'})
+
+    def send_json_error(self, status_code, message):
+        self.set_status(status_code)
+        self.write({'error': status_code, 'message': message})
+
+    def on_finish(self):
+        if self.output is not None:
+            self.output.close()
+
+    on_connection_close = on_finish
+
+
+def _create_tornado_app(wsgi_app, plugin_controller, executor,
+                        heavy_executor=None, heavy_paths=()):
+    """Return the tornado Application serving the streaming endpoints and,
+    through the executor, every route of wsgi_app. The streamed outputs and
+    the heavy_paths routes are processed by the heavy_executor, the requests
+    waiting for its threads are queued in it without taking the executor's."""
+    handlers = [
+        (r'/cmd/output/stream', CommandOutputStreamHandler,
+         {'plugin_controller': plugin_controller, 'executor': heavy_executor or executor}),
+    ]
+    if heavy_executor is not None:
+        heavy_container = WSGIContainer(wsgi_app, executor=heavy_executor)
+        handlers += [(re.escape(path), FallbackHandler, {'fallback': heavy_container})
+                     for path in heavy_paths]
+    handlers.append((r'.*', FallbackHandler,
+                     {'fallback': WSGIContainer(wsgi_app, executor=executor)}))
+    return Application(handlers)
+
+
 def startAPIs(plugin_controller, model_controller, hostname, port):
     global _rest_controllers
     global _http_server
     global ioloop_instance
+    global _executor
+    global _heavy_executor
     _rest_controllers = [PluginControllerAPI(plugin_controller), ModelControllerAPI(model_controller)]
 
-    app = Flask('APISController')
+    app = _create_app(_rest_controllers)
 
+    # the requests are handled by the executor threads, a slow one
+    # doesn't block the IOLoop and the other terminals
+    _executor = ThreadPoolExecutor(max_workers=REST_API_WORKERS,
+                                   thread_name_prefix='restapi-worker')
+    _heavy_executor = ThreadPoolExecutor(max_workers=REST_API_HEAVY_REQUESTS,
+                                         thread_name_prefix='restapi-heavy-worker')
     ioloop_instance = IOLoop.current()
-    _http_server = HTTPServer(WSGIContainer(app))
+    _http_server = HTTPServer(_create_tornado_app(app, plugin_controller, _executor,
+                                                  _heavy_executor, _heavy_paths(_rest_controllers)),
+                              max_body_size=REST_API_MAX_BODY_SIZE)
     hostnames = [hostname]
 
     #Fixed hostname bug
@@ -75,11 +228,6 @@ def startAPIs(plugin_controller, model_controller, hostname, port):
     if not listening:
         raise RuntimeError("Port already in use")
 
-    routes = [r for c in _rest_controllers for r in c.getRoutes()]
-
-    for route in routes:
-        app.add_url_rule(route.path, view_func=route.view_func, methods=route.methods)
-
     logging.getLogger("tornado.access").addHandler(logging.getLogger(__name__))
     logging.getLogger("tornado.access").propagate = False
     threading.Thread(target=startServer, name='restapi-server').start()
@@ -297,7 +445,8 @@ class PluginControllerAPI(RESTApi):
                             methods=['POST']))
         routes.append(Route(path='/cmd/output',
                             view_func=self.postCmdOutput,
-                            methods=['POST']))
+                            methods=['POST'],
+                            heavy=True))
         routes.append(Route(path='/cmd/active-plugins',
                             view_func=self.clearActivePlugins,
                             methods=['DELETE']))
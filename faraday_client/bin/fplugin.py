@@ -7,6 +7,7 @@ from builtins import input
 
 import os
 import sys
+import hmac
 from importlib.machinery import SourceFileLoader
 import shlex
 import atexit
@@ -37,31 +38,80 @@ class RawDescriptionAndDefaultsHelpFormatter(argparse.RawDescriptionHelpFormatte
 
 # Call signature corresponding to a function defined as:
 # def main(workspace='', args=[], parser = None):
-CURRENT_MAIN_ARGSPEC = inspect.ArgSpec(args=['workspace', 'args', 'parser'], varargs=None, keywords=None,
-                                       defaults=('', None, None))
+CURRENT_MAIN_ARGSPEC = inspect.FullArgSpec(args=['workspace', 'args', 'parser'], varargs=None, varkw=None,
+                                           defaults=('', None, None), kwonlyargs=[], kwonlydefaults=None,
+                                           annotations={})
 
 FPLUGIN_INTERACTIVE_LAST_TOKEN = '$last'
 
 
+# Kept between dispatches, so the interactive mode and the fplugin daemon
+# (see faraday_client.plugins.fplugin_daemon) don't log in, build the
+# ModelController or import the script again for every command
+_session_cookies = {}
+# the sessions are kept by a keyed hash of the password, not the password
+_session_key = os.urandom(32)
+_model_controller = None
+_scripts = {}
+
+
 def signal_handler(signal, frame):
     print('Bye Bye!')
     os._exit(0)
 
 
-def dispatch(args, unknown, user_help, username, password):
-    if username and password:
-        session_cookie = login_user(args.url, username, password)
+def load_plugins():
+    """Load the available scripts, only the first time."""
+    global plugins
+    if plugins is None:
+        plugins = fplugin_utils.get_available_plugins()
+    return plugins
+
+
+def login(url, username, password):
+    """Log in the server, reusing the session of a previous login with
+    the same credentials."""
+    key = (url, username, hmac.new(_session_key, password.encode(), 'sha256').hexdigest())
+    session_cookie = _session_cookies.get(key)
+    if not session_cookie:
+        session_cookie = login_user(url, username, password)
         if not session_cookie:
             raise UserWarning('Invalid credentials!')
-        CONF.setFaradaySessionCookies(session_cookie)
+        _session_cookies[key] = session_cookie
+    CONF.setFaradaySessionCookies(session_cookie)
+
+
+def get_model_controller():
+    # We need the ModelController to register all available models
+    global _model_controller
+    if _model_controller is None:
+        _model_controller = ModelController(MapperManager(), Queue())
+    return _model_controller
+
+
+def load_script(command):
+    """Import the script of command, again only if its file changed."""
+    import faraday_client as client # pylint:disable=import-outside-toplevel
+    faraday_directory = os.path.dirname(os.path.realpath(os.path.join(client.__file__)))
+
+    plugin_path = os.path.join(faraday_directory, "bin/", command + '.py')
+    mtime = os.stat(plugin_path).st_mtime
+    cached = _scripts.get(plugin_path)
+    if cached is None or cached[0] != mtime:
+        # Get filename and import this
+        loader = SourceFileLoader('module_fplugin_%s' % command, plugin_path)
+        cached = _scripts[plugin_path] = (mtime, loader.load_module())
+    return cached[1]
+
+
+def dispatch(args, unknown, user_help, username, password):
+    if username and password:
+        login(args.url, username, password)
 
     if '--' in unknown:
         unknown.remove('--')
 
-    # We need the ModelController to register all available models
-    mappers_manager = MapperManager()
-    pending_actions = Queue()
-    model_controller = ModelController(mappers_manager, pending_actions)
+    get_model_controller()
 
     if not args.command:
         print(user_help)
@@ -77,13 +127,7 @@ def dispatch(args, unknown, user_help, username, password):
         else:
             sys.exit(1)
 
-    import faraday_client as client # pylint:disable=import-outside-toplevel
-    faraday_directory = os.path.dirname(os.path.realpath(os.path.join(client.__file__)))
-
-    plugin_path = os.path.join(faraday_directory, "bin/", args.command + '.py')
-    # Get filename and import this
-    loader = SourceFileLoader('module_fplugin', plugin_path)
-    module_fplugin = loader.load_module()
+    module_fplugin = load_script(args.command)
     module_fplugin.models.server.FARADAY_UP = False
     module_fplugin.models.server.SERVER_URL = args.url
     module_fplugin.models.server.AUTH_USER = username
@@ -138,11 +182,7 @@ def dispatch(args, unknown, user_help, username, password):
         sys.exit(ret)
 
 
-def main():
-    global plugins
-
-    signal.signal(signal.SIGINT, signal_handler)
-
+def build_parser():
     description = ('Using our plugin you can do different actions in the command line\n'
                    'and interact with Faraday. Faraday comes with some presets for bulk\n'
                    'actions such as object removal, get object information, etc.\n'
@@ -151,10 +191,10 @@ def main():
 
     epilog = 'Available scripts:\n'
 
-    plugins = fplugin_utils.get_available_plugins()
+    available_plugins = load_plugins()
 
-    for plugin in sorted(plugins.keys()):
-        epilog += '\t- %s: %s\n' % (plugin, plugins[plugin]['description'])
+    for plugin in sorted(available_plugins.keys()):
+        epilog += '\t- %s: %s\n' % (plugin, available_plugins[plugin]['description'])
 
     parser = argparse.ArgumentParser(description=description,
                                      epilog=epilog,
@@ -190,8 +230,15 @@ def main():
                         dest="cert_path",
                         default=None,
                         help="Path to the valid Faraday server certificate")
+    return parser
+
+
+def main(argv=None):
+    signal.signal(signal.SIGINT, signal_handler)
+
+    parser = build_parser()
     # Only parse known args. Unknown ones will be passed on the the called script
-    args, unknown = parser.parse_known_args()
+    args, unknown = parser.parse_known_args(argv)
     if args.cert_path:
         os.environ[REQUESTS_CA_BUNDLE_VAR] = args.cert_path
     if not args.interactive:
@@ -153,40 +153,41 @@ def main(workspace='', args=None, parser=None):
     added = 0
     deleted = 0
     changed = 0
-    hosts = models.get_hosts(workspace)
-    for host in hosts:
-        #import ipdb;ipdb.set_trace()
-        if not ip_list or host.getName() in ip_list:
-            if parsed_args.a:
-                for port in port_list:
-                    create_service(models, workspace, host, port=port, protocol=protocol if protocol else 'tcp')
-                    added += 1
-            else:
-                for service in host.getServices():
-                    if (not search or search.lower() in service.getName().lower() or search.lower() in service.getVersion().lower())\
-                    and (not protocol or service.protocol == protocol)\
-                    and (not parsed_args.up or service.status == 'open'):
-                        for port in service.getPorts():
-                            if not port_list or port in port_list:
-                                if parsed_args.d:
-                                    delete_service(workspace, service)
-                                    deleted += 1
-                                elif parsed_args.e:
-                                    change_service(workspace, service, dict(parsed_args.e))
-                                    changed += 1
-                                elif parsed_args.dump:
-                                    dump(service)
-                                else:
-                                    column_data = []
-
-                                    for column in columns:
-                                        column_data += [COLUMNS[column](service, workspace)]
-
-                                    lines += [column_data]
-
-                                    if parsed_args.R and not host.getName() in hosts_to_export:
-                                        tmp.write("{host}\n".format(host=host.getName()))
-                                        hosts_to_export.add(host.getName())
+    with models.prefetch(workspace):
+        hosts = models.get_hosts(workspace)
+        for host in hosts:
+            #import ipdb;ipdb.set_trace()
+            if not ip_list or host.getName() in ip_list:
+                if parsed_args.a:
+                    for port in port_list:
+                        create_service(models, workspace, host, port=port, protocol=protocol if protocol else 'tcp')
+                        added += 1
+                else:
+                    for service in host.getServices():
+                        if (not search or search.lower() in service.getName().lower() or search.lower() in service.getVersion().lower())\
+                        and (not protocol or service.protocol == protocol)\
+                        and (not parsed_args.up or service.status == 'open'):
+                            for port in service.getPorts():
+                                if not port_list or port in port_list:
+                                    if parsed_args.d:
+                                        delete_service(workspace, service)
+                                        deleted += 1
+                                    elif parsed_args.e:
+                                        change_service(workspace, service, dict(parsed_args.e))
+                                        changed += 1
+                                    elif parsed_args.dump:
+                                        dump(service)
+                                    else:
+                                        column_data = []
+
+                                        for column in columns:
+                                            column_data += [COLUMNS[column](service, workspace)]
+
+                                        lines += [column_data]
+
+                                        if parsed_args.R and not host.getName() in hosts_to_export:
+                                            tmp.write("{host}\n".format(host=host.getName()))
+                                            hosts_to_export.add(host.getName())
     if added:
         print("added %d services"%added)
     elif deleted:
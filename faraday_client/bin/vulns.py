@@ -209,37 +209,38 @@ def main(workspace='', args=None, parser=None):
 	added = 0
 	deleted = 0
 	changed = 0
-	hosts = models.get_hosts(workspace)
-	for host in hosts:
-		#import ipdb; ipdb.set_trace()
-		if not ip_list or host.getName() in ip_list:
-			for service in host.getServices():
-				if not port_list or set(port_list) & set(service.getPorts()):
-					if parsed_args.a:
-						create_vuln(models, workspace, service, dict([x.split('=') for x in parsed_args.a]))
-						added += 1
-					else:
-						for vuln in service.getVulns():
-							if vuln.severity in parsed_args.severity:
-								if (not search or vuln.getDescription().lower().find(search.lower()) != -1 or vuln.getName().lower().find(search.lower()) != -1):
-									if parsed_args.d:
-										delete_vuln(workspace, vuln)
-										deleted += 1
-									elif parsed_args.e:
-										change_vuln(workspace, vuln, dict(parsed_args.e))
-										changed += 1
-									elif parsed_args.dump:
-										dump(vuln)
-									else:
-										column_data = []
-
-										for column in columns:
-											column_data += [COLUMNS[column](search, vuln, service, workspace)]
-
-										lines += [column_data]
-										if parsed_args.R and not host.getName() in hosts_to_export:
-											tmp.write("{host}\n".format(host=host.getName()))
-											hosts_to_export.add(host.getName())
+	with models.prefetch(workspace):
+		hosts = models.get_hosts(workspace)
+		for host in hosts:
+			#import ipdb; ipdb.set_trace()
+			if not ip_list or host.getName() in ip_list:
+				for service in host.getServices():
+					if not port_list or set(port_list) & set(service.getPorts()):
+						if parsed_args.a:
+							create_vuln(models, workspace, service, dict([x.split('=') for x in parsed_args.a]))
+							added += 1
+						else:
+							for vuln in service.getVulns():
+								if vuln.severity in parsed_args.severity:
+									if (not search or vuln.getDescription().lower().find(search.lower()) != -1 or vuln.getName().lower().find(search.lower()) != -1):
+										if parsed_args.d:
+											delete_vuln(workspace, vuln)
+											deleted += 1
+										elif parsed_args.e:
+											change_vuln(workspace, vuln, dict(parsed_args.e))
+											changed += 1
+										elif parsed_args.dump:
+											dump(vuln)
+										else:
+											column_data = []
+
+											for column in columns:
+												column_data += [COLUMNS[column](search, vuln, service, workspace)]
+
+											lines += [column_data]
+											if parsed_args.R and not host.getName() in hosts_to_export:
+												tmp.write("{host}\n".format(host=host.getName()))
+												hosts_to_export.add(host.getName())
 	if added:
 		print("added %d vulnerabilities"%added)
 	elif deleted:
@@ -7,6 +7,11 @@ See the file 'doc/LICENSE' for the license information
 from faraday_client import __version__ as client_version
 import os
 import json
+import atexit
+import logging
+import weakref
+import tempfile
+import threading
 
 from faraday_client.config.constant import CONST_FARADAY_HOME_PATH
 
@@ -19,6 +24,11 @@ except ImportError:
 
 
 the_config = None
+logger = logging.getLogger(__name__)
+
+# Seconds saveConfig waits for more changes before writing the file, so the
+# saves made in that window are written once
+CONFIG_SAVE_DELAY = 0.5
 
 CONST_API_CON_INFO = "api_con_info"
 CONST_API_CON_INFO_HOST = "api_con_info_host"
@@ -54,6 +64,7 @@ CONST_COUCH_ISREPLICATED = "couch_is_replicated"
 CONST_REPO_URL = "repo_url"
 CONST_REPO_USER = "repo_user"
 CONST_REPORT_PATH = "report_path"
+CONST_REPORT_WORKERS = "report_workers"
 CONST_SHELL_MAXIMIZED = "shell_maximized"
 CONST_VERSION = "version"
 CONST_UPDATEURI = "updates_uri"
@@ -71,6 +82,32 @@ DEFAULT_XML = os.path.dirname(__file__) + "/default.xml"
 DEFAULT_SERVER_INI = os.path.join(os.path.dirname(__file__), "..", "server", "default.ini")
 
 
+# Every Configuration, their pending saves are written when exiting
+_configurations = weakref.WeakSet()
+
+
+def _flush_configurations():
+    for config in list(_configurations):
+        config.flushConfig()
+
+
+atexit.register(_flush_configurations)
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _user_config_path(xml_file=None):
+    if not xml_file:
+        xml_file = os.path.join(CONST_FARADAY_HOME_PATH, 'config/user.xml')
+    return os.path.abspath(os.path.expanduser(xml_file))
+
+
 class Configuration:
 
     def __init__(self, xml_file=DEFAULT_XML):
@@ -78,9 +115,20 @@ class Configuration:
 
         self.filepath = xml_file
         self._api_con_info = ''
+        # Values written or read the last time, to know what this process
+        # changed, and signatures of the files as it left them, to know if
+        # another process changed them
+        self._saved_values = None
+        self._file_signatures = {}
+        self._save_lock = threading.RLock()
+        self._save_timer = None
+        self._pending_save = None
 
         if self._isConfig():
             self._getConfig()
+            self._saved_values = self._configValues(self._buildConfigTree())
+            self._file_signatures[_user_config_path(self.filepath)] = _file_signature(self.filepath)
+        _configurations.add(self)
 
     def _isConfig(self):
         """ Checks whether the given file exists and belongs
@@ -134,52 +182,58 @@ class Configuration:
 
         tree = self._getTree()
         if tree:
-            self._api_con_info_host = self._getValue(tree, CONST_API_CON_INFO_HOST)
-            self._api_con_info_port = self._getValue(tree, CONST_API_CON_INFO_PORT)
-            self._api_restful_con_info_port = self._getValue(tree, CONST_API_RESTFUL_CON_INFO_PORT)
-            self._api_con_info = self._getValue(tree, CONST_API_CON_INFO)
-            self._appname = self._getValue(tree, CONST_APPNAME)
-            self._auth = self._getValue(tree, CONST_AUTH)
-            self._auto_share_workspace = self._getValue(tree, CONST_AUTO_SHARE_WORKSPACE)
-            self._config_path = self._getValue(tree, CONST_CONFIG_PATH)
-            self._data_path = self._getValue(tree, CONST_DATA_PATH)
-            self._debug_status = self._getValue(tree, CONST_DEBUG_STATUS)
-            self._default_category = self._getValue(tree, CONST_DEFAULT_CATEGORY)
-            self._default_temp_path = self._getValue(tree, CONST_DEFAULT_TEMP_PATH)
-            self._font = self._getValue(tree, CONST_FONT)
-            self._home_path = self._getValue(tree, CONST_HOME_PATH)
-            self._host_tree_toggle = self._getValue(tree, CONST_HOST_TREE_TOGGLE)
-            self._hsactions_path = self._getValue(tree, CONST_HSTACTIONS_PATH)
-            self._icons_path = self._getValue(tree, CONST_ICONS_PATH)
-            self._image_path = self._getValue(tree, CONST_IMAGE_PATH)
-            self._log_console_toggle = self._getValue(tree, CONST_LOG_CONSOLE_TOGGLE)
-            self._network_location = self._getValue(tree, CONST_NETWORK_LOCATION)
-            self._persistence_path = self._getValue(tree, CONST_PERSISTENCE_PATH)
-            self._perspective_view = self._getValue(tree, CONST_PERSISTENCE_PATH)
-            self._repo_password = self._getValue(tree, CONST_REPO_PASSWORD)
-            self._api_url = self._getValue(tree, CONST_API_URL)
-            self._cert_path = self._getValue(tree, CONST_CERT_PATH, default="")
-            self._couch_uri = self._getValue(tree, CONST_COUCH_URI, default="")
-            self._couch_replics = self._getValue(tree, CONST_COUCH_REPLICS, default="")
-            self._couch_is_replicated = bool(self._getValue(tree, CONST_COUCH_ISREPLICATED, default = False))
-            self._repo_url = self._getValue(tree, CONST_REPO_URL)
-            self._repo_user = self._getValue(tree, CONST_REPO_USER)
-            self._report_path = self._getValue(tree, CONST_REPORT_PATH)
-            self._shell_maximized = self._getValue(tree, CONST_SHELL_MAXIMIZED)
-            self._last_workspace = self._getValue(tree, CONST_LAST_WORKSPACE, default="untitled")
-            self._plugin_settings = json.loads(self._getValue(tree, CONST_PLUGIN_SETTINGS, default="{}"))
-            self._osint = json.loads(self._getValue(tree, CONST_OSINT, default = "{\"host\": \"shodan.io\",\"icon\": \"shodan\",\"label\": \"Shodan\", \"prefix\": \"/search?query=\", \"suffix\": \"\", \"use_external_icon\": false}"))
-
+            self._loadConfigTree(tree)
             self._db_user = ""
-            self._session_cookies = self._getValue(tree, CONST_FARADAY_SESSION_COOKIE, default="")
-            self._custom_plugins_path = self._getValue(tree, CONST_CUSTOM_PLUGINS_PATH, default="")
-            self._updates_uri = self._getValue(tree, CONST_UPDATEURI, default = "https://www.faradaysec.com/scripts/updates.php")
-            self._tkts_uri = self._getValue(tree, CONST_TKTURI, default = "https://www.faradaysec.com/scripts/listener.php")
-            self._tkt_api_params = self._getValue(tree, CONST_TKTAPIPARAMS,default ="{}")
-            self._tkt_template = self._getValue(tree, CONST_TKTTEMPLATE,default ="{}")
-
             self._merge_strategy = None
 
+    def _loadConfigTree(self, tree):
+        """ Completes the private attributes stored in the
+            configuration file with the values in tree. """
+
+        self._api_con_info_host = self._getValue(tree, CONST_API_CON_INFO_HOST)
+        self._api_con_info_port = self._getValue(tree, CONST_API_CON_INFO_PORT)
+        self._api_restful_con_info_port = self._getValue(tree, CONST_API_RESTFUL_CON_INFO_PORT)
+        self._api_con_info = self._getValue(tree, CONST_API_CON_INFO)
+        self._appname = self._getValue(tree, CONST_APPNAME)
+        self._auth = self._getValue(tree, CONST_AUTH)
+        self._auto_share_workspace = self._getValue(tree, CONST_AUTO_SHARE_WORKSPACE)
+        self._config_path = self._getValue(tree, CONST_CONFIG_PATH)
+        self._data_path = self._getValue(tree, CONST_DATA_PATH)
+        self._debug_status = self._getValue(tree, CONST_DEBUG_STATUS)
+        self._default_category = self._getValue(tree, CONST_DEFAULT_CATEGORY)
+        self._default_temp_path = self._getValue(tree, CONST_DEFAULT_TEMP_PATH)
+        self._font = self._getValue(tree, CONST_FONT)
+        self._home_path = self._getValue(tree, CONST_HOME_PATH)
+        self._host_tree_toggle = self._getValue(tree, CONST_HOST_TREE_TOGGLE)
+        self._hsactions_path = self._getValue(tree, CONST_HSTACTIONS_PATH)
+        self._icons_path = self._getValue(tree, CONST_ICONS_PATH)
+        self._image_path = self._getValue(tree, CONST_IMAGE_PATH)
+        self._log_console_toggle = self._getValue(tree, CONST_LOG_CONSOLE_TOGGLE)
+        self._network_location = self._getValue(tree, CONST_NETWORK_LOCATION)
+        self._persistence_path = self._getValue(tree, CONST_PERSISTENCE_PATH)
+        self._perspective_view = self._getValue(tree, CONST_PERSISTENCE_PATH)
+        self._repo_password = self._getValue(tree, CONST_REPO_PASSWORD)
+        self._api_url = self._getValue(tree, CONST_API_URL)
+        self._cert_path = self._getValue(tree, CONST_CERT_PATH, default="")
+        self._couch_uri = self._getValue(tree, CONST_COUCH_URI, default="")
+        self._couch_replics = self._getValue(tree, CONST_COUCH_REPLICS, default="")
+        self._couch_is_replicated = bool(self._getValue(tree, CONST_COUCH_ISREPLICATED, default = False))
+        self._repo_url = self._getValue(tree, CONST_REPO_URL)
+        self._repo_user = self._getValue(tree, CONST_REPO_USER)
+        self._report_path = self._getValue(tree, CONST_REPORT_PATH)
+        self._report_workers = self._getValue(tree, CONST_REPORT_WORKERS)
+        self._shell_maximized = self._getValue(tree, CONST_SHELL_MAXIMIZED)
+        self._last_workspace = self._getValue(tree, CONST_LAST_WORKSPACE, default="untitled")
+        self._plugin_settings = json.loads(self._getValue(tree, CONST_PLUGIN_SETTINGS, default="{}"))
+        self._osint = json.loads(self._getValue(tree, CONST_OSINT, default = "{\"host\": \"shodan.io\",\"icon\": \"shodan\",\"label\": \"Shodan\", \"prefix\": \"/search?query=\", \"suffix\": \"\", \"use_external_icon\": false}"))
+
+        self._session_cookies = self._getValue(tree, CONST_FARADAY_SESSION_COOKIE, default="")
+        self._custom_plugins_path = self._getValue(tree, CONST_CUSTOM_PLUGINS_PATH, default="")
+        self._updates_uri = self._getValue(tree, CONST_UPDATEURI, default = "https://www.faradaysec.com/scripts/updates.php")
+        self._tkts_uri = self._getValue(tree, CONST_TKTURI, default = "https://www.faradaysec.com/scripts/listener.php")
+        self._tkt_api_params = self._getValue(tree, CONST_TKTAPIPARAMS,default ="{}")
+        self._tkt_template = self._getValue(tree, CONST_TKTTEMPLATE,default ="{}")
+
     def getApiConInfo(self):
         if str(self._api_con_info_host) == "None" or str(self._api_con_info_port) == "None":
             return None
@@ -311,6 +365,13 @@ class Configuration:
             self._report_path = os.path.join(CONST_FARADAY_HOME_PATH,"report")
         return self._report_path
 
+    def getReportWorkers(self, default=4):
+        """Amount of reports processed at the same time"""
+        try:
+            return max(1, int(self._report_workers))
+        except (TypeError, ValueError):
+            return default
+
     def getShellMaximized(self):
         return self._shell_maximized
 
@@ -451,6 +512,9 @@ class Configuration:
     def setReportPath(self, val):
         self._report_path = val
 
+    def setReportWorkers(self, val):
+        self._report_workers = val
+
     def setShellMaximized(self, val):
         self._shell_maximized = val
 
@@ -496,13 +560,11 @@ class Configuration:
                 elem.tail = i
 
 
-    def saveConfig(self, xml_file=None):
-        """ Saves XML config on new file. """
+    def _buildConfigTree(self):
+        """ Returns the XML tree of the current configuration. """
 
         ROOT = Element("faraday")
 
-        tree = self._getTree()
-
         API_CON_INFO_HOST = Element(CONST_API_CON_INFO_HOST)
         #API_CON_INFO_HOST.text = self._getValue(tree, CONST_API_CON_INFO_HOST)
         API_CON_INFO_HOST.text = self.getApiConInfoHost()
@@ -606,6 +668,10 @@ class Configuration:
         REPORT_PATH.text = self.getReportPath()
         ROOT.append(REPORT_PATH)
 
+        REPORT_WORKERS = Element(CONST_REPORT_WORKERS)
+        REPORT_WORKERS.text = str(self.getReportWorkers())
+        ROOT.append(REPORT_WORKERS)
+
         SHELL_MAXIMIZED = Element(CONST_SHELL_MAXIMIZED)
         SHELL_MAXIMIZED.text = self.getShellMaximized()
         ROOT.append(SHELL_MAXIMIZED)
@@ -666,15 +732,91 @@ class Configuration:
         TKT_TEMPLATE.text = self.getTktTemplate()
         ROOT.append(TKT_TEMPLATE)
 
-        self.indent(ROOT, 0)
+        return ROOT
+
+    @staticmethod
+    def _configValues(root):
+        return {elem.tag: elem.text for elem in root}
 
-        if not xml_file:
-            xml_file = os.path.expanduser(os.path.join(CONST_FARADAY_HOME_PATH, 'config/user.xml'))
+    def _readConfigValues(self, xml_file):
+        try:
+            with open(xml_file) as f:
+                return self._configValues(ET.fromstring(f.read()))
+        except (IOError, OSError, SyntaxError) as err:
+            logger.warning("Could not read %s: %s", xml_file, err)
+            return {}
+
+    def saveConfig(self, xml_file=None):
+        """ Saves XML config on new file. The file is written
+        CONFIG_SAVE_DELAY seconds later, once for all the saves in between.
+        Use flushConfig to write it right away. """
+
+        xml_file = _user_config_path(xml_file)
+        with self._save_lock:
+            if self._pending_save not in (None, xml_file):
+                self.flushConfig()
+            self._pending_save = xml_file
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(CONFIG_SAVE_DELAY, self.flushConfig)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flushConfig(self):
+        """ Writes the pending save, if any. """
+
+        with self._save_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            xml_file, self._pending_save = self._pending_save, None
+            if xml_file is not None:
+                self._writeConfig(xml_file)
+
+    def _writeConfig(self, xml_file):
+        """ Writes the fields changed by this process, keeping the
+        ones changed in the file by other processes. The file is replaced
+        atomically, so it's never read half written. Returns whether it
+        was written. """
+
+        ROOT = self._buildConfigTree()
+        values = self._configValues(ROOT)
+        saved_values = self._saved_values or {}
+        dirty = {tag for tag, text in values.items() if tag not in saved_values or saved_values[tag] != text}
+
+        signature = _file_signature(xml_file)
+        known_signature = self._file_signatures.get(xml_file)
+        if signature is not None and signature == known_signature and not dirty:
+            return False
+        if known_signature is not None and signature is not None and signature != known_signature:
+            logger.debug("%s was changed by another process, keeping its changes", xml_file)
+            file_values = self._readConfigValues(xml_file)
+            for elem in ROOT:
+                if elem.tag not in dirty and elem.tag in file_values:
+                    elem.text = file_values[elem.tag]
+            # this process sees them too, and won't write them back
+            self._loadConfigTree(ROOT)
+            values = self._configValues(self._buildConfigTree())
+            if not dirty:
+                self._saved_values = values
+                self._file_signatures[xml_file] = signature
+                return False
 
-        if xml_file.startswith('~'):
-            xml_file = os.path.expanduser(xml_file)
+        self.indent(ROOT, 0)
 
-        ElementTree(ROOT).write(xml_file)
+        directory = os.path.dirname(xml_file)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.%s.' % os.path.basename(xml_file))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                ElementTree(ROOT).write(f)
+            if signature is not None:
+                os.chmod(tmp_path, os.stat(xml_file).st_mode & 0o777)
+            os.replace(tmp_path, xml_file)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._saved_values = values
+        self._file_signatures[xml_file] = _file_signature(xml_file)
+        return True
 
 
 def getInstanceConfiguration():
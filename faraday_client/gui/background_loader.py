@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Objects handed to the GUI thread at once
+LOADER_BATCH_SIZE = 50
+
+
+class BackgroundLoader:
+    """Runs fetches in background threads and hands their results to the
+    GUI thread in batches, so long lists are shown while they arrive and
+    the GUI is never blocked waiting for the server.
+
+    Every fetch belongs to a channel, and starting a fetch cancels the
+    previous one of its channel: its results are dropped, even the ones
+    the server already sent. deliver(function, *args) must run the
+    function in the GUI thread, where every other method is called.
+
+        loader.load('vulns', service.getVulns, show_vulns, vulns_shown)
+    """
+
+    def __init__(self, deliver, batch_size=LOADER_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._deliver = deliver
+        # results of the fetches started before the current one of their
+        # channel are dropped
+        self._generations = {}
+        self._running = set()
+
+    def loading(self, channel):
+        return channel in self._running
+
+    def load(self, channel, fetch, on_batch, on_done=None, on_error=None):
+        """Call fetch() in a background thread and on_batch(objects) in the
+        GUI thread with every batch of the objects it returned. on_done()
+        is called after the last batch, on_error(exception) if fetch
+        failed."""
+        generation = self._generations.get(channel, 0) + 1
+        self._generations[channel] = generation
+        self._running.add(channel)
+
+        def run():
+            try:
+                objects = list(fetch())
+            except Exception as ex:
+                logger.exception('Could not load the %s', channel)
+                self._deliver(self._finished, channel, generation, on_error, ex)
+                return
+            for start in range(0, len(objects), self.batch_size):
+                if not self._is_current(channel, generation):
+                    # cancelled, nobody wants the rest
+                    return
+                self._deliver(self._batch_loaded, channel, generation, on_batch,
+                              objects[start:start + self.batch_size])
+            self._deliver(self._finished, channel, generation, on_done)
+
+        threading.Thread(target=run, name='BackgroundLoaderThread', daemon=True).start()
+
+    def cancel(self, channel=None):
+        """Drop the results of the fetch running in channel, of every
+        channel if it's None."""
+        channels = list(self._generations) if channel is None else [channel]
+        for channel in channels:
+            self._generations[channel] = self._generations.get(channel, 0) + 1
+            self._running.discard(channel)
+
+    def _is_current(self, channel, generation):
+        return self._generations.get(channel) == generation
+
+    def _batch_loaded(self, channel, generation, on_batch, objects):
+        if self._is_current(channel, generation):
+            on_batch(objects)
+
+    def _finished(self, channel, generation, callback, *args):
+        if not self._is_current(channel, generation):
+            return
+        self._running.discard(channel)
+        if callback is not None:
+            callback(*args)
+
+
+# I'm Py3
@@ -31,6 +31,7 @@ ADDHOST = 4100
 DELHOST = 4101
 EDITHOST = 4102
 CHANGEFROMINSTANCE = 5100
+CHANGESFROMINSTANCE = 5101
 CONNECTION_REFUSED = 42424
 WORKSPACE_PROBLEM = 24242
 ADDOBJECT = 7777
@@ -163,6 +164,20 @@ class ChangeFromInstanceCustomEvent(CustomEvent):
                                             self.object_name,
                                             action_msg[self.action])
 
+
+class ChangesFromInstanceCustomEvent(CustomEvent):
+    """A group of changes from other instances, delivered together so the
+    GUI can apply them at once. Each change is a ChangeFromInstanceCustomEvent
+    and obj is the changed object, None if it was deleted or couldn't be
+    fetched."""
+    def __init__(self, changes):
+        CustomEvent.__init__(self, CHANGESFROMINSTANCE)
+        self.changes = changes
+
+    def __str__(self):
+        return "\n".join(str(change) for change, _ in self.changes)
+
+
 class AddObjectCustomEvent(CustomEvent):
     def __init__(self, new_obj):
         CustomEvent.__init__(self, ADDOBJECT)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Min seconds between two refreshes of the widgets
+GUI_REFRESH_INTERVAL = 0.5
+# Seconds the first event of a burst waits for the rest of it
+GUI_REFRESH_DELAY = 0.1
+
+
+class EventAggregator:
+    """Collects the events posted to the GUI and hands them in batches to
+    refresh, which is called from a timer thread at most once every
+    interval seconds.
+
+    The events posted while a batch is refreshed go to the next one, so
+    the last event of a burst is always followed by a refresh.
+    """
+
+    def __init__(self, refresh, interval=GUI_REFRESH_INTERVAL, delay=GUI_REFRESH_DELAY):
+        self.interval = interval
+        self.delay = delay
+        self.refreshes = 0
+        self._refresh = refresh
+        self._pending = []
+        self._timer = None
+        self._last_refresh = 0
+        self._stopped = False
+        self._lock = threading.Lock()
+        # a slow refresh delays the next one instead of running with it
+        self._refresh_lock = threading.Lock()
+
+    def post(self, event):
+        with self._lock:
+            if self._stopped:
+                return
+            self._pending.append(event)
+            if self._timer is None:
+                wait = max(self.delay, self._last_refresh + self.interval - time.time())
+                self._timer = threading.Timer(wait, self._run)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Refresh the pending events now, in this thread."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self._run()
+
+    def discard(self):
+        """Forget the pending events, ie. they are from the previous
+        workspace."""
+        with self._lock:
+            self._pending = []
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            self._pending = []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _run(self):
+        with self._refresh_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._timer = None
+                self._last_refresh = time.time()
+            if not batch:
+                return
+            self.refreshes += 1
+            try:
+                self._refresh(batch)
+            except Exception:
+                logger.exception('Could not refresh the GUI with %d events', len(batch))
+
+
+# I'm Py3
@@ -50,10 +50,12 @@ import faraday_client.model.api
 import faraday_client.model.log
 
 from faraday_client.gui.gui_app import FaradayUi
+from faraday_client.gui.event_aggregator import EventAggregator
 
 from faraday_client.config.configuration import getInstanceConfiguration
 from faraday_client.utils.logger import get_logger
 from faraday_client.gui.gtk.appwindow import AppWindow
+from faraday_client.gui.gtk.icons import get_pixbuf, preload_icons
 
 from faraday_client.persistence.server.server import is_authenticated, Unauthorized, get_user_info
 
@@ -141,11 +143,11 @@ class GuiApp(Gtk.Application, FaradayUi):
         self.workspace_dialogs_raised = None
         self.loading_dialog_raised = None
         self.icons = os.path.join(FARADAY_CLIENT_BASE, "data", "images", "icons")
-        faraday_icon = os.path.join(self.icons, "faraday_icon.png")
-        self.icon = GdkPixbuf.Pixbuf.new_from_file_at_scale(faraday_icon, 16,
-                                                            16, False)
+        self.icon = get_pixbuf("faraday_icon.png", 16, 16)
         self.window = None
         self.model_controller = model_controller
+        # object events are shown in batches, see refresh_objects
+        self.objects_refresh = EventAggregator(self.refresh_objects)
 
     @property
     def active_ws_name(self):
@@ -425,6 +427,32 @@ class GuiApp(Gtk.Application, FaradayUi):
         hosts, services, vulns = self.serverIO.get_workspace_numbers()
         return hosts, services, vulns
 
+    def refresh_objects(self, batch):
+        """Show a batch of events of self.objects_refresh. Every event is
+        an (action, obj) tuple: CREATE, UPDATE and DELETE change the
+        hosts sidebar, where the obj of a DELETE is an (id, type) tuple,
+        and NOTIFY adds obj notifications. The counts are updated once per
+        batch."""
+        changes = [(action, obj) for action, obj in batch if action != 'NOTIFY']
+        notifications = sum(obj for action, obj in batch if action == 'NOTIFY')
+
+        def apply_changes():
+            for action, obj in changes:
+                if action == 'DELETE':
+                    self.hosts_sidebar.remove_object(*obj)
+                elif action == 'CREATE':
+                    self.hosts_sidebar.add_object(obj)
+                else:
+                    self.hosts_sidebar.update_object(obj)
+
+        if changes:
+            GObject.idle_add(apply_changes)
+        if notifications:
+            GObject.idle_add(self.statusbar.inc_notif_button_label, notifications)
+        host_count, service_count, vuln_count = self.update_counts()
+        GObject.idle_add(self.statusbar.update_ws_info, host_count,
+                         service_count, vuln_count)
+
     def show_host_info(self, host_id):
         """Looks up the host selected in the HostSidebar by id and shows
         its information on the HostInfoDialog.
@@ -585,22 +613,25 @@ class GuiApp(Gtk.Application, FaradayUi):
 
         def new_notification_event():
             self.notificationsModel.prepend([str(event)])
-            GObject.idle_add(self.statusbar.inc_notif_button_label)
-            host_count, service_count, vuln_count = self.update_counts()
-            GObject.idle_add(self.statusbar.update_ws_info, host_count,
-                             service_count, vuln_count)
+            self.objects_refresh.post(('NOTIFY', 1))
+
+        def new_changes_event():
+            for change, obj in event.changes:
+                self.notificationsModel.prepend([str(change)])
+                if change.action == 'DELETE':
+                    self.objects_refresh.post(('DELETE', (change.object_id, change.object_type)))
+                elif obj is not None:
+                    self.objects_refresh.post((change.action, obj))
+            self.objects_refresh.post(('NOTIFY', len(event.changes)))
 
         def workspace_changed_event():
+            # the pending events are from the previous workspace
+            self.objects_refresh.discard()
             self.serverIO.active_workspace = event.workspace.name
             host_count, service_count, vuln_count = self.update_counts()
-            total_host_amount = self.serverIO.get_hosts_number()
-            first_host_page = self.serverIO.get_hosts(page='1', page_size='20',
-                                                      sort='vulns', sort_dir='desc')
-
-            total_host_amount = self.serverIO.get_workspace_numbers()[0]
             GObject.idle_add(self.statusbar.set_workspace_label, event.workspace.name)
-            GObject.idle_add(self.hosts_sidebar.reset_model_after_workspace_changed,
-                             first_host_page, total_host_amount)
+            # the sidebar loads its hosts in the background
+            GObject.idle_add(self.hosts_sidebar.reset_model_after_workspace_changed)
             GObject.idle_add(self.statusbar.update_ws_info, host_count,
                              service_count, vuln_count)
             GObject.idle_add(self.statusbar.set_default_conflict_label)
@@ -624,28 +655,20 @@ class GuiApp(Gtk.Application, FaradayUi):
 
         def add_object():
             if event.new_obj:
-                GObject.idle_add(self.hosts_sidebar.add_object, event.new_obj)
-                host_count, service_count, vuln_count = self.update_counts()
-                GObject.idle_add(self.statusbar.update_ws_info, host_count,
-                                 service_count, vuln_count)
+                self.objects_refresh.post(('CREATE', event.new_obj))
 
         def delete_object():
             if event.obj_id:
-                GObject.idle_add(self.hosts_sidebar.remove_object, event.obj_id, event.obj_type)
-                host_count, service_count, vuln_count = self.update_counts()
-                GObject.idle_add(self.statusbar.update_ws_info, host_count,
-                                 service_count, vuln_count)
+                self.objects_refresh.post(('DELETE', (event.obj_id, event.obj_type)))
 
         def update_object():
             if event.obj:
-                GObject.idle_add(self.hosts_sidebar.update_object, event.obj)
-                host_count, service_count, vuln_count = self.update_counts()
-                GObject.idle_add(self.statusbar.update_ws_info, host_count,
-                                 service_count, vuln_count)
+                self.objects_refresh.post(('UPDATE', event.obj))
 
         dispatch = {3131: new_log_event,
                     3141: new_conflict_event,
                     5100: new_notification_event,
+                    5101: new_changes_event,
                     3140: workspace_changed_event,
                     3132: normal_error_event,
                     3134: important_error_event,
@@ -689,6 +712,8 @@ class GuiApp(Gtk.Application, FaradayUi):
         Also reads the .xml file from menubar.xml
         """
         Gtk.Application.do_startup(self)  # deep GTK magic
+        # the icons are decoded while the rest of the window is built
+        preload_icons()
 
         self.serverIO = ServerIO(CONF.getLastWorkspace())
         self.serverIO.continously_check_server_connection()
@@ -700,7 +725,7 @@ class GuiApp(Gtk.Application, FaradayUi):
                                            CONF.getLastWorkspace())
 
         # the dummy values here will be updated as soon as the ws is loaded.
-        self.hosts_sidebar = HostsSidebar(self.show_host_info, self.serverIO.get_hosts,
+        self.hosts_sidebar = HostsSidebar(self.show_host_info, self.serverIO.get_hosts_page,
                                           self.serverIO.get_host, self.icons)
         self.sidebar = Sidebar(self.ws_sidebar.get_box(),
                                self.hosts_sidebar.get_box())
@@ -825,6 +850,7 @@ class GuiApp(Gtk.Application, FaradayUi):
             self.open_last_workspace()
 
     def on_quit(self, action=None, param=None):
+        self.objects_refresh.stop()
         self.quit()
 
     def on_plugin_options(self, action, param):
@@ -17,6 +17,8 @@ gi.require_version('Gtk', '3.0')
 
 from gi.repository import GLib, Gio, Gtk, GObject, Gdk  # pylint: disable=import-error
 
+from faraday_client.gui.gtk.icons import get_image
+
 CONF = getInstanceConfiguration()
 
 
@@ -95,7 +97,7 @@ class AppWindow(Gtk.ApplicationWindow):
     def append_remove_terminal_button_to_notebook(self):
         """Apprends a remove_terminal_icon to the end of notebooks
         action area"""
-        remove_terminal_icon = Gtk.Image.new_from_file(os.path.join(self.icons,"exit.png"))
+        remove_terminal_icon = get_image("exit.png")
         remove_terminal_button = Gtk.Button()
         remove_terminal_button.set_tooltip_text("Delete current tab")
         remove_terminal_button.connect("clicked", self.delete_tab)
@@ -182,18 +184,12 @@ class AppWindow(Gtk.ApplicationWindow):
         toolbar.set_hexpand(True)
         icons = self.icons
 
-        new_button_icon = Gtk.Image.new_from_file(
-            os.path.join(icons, "Documentation.png"))
-        new_terminal_icon = Gtk.Image.new_from_file(
-            os.path.join(icons, "newshell.png"))
-        preferences_icon = Gtk.Image.new_from_file(
-            os.path.join(icons, "config.png"))
-        toggle_log_icon = Gtk.Image.new_from_file(
-            os.path.join(icons, "debug.png"))
-        open_report_icon = Gtk.Image.new_from_file(
-            os.path.join(icons, "FolderSteel-20.png"))
-        go_to_web_ui_icon = Gtk.Image.new_from_file(
-            os.path.join(icons, "visualize.png"))
+        new_button_icon = get_image(os.path.join(icons, "Documentation.png"))
+        new_terminal_icon = get_image(os.path.join(icons, "newshell.png"))
+        preferences_icon = get_image(os.path.join(icons, "config.png"))
+        toggle_log_icon = get_image(os.path.join(icons, "debug.png"))
+        open_report_icon = get_image(os.path.join(icons, "FolderSteel-20.png"))
+        go_to_web_ui_icon = get_image(os.path.join(icons, "visualize.png"))
 
         new_terminal_button = Gtk.ToolButton.new(new_terminal_icon, None)
         new_terminal_button.set_tooltip_text("Create a new tab")
@@ -15,11 +15,10 @@ from past.builtins import basestring
 import webbrowser
 import gi  # pylint: disable=import-error
 import os
-from faraday_client.start_client import FARADAY_CLIENT_BASE
 gi.require_version('Gtk', '3.0')
 
 from faraday_client.persistence.server.server import ResourceDoesNotExist
-from gi.repository import Gtk, GdkPixbuf, Gdk  # pylint: disable=import-error
+from gi.repository import Gtk, GdkPixbuf, Gdk, GLib  # pylint: disable=import-error
 from faraday_client.config.configuration import getInstanceConfiguration
 from faraday_client.persistence.server.server import (
     is_authenticated,
@@ -27,8 +26,11 @@ from faraday_client.persistence.server.server import (
     get_user_info,
     check_server_url
 )
+from faraday_client.persistence.server.models import WorkspacePrefetch, prefetch
 from faraday_client.model import guiapi
+from faraday_client.gui.background_loader import BackgroundLoader
 from faraday_client.gui.gtk.decorators import scrollable
+from faraday_client.gui.gtk.icons import get_pixbuf
 
 from faraday_client.gui.gtk.compatibility import CompatibleScrolledWindow as GtkScrolledWindow
 from faraday_client.plugins import fplugin_utils
@@ -879,6 +881,14 @@ class HostInfoDialog(Gtk.Window):
         self.connect("key_press_event", key_reactions)
 
         self.host = host
+        self.active_ws_name = active_ws_name
+        self.prefetch = WorkspacePrefetch(active_ws_name, host=host)
+        # id -> service of the rows of the main tree, the prefetch is
+        # busy with the loader threads and can't be waited for here
+        self.services = {}
+        # the services and vulns arrive while the window is shown
+        self.loader = BackgroundLoader(GLib.idle_add)
+        self.connect("destroy", lambda window: self.loader.cancel())
         self.model = self.create_model(self.host)
         host_info = self.model[0]
 
@@ -925,6 +935,7 @@ class HostInfoDialog(Gtk.Window):
         main_box.pack_start(info_box, True, True, 5)
 
         self.add(main_box)
+        self.load_services()
 
     def create_button_box(self):
         """Creates an horizontal box to hold the buttons."""
@@ -1018,6 +1029,10 @@ class HostInfoDialog(Gtk.Window):
                    ------------> SERVICE2
 
         And so on and so on, like Zizek says.
+
+        Only the host is in the model at first, the services are added by
+        load_services while they arrive. Until then a placeholder row
+        without an ID stands in for them.
         """
 
         # those are 13 strings
@@ -1030,39 +1045,60 @@ class HostInfoDialog(Gtk.Window):
 
         display_str = host.getName() + " (" + str(host.getVulnsAmount()) + ")"
         owned_status = ("Yes" if host.isOwned() else "No")
-        host_position = model.append(None, [str(host.getID()), host.getName(),
-                                            host.getOS(), owned_status,
-                                            str(host.getVulnsAmount()), "",
-                                            "", "", "", "", "", "",
-                                            display_str])
-
-        # some convenient functions just to separate and clarify what
-        # the code does. they are used in the nested for loop directly
-        # below them.
+        self.host_position = model.append(None, [str(host.getID()), host.getName(),
+                                                 host.getOS(), owned_status,
+                                                 str(host.getVulnsAmount()), "",
+                                                 "", "", "", "", "", "",
+                                                 display_str])
+        self.services_placeholder = model.append(self.host_position,
+                                                 [""] * 12 + ["Loading services..."])
+        return model
 
+    def fetch_with_prefetch(self, function):
+        """Return a function calling function with the accessors of the
+        models answering from self.prefetch, to be run in the loader's
+        threads. The services and vulns of the host are fetched once and
+        then answered from memory every time the selection changes."""
+        def fetch():
+            with prefetch(self.active_ws_name, self.prefetch):
+                return function()
+        return fetch
+
+    def load_services(self):
+        """Fill the main tree with the services of the host, fetched
+        in a background thread."""
+        self.loader.load('services', self.fetch_with_prefetch(self.host.getServices),
+                         self.add_services_to_model,
+                         self.on_services_loaded,
+                         self.on_services_load_error)
+
+    def add_services_to_model(self, services):
+        """Append the services to the host in self.model"""
         def lst_to_str(lst):
             """Convenient function to avoid this long line everywhere"""
             return ', '.join([str(word) for word in lst if word])
 
-        def add_service_to_host_in_model(service, model):
-            """Append a service to an host in the given
-            model. Return None. Modifies the model"""
-            display_str = service.getName() + " (" + str(service.getVulnsAmount()) + ")"
-            model.append(host_position, [str(service.getID()),
-                                         service.getName(),
-                                         service.getDescription(),
-                                         service.getProtocol(),
-                                         service.getStatus(),
-                                         lst_to_str(service.getPorts()),
-                                         service.getVersion(),
-                                         "Yes" if service.isOwned() else "No",
-                                         "", "", "", "", display_str])
-
-        services = host.getServices()
         for service in services:
-            add_service_to_host_in_model(service, model)
-
-        return model
+            self.services[str(service.getID())] = service
+            display_str = service.getName() + " (" + str(service.getVulnsAmount()) + ")"
+            self.model.insert_before(self.host_position, self.services_placeholder,
+                                     [str(service.getID()),
+                                      service.getName(),
+                                      service.getDescription(),
+                                      service.getProtocol(),
+                                      service.getStatus(),
+                                      lst_to_str(service.getPorts()),
+                                      service.getVersion(),
+                                      "Yes" if service.isOwned() else "No",
+                                      "", "", "", "", display_str])
+
+    def on_services_loaded(self):
+        self.model.remove(self.services_placeholder)
+        self.services_placeholder = None
+
+    def on_services_load_error(self, error):
+        self.model.set_value(self.services_placeholder, 12,
+                             "Could not load the services")
 
     @scrollable(width=250)
     def create_main_tree_view(self, model):
@@ -1097,12 +1133,15 @@ class HostInfoDialog(Gtk.Window):
             return False
 
         object_info = model[tree_iter]
+        if not object_info[0]:
+            # the placeholder of the services still loading
+            return False
 
         iter_depth = model.iter_depth(tree_iter)
         object_type = {0: 'Host', 1: 'Service'}[iter_depth]
 
         if object_type == 'Host':
-            self.set_vuln_model(self.create_vuln_model(self.host))
+            self.load_vulns(self.host)
             self.clear(self.specific_info)
             self.clear(self.vuln_info)
 
@@ -1115,8 +1154,7 @@ class HostInfoDialog(Gtk.Window):
             actual_object = self.get_object(object_info, object_type)
             if not actual_object:
                 return None
-            vuln_model = self.create_vuln_model(actual_object)
-            self.set_vuln_model(vuln_model)
+            self.load_vulns(actual_object)
 
     def on_vuln_selection(self, vuln_selection):
         """Fill the vuln_info box with the vulnerability selected.
@@ -1135,6 +1173,9 @@ class HostInfoDialog(Gtk.Window):
 
         selected = model[vuln_iter]
         vuln_type = selected[0]
+        if vuln_type not in ("Vulnerability", "VulnerabilityWeb"):
+            # the placeholder of the vulns still loading
+            return False
         self.clear(self.vuln_info)
         self.change_label_in_frame(self.vuln_info_frame,
                                    vuln_type)
@@ -1146,10 +1187,31 @@ class HostInfoDialog(Gtk.Window):
         """Sets the vulnerability view to show the given model"""
         self.vuln_list.set_model(model)
 
-    def create_vuln_model(self, obj):
-        """Return the model for the vulnerabilities of the obj object.
-        It will be sorted alphabetically.
+    def load_vulns(self, obj):
+        """Show the vulnerabilities of the obj object, fetched in a
+        background thread. The ones of the object selected before are
+        dropped if they didn't arrive yet.
         """
+        # those are 16 strings
+        model = Gtk.ListStore(str, str, str, str, str, str, str, str,
+                              str, str, str, str, str, str, str, str)
+        placeholder = model.append([""] * 16)
+        model.set_value(placeholder, 1, "Loading vulnerabilities...")
+
+        def on_error(error):
+            model.set_value(placeholder, 1, "Could not load the vulnerabilities")
+
+        # sort it!
+        sorted_model = Gtk.TreeModelSort(model=model)
+        sorted_model.set_sort_column_id(1, Gtk.SortType.ASCENDING)
+        self.set_vuln_model(sorted_model)
+        self.loader.load('vulns', self.fetch_with_prefetch(obj.getVulns),
+                         lambda vulns: self.add_vulns_to_model(model, vulns),
+                         lambda: model.remove(placeholder),
+                         on_error)
+
+    def add_vulns_to_model(self, model, vulns):
+        """Append the vulnerabilities to the model of the vuln list."""
         def params_to_string(params):  # XXX
             """Converts params to a string, in case it gets here as a list.
             It's pretty anoyting, but needed for backwards compatibility.
@@ -1164,11 +1226,6 @@ class HostInfoDialog(Gtk.Window):
                 raise TypeError
             return params_string
 
-        # those are 16 strings
-        model = Gtk.ListStore(str, str, str, str, str, str, str, str,
-                              str, str, str, str, str, str, str, str)
-
-        vulns = obj.getVulns()
         for vuln in vulns:
             _type = vuln.class_signature
             if _type == "Vulnerability":
@@ -1198,11 +1255,6 @@ class HostInfoDialog(Gtk.Window):
                               vuln.getQuery(),
                               vuln.getStatus(),
                               ""])
-        # sort it!
-        sorted_model = Gtk.TreeModelSort(model=model)
-        sorted_model.set_sort_column_id(1, Gtk.SortType.ASCENDING)
-
-        return sorted_model
 
     def change_label_in_frame(self, frame, string):
         """Changes the label in the given frame to 'string Information'"""
@@ -1260,7 +1312,9 @@ class HostInfoDialog(Gtk.Window):
         object_id = selected_object[0]
         object_ = None
         if object_type == 'Service':
-            object_ = safely(self.host.getService)(object_id)
+            object_ = self.services.get(object_id)
+            if object_ is None:
+                object_ = safely(self.host.getService)(object_id)
 
         return object_
 
@@ -1854,10 +1908,7 @@ class aboutDialog(Gtk.AboutDialog):
     def __init__(self, main_window):
 
         Gtk.AboutDialog.__init__(self, transient_for=main_window, modal=True)
-        icons = os.path.join(FARADAY_CLIENT_BASE, "data", "images", "icons")
-        faraday_icon = GdkPixbuf.Pixbuf.new_from_file(
-            os.path.join(icons, "about.png"))
-        self.set_logo(faraday_icon)
+        self.set_logo(get_pixbuf("about.png"))
         self.set_program_name("Faraday")
 
         app_name = str(CONF.getAppname())
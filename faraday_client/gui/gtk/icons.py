@@ -0,0 +1,55 @@
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import os
+
+import gi  # pylint: disable=import-error
+gi.require_version('Gtk', '3.0')
+
+from gi.repository import Gtk, GdkPixbuf  # pylint: disable=import-error
+
+from faraday_client.gui.image_cache import ImageCache
+from faraday_client.start_client import FARADAY_CLIENT_BASE
+
+ICONS_PATH = os.path.join(FARADAY_CLIENT_BASE, "data", "images", "icons")
+
+# decoded in the background when the application starts
+STARTUP_ICONS = [
+    "tux.png", "windows.png", "Apple.png", "TreeHost.png",
+    "Documentation.png", "newshell.png", "config.png", "debug.png",
+    "FolderSteel-20.png", "visualize.png", "exit.png",
+    ("faraday_icon.png", 16, 16),
+]
+
+
+def _load_pixbuf(path, width, height):
+    if width < 0 and height < 0:
+        return GdkPixbuf.Pixbuf.new_from_file(path)
+    return GdkPixbuf.Pixbuf.new_from_file_at_scale(path, width, height, False)
+
+
+icon_cache = ImageCache(_load_pixbuf, ICONS_PATH)
+
+
+def get_pixbuf(name, width=-1, height=-1):
+    """Return the shared GdkPixbuf of the icon name (a file of the icons
+    directory, or an absolute path) at that size."""
+    return icon_cache.get(name, width, height)
+
+
+def get_image(name, width=-1, height=-1):
+    """Return a new Gtk.Image showing the shared pixbuf of the icon.
+    Widgets can't be shared, their pixbufs can."""
+    return Gtk.Image.new_from_pixbuf(get_pixbuf(name, width, height))
+
+
+def preload_icons(icons=None):
+    return icon_cache.preload(STARTUP_ICONS if icons is None else icons)
+
+
+# I'm Py3
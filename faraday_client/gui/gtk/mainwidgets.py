@@ -9,7 +9,6 @@ from __future__ import division
 
 import gi  # pylint: disable=import-error
 import os
-import math
 import webbrowser
 
 gi.require_version('Gtk', '3.0')
@@ -22,6 +21,8 @@ except ValueError:
 from gi.repository import Gtk, Gdk, GLib, Pango, GdkPixbuf, Vte  # pylint: disable=import-error
 
 from faraday_client.gui.gtk.decorators import scrollable
+from faraday_client.gui.gtk.icons import get_pixbuf
+from faraday_client.gui.host_list import HostList
 from faraday_client.gui.gtk.compatibility import CompatibleVteTerminal as VteTerminal
 from faraday_client.gui.gtk.compatibility import CompatibleScrolledWindow as GtkScrolledWindow
 
@@ -119,40 +120,38 @@ class HostsSidebar(Gtk.Widget):
     the Sidebar notebook. Will list all the host, and when clicking on one,
     will open a window with more information about it"""
 
-    def __init__(self, open_dialog_callback, get_several_hosts_function,
+    def __init__(self, open_dialog_callback, get_hosts_page_function,
                  get_single_host_function, icons):
         """Initializes the HostsSidebar. Initialization by itself does
-        almost nothing, the application will inmediatly call create_model
-        with the last workspace and create_view with that model upon startup.
+        almost nothing, the application will call
+        reset_model_after_workspace_changed once the workspace is loaded.
 
         The model looks like this:
         | HOST_ID | HOST_OS_PIXBUF   | OS_STR | DISPLAY_STR      | VULN_COUNT|
         ======================================================================
         | a923fd  | PixBufIcon(linux)| linux  | 192.168.1.2 (5)  |      5    |
+
+        Only the hosts scrolled to are in the model, they are loaded page
+        by page by self.hosts (see HostList) with get_hosts_page_function.
         """
 
         Gtk.Widget.__init__(self)
         self.open_dialog_callback = open_dialog_callback
-        self.get_hosts_function = get_several_hosts_function
         self.get_single_host_function = get_single_host_function
         self.model = Gtk.ListStore(str, GdkPixbuf.Pixbuf(), str, str, int)
         self.create_view()
         self.progress_label = Gtk.Label("")
-        self.host_amount_total = 0
-        self.host_amount_in_model = 0
-        self.page = 1
         self.host_id_to_iter = {}
+        self.hosts = HostList(
+            lambda page, page_size, search: get_hosts_page_function(
+                page=page, page_size=page_size, search=search,
+                sort='vulns', sort_dir='desc'),
+            GLib.idle_add, self)
         self.linux_icon = os.path.join(icons, "tux.png")
         self.windows_icon = os.path.join(icons, "windows.png")
         self.mac_icon = os.path.join(icons, "Apple.png")
         self.no_os_icon = os.path.join(icons, "TreeHost.png")
 
-    @property
-    def number_of_pages(self):
-        if self.host_amount_total == 0:
-            return 1
-        return int(math.ceil(self.host_amount_total / 20.0))
-
     @scrollable(width=160)
     def scrollable_view(self):
         return self.view
@@ -184,42 +183,30 @@ class HostsSidebar(Gtk.Widget):
         self.view.set_search_column(2)
         return self.view
 
-    def reset_model(self, hosts):
-        """Resets the model to a new list of hosts.
-        Use for changing of pages, _not_ for changing of workspaces,
-        there's reset_model_after_workspace_changed for that.
-        """
-        self.model.clear()
-        self.host_amount_in_model = 0
-        self.host_id_to_iter = {}
-        self.add_relevant_hosts_to_model(hosts)
-        self.set_move_buttons_sensitivity()
-
-    def reset_model_after_workspace_changed(self, hosts, total_host_amount):
-        """Reset the model and also sets the page to 0 and the new total
-        host amount will be the length of host."""
-        self.page = 1
-        self.host_amount_total = total_host_amount
-        self.reset_model(hosts)
+    def reset_model_after_workspace_changed(self):
+        """Empty the model and load the first page of hosts of the new
+        workspace."""
+        self.hosts.reset(self.search_entry.get_text())
         self.update_progress_label()
 
     def __decide_icon(self, os):
         """Return the GdkPixbuf icon according to 'os' paramather string
         and a str_id to that GdkPixbuf for easy comparison and ordering
         of the view ('os' paramether string is complicated and has caps).
+        The icons are decoded once and shared by every row.
         """
         os = os.lower() if os else ""
         if "linux" in os or "unix" in os:
-            icon = GdkPixbuf.Pixbuf.new_from_file(self.linux_icon)
+            icon = get_pixbuf(self.linux_icon)
             str_id = "linux"
         elif "windows" in os:
-            icon = GdkPixbuf.Pixbuf.new_from_file(self.windows_icon)
+            icon = get_pixbuf(self.windows_icon)
             str_id = "windows"
         elif "mac" in os:
-            icon = GdkPixbuf.Pixbuf.new_from_file(self.mac_icon)
+            icon = get_pixbuf(self.mac_icon)
             str_id = "mac"
         else:
-            icon = GdkPixbuf.Pixbuf.new_from_file(self.no_os_icon)
+            icon = get_pixbuf(self.no_os_icon)
             str_id = "unknown"
         return icon, str_id
 
@@ -230,7 +217,7 @@ class HostsSidebar(Gtk.Widget):
 
     def _is_host_in_model_by_host_id(self, host_id):
         """Return a boolean indicating if host_id is in the model"""
-        return self.host_id_to_iter.get(host_id) is not None
+        return str(host_id) in self.host_id_to_iter
 
     def _get_vuln_amount_from_model(self, host_iter):
         """Return the amount of vulns the model thinks host_iter has.
@@ -239,85 +226,43 @@ class HostsSidebar(Gtk.Widget):
         """
         return self.model[host_iter][4]
 
-    def _vulns_ids_of_host(self, host):
-        """Return a list of vulnerabilities IDs for the given host.
-        It will return [] if host is None (or any other falsey value).
-        """
-        return [v.getID() for v in host.getVulns()] if host else []
-
-    def _is_vuln_of_host(self, vuln_id, host_id):
-        """Return a boolean indicating whether vuln_id is associated with the
-        host of host_id. Potentially slow, as it makes a request to the server.
-        """
-        host = self.get_single_host_function(host_id)
-        return vuln_id in self._vulns_ids_of_host(host)
-
-    def _add_single_host_to_model(self, host):
-        """Add a single host to the model. Return None."""
+    def _host_row(self, host):
         vuln_count = host.getVulnsAmount()
         os_icon, os_str = self.__decide_icon(host.getOS())
-        display_str = str(host)
-        if str(host.id) not in [host_data[0] for host_data in self.model]:
-            host_iter = self.model.append([str(host.id), os_icon, os_str, display_str, vuln_count])
-            self.host_id_to_iter[host.id] = host_iter
-            self.host_amount_in_model += 1
-
-    def add_relevant_hosts_to_model(self, hosts):
-        """Takes a list of hosts. Add the hosts to the model without going
-        over the maximun size of the model. Return None.
-        """
-        space_left_in_sidebar = 20 - self.host_amount_in_model
-        relevant_hosts = hosts[0:space_left_in_sidebar]  # just ignore those coming after
-        [self._add_single_host_to_model(h) for h in relevant_hosts]
-
-    def _update_single_host_name_in_model(self, host_id, host_iter):
-        """Take a host_id and a host_iter. Changes the string representation
-        of the host in the model. Potentially slow, makes a request to the server.
-        Return None.
-
-        @precondtions: host_iter must be in self.model
-        """
-        host = self.get_single_host_function(host_id)
-        new_name = host.getName()
-        vuln_amount = self._get_vuln_amount_from_model(host_iter)
-        new_string = "{0} ({1})".format(new_name, vuln_amount)
-        self.model.set_value(host_iter, 3, new_string)
-
-    def update_relevant_host_names_in_model(self, hosts):
-        """Takes a list of hosts and updates their string representation
-        in the model. Potentially slow, makes len(hosts) requests to the server.
-        Return None.
-        """
-        hosts_ids = [h.id for h in hosts]
-        relevant_hosts = list(filter(self._is_host_in_model_by_host_id, hosts_ids))
-        host_iters = [self.host_id_to_iter[h] for h in relevant_hosts]
-        list(map(self._update_single_host_name_in_model, relevant_hosts, host_iters))
+        return [str(host.id), os_icon, os_str, str(host), vuln_count]
+
+    def hosts_added(self, hosts):
+        """Called by self.hosts with the hosts of a new page, or a new host.
+        Return None."""
+        for host in hosts:
+            if not self._is_host_in_model_by_host_id(host.id):
+                self.host_id_to_iter[str(host.id)] = self.model.append(self._host_row(host))
+        self.update_progress_label()
 
-    def _remove_single_host_from_model(self, host_id):
-        """Remove the host of host_id from the model. Return None.
+    def host_updated(self, host):
+        """Called by self.hosts when a host shown changed. Takes the name
+        and the amount of vulns from host, no request is made. Return None."""
+        host_iter = self.host_id_to_iter.get(str(host.id))
+        if host_iter is not None:
+            self.model[host_iter] = self._host_row(host)
+
+    def host_removed(self, host_id):
+        """Called by self.hosts when a host shown was deleted. Return None."""
+        host_iter = self.host_id_to_iter.pop(str(host_id), None)
+        if host_iter is not None:
+            self.model.remove(host_iter)
+        self.update_progress_label()
 
-        @preconditions: host_id must be in self.host_id_to_iter,
-                       self.host_id_to_iter[host_id] must be in model
-        """
-        host_iter = self.host_id_to_iter[host_id]
-        del self.host_id_to_iter[host_id]
-        self.model.remove(host_iter)
-        self.host_amount_total -= 1
-        self.host_amount_in_model -= 1
-
-    def remove_relevant_hosts_from_model(self, host_ids):
-        """Takes a list of host_ids and deletes the one found on the model
-        from there. Return None."""
-        relevant_host_ids = list(filter(self._is_host_in_model_by_host_id, host_ids))
-        list(map(self._remove_single_host_from_model, relevant_host_ids))
+    def cleared(self):
+        """Called by self.hosts before loading the hosts again."""
+        self.model.clear()
+        self.host_id_to_iter = {}
+        self.update_progress_label()
 
     def _modify_vuln_amount_of_single_host_in_model(self, host_id, new_vuln_amount):
         """Take a host_id and a new_vuln amount and modify the string representation
         and the vuln amount of the host of id host_id in the model according
         to the new_vuln_amount. Return None.
-
-        @preconditions: host_id must be in self.host_id_to_iter,
-                        self.host_id_to_iter[host_id] must in the model.
         """
 
         # Let's first check if the host_id is in the model to avoid an exception bellow.
@@ -326,7 +271,7 @@ class HostsSidebar(Gtk.Widget):
         if not self._is_host_in_model_by_host_id(host_id):
             return
 
-        host_iter = self.host_id_to_iter[host_id]
+        host_iter = self.host_id_to_iter[str(host_id)]
         current_host_name = self.model[host_iter][3].split(" ")[0]
         new_host_string = "{0} ({1})".format(current_host_name, new_vuln_amount)
         self.model.set_value(host_iter, 4, new_vuln_amount)
@@ -339,11 +284,10 @@ class HostsSidebar(Gtk.Widget):
         one vulnerability from them, according to the plus_one_or_minus_one
         function. Return None.
         """
-        relevant_host_ids = list(filter(self._is_host_in_model_by_host_id, host_ids))
-        host_iters = [self.host_id_to_iter[h] for h in relevant_host_ids]
-        vuln_amount_of_those_hosts = [self._get_vuln_amount_from_model(h) for h in host_iters]
-        new_vuln_amounts = [plus_one_or_minus_one(h) for h in vuln_amount_of_those_hosts]
-        list(map(self._modify_vuln_amount_of_single_host_in_model, relevant_host_ids, new_vuln_amounts))
+        for host_id in filter(self._is_host_in_model_by_host_id, host_ids):
+            host_iter = self.host_id_to_iter[str(host_id)]
+            new_vuln_amount = plus_one_or_minus_one(self._get_vuln_amount_from_model(host_iter))
+            self._modify_vuln_amount_of_single_host_in_model(host_id, new_vuln_amount)
 
     def add_relevant_vulns_to_model(self, vulns):
         """Takes vulns, a list of vulnerability object, and adds them to the
@@ -361,19 +305,19 @@ class HostsSidebar(Gtk.Widget):
         self._modify_vuln_amounts_of_hosts_in_model(host_ids, lambda x: x - 1)
 
     def add_host(self, host):
-        """Adds host to the model. Do not use for hosts added after
-        the initial load of the workspace, use add_host_after_initial_load
-        for that.
+        """Adds a host created after the initial load of the sidebar. It's
+        shown now if every host was loaded, if not it comes with its page.
         """
-        self.add_relevant_hosts_to_model([host])
+        self.hosts.add_host(host)
+        self.update_progress_label()
 
     def remove_host(self, host_id):
         """Remove host of host_id from the model, if found in it."""
-        self.remove_relevant_hosts_from_model([host_id])
+        self.hosts.remove_host(host_id)
 
     def update_host_name(self, host):
         """Update the host name of host in the model, if found in it."""
-        self.update_relevant_host_names_in_model([host])
+        self.hosts.update_host(host)
 
     def add_vuln(self, vuln):
         """Adds vuln to the corresponding host, if the host is found in the model."""
@@ -383,20 +327,11 @@ class HostsSidebar(Gtk.Widget):
         """Removes a vuln from its host, if the host is found in the model."""
         self.remove_relevant_vulns_from_model([vuln_id])
 
-    def add_host_after_initial_load(self, host):
-        """Adds a host after the initial load of the sidebar.
-        This implies modifiying the total host amount and potentially
-        updating the progress buttons senstivity.
-        """
-        self.host_amount_total += 1
-        self.add_host(host)
-        self.set_move_buttons_sensitivity()
-
     def add_object(self, obj):
         """Add and object obj of unkwonw type to the model, if found there"""
         object_type = obj.class_signature
         if object_type == 'Host':
-            self.add_host_after_initial_load(host=obj)
+            self.add_host(host=obj)
         if object_type in ["Vulnerability", "VulnerabilityWeb"]:
             self.add_vuln(vuln=obj)
 
@@ -428,15 +363,14 @@ class HostsSidebar(Gtk.Widget):
         host_id = self.model[tree_iter][0]
         self.open_dialog_callback(host_id)
 
-    def set_move_buttons_sensitivity(self):
-        """Update the sensitity of the prev and next buttons according to the
-        page we're on and the total number of pages.
-        """
-        self.prev_button.set_sensitive(self.page >= 2)  # its a boolean!
-
-        # we add one to self.page 'cause they start at zero, but number of pages is
-        # always at least one :)
-        self.next_button.set_sensitive(self.number_of_pages > self.page)
+    def on_scroll(self, adjustment):
+        """Load the next page of hosts when the view is scrolled near its
+        end, or when it isn't full yet (the adjustment changes with every
+        page added)."""
+        # one screen before the end
+        if adjustment.get_value() + 2 * adjustment.get_page_size() >= adjustment.get_upper():
+            self.hosts.load_more()
+            self.update_progress_label()
 
     def get_box(self):
         """Return the sidebar_box, which contains all the elements of the
@@ -444,6 +378,9 @@ class HostsSidebar(Gtk.Widget):
         """
         search_entry = self.create_search_entry()
         scrollable_view = self.scrollable_view()
+        adjustment = scrollable_view.get_vadjustment()
+        adjustment.connect("value-changed", self.on_scroll)
+        adjustment.connect("changed", self.on_scroll)
         button_box = self.button_box()
         sidebar_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         sidebar_box.pack_start(search_entry, False, False, 0)
@@ -452,38 +389,22 @@ class HostsSidebar(Gtk.Widget):
         return sidebar_box
 
     def button_box(self):
-        """Return the button_box, which contains the prev and next button
-        as well the progress label. Creates the instance attributes
-        self.prev_button and self.next_button.
-        """
+        """Return the button_box, which contains the progress label."""
         button_box = Gtk.Box()
         button_box.override_background_color(Gtk.StateType.NORMAL, Gdk.RGBA(.1, .1, .1, .1))
-        self.prev_button = Gtk.Button.new_with_label("<<")
-        self.next_button = Gtk.Button.new_with_label(">>")
-        self.prev_button.connect("clicked", self.on_click_move_page, lambda x: x - 1)
-        self.next_button.connect("clicked", self.on_click_move_page, lambda x: x + 1)
-        button_box.pack_start(self.prev_button, True, True, 0)
         button_box.pack_start(self.progress_label, True, True, 0)
-        button_box.pack_start(self.next_button, True, True, 0)
         return button_box
 
-    def on_click_move_page(self, button, change_page_number_func, *args, **kwargs):
-        """What happens when the user clicks on either self.prev_button
-        or self.next_button. Change self.page according to the change_page_number_func,
-        and resets the model to a new list of hosts requested from the server.
-        """
-        self.page = change_page_number_func(self.page)
-        hosts = self.get_hosts_function(page=str(self.page),
-                                        page_size=20,
-                                        search=self.search_entry.get_text(),
-                                        sort='vulns',
-                                        sort_dir='desc')
-        self.reset_model(hosts)
-        self.update_progress_label()
-
     def update_progress_label(self):
-        """Updates the progress label with values from self.page and self.number_of_pages."""
-        self.progress_label.set_label("{0} / {1}".format(self.page , self.number_of_pages))
+        """Updates the progress label with the amount of hosts loaded and
+        the amount of hosts of the workspace."""
+        if self.hosts.total is None:
+            self.progress_label.set_label("Loading hosts...")
+        elif self.hosts.loading:
+            self.progress_label.set_label("{0} / {1} hosts, loading...".format(
+                len(self.hosts), self.hosts.total))
+        else:
+            self.progress_label.set_label("{0} / {1} hosts".format(len(self.hosts), self.hosts.total))
 
     def create_search_entry(self):
         """Returns a simple search entry"""
@@ -494,9 +415,10 @@ class HostsSidebar(Gtk.Widget):
         return self.search_entry
 
     def on_search_enter_key(self, entry):
-        """Rebuild the model with the search, but self.page stays the same.
-        """
-        self.on_click_move_page(Gtk.Button(), lambda i: i)
+        """Load the hosts again, the ones matching the search. The
+        server does the search."""
+        self.hosts.reset(entry.get_text())
+        self.update_progress_label()
 
 
 class WorkspaceSidebar(Gtk.Widget):
@@ -866,11 +788,11 @@ class Statusbar(Gtk.Widget):
     def set_workspace_label(self, new_label):
         self.active_workspace_label.set_label("Active workspace: <b>{0}</b>".format(new_label))
 
-    def inc_notif_button_label(self):
+    def inc_notif_button_label(self, amount=1):
         """Increments the button label, sets bold so user knows there are
         unread notifications"""
 
-        self.notif_button_label_int += 1
+        self.notif_button_label_int += amount
         child = self.notif_button.get_child()
         self.notif_button.remove(child)
         label = Gtk.Label.new()
@@ -7,12 +7,18 @@ See the file 'doc/LICENSE' for the license information
 from __future__ import absolute_import
 
 import time
+import logging
 import threading
 
 from faraday_client.model.guiapi import notification_center
 from faraday_client.gui.gtk.decorators import safe_io_with_server
 from faraday_client.persistence.server import models, server_io_exceptions
 
+logger = logging.getLogger(__name__)
+
+# Seconds the changes thread waits for a new change before checking again
+CHANGES_WAIT_TIMEOUT = 0.5
+
 
 class ServerIO:
     def __init__(self, active_workspace):
@@ -36,6 +42,10 @@ class ServerIO:
     def get_hosts(self, **params):
         return models.get_hosts(self.active_workspace, **params)
 
+    @safe_io_with_server(([], 0))
+    def get_hosts_page(self, page, page_size, **params):
+        return models.get_hosts_page(self.active_workspace, page, page_size, **params)
+
     @safe_io_with_server(0)
     def get_hosts_number(self):
         return models.get_hosts_number(self.active_workspace)
@@ -72,6 +82,10 @@ class ServerIO:
     def get_object(self, object_signature, object_id):
         return models.get_object(self.active_workspace, object_signature, object_id)
 
+    @safe_io_with_server({})
+    def get_objects(self, object_signature, object_ids):
+        return models.get_objects(self.active_workspace, object_signature, object_ids)
+
     @safe_io_with_server(None)
     def get_host(self, host_id):
         return models.get_host(self.active_workspace, host_id)
@@ -92,10 +106,39 @@ class ServerIO:
     def get_changes_stream(self):
         return models.get_changes_stream(self.active_workspace)
 
+    def get_changes_stats(self):
+        """Return the counters of the changes stream (queue depth, lag...),
+        None if there is no stream."""
+        if self.stream is None:
+            return None
+        return self.stream.stats.as_dict()
+
     @safe_io_with_server((None, None))
     def get_deleted_object_name_and_type(self, obj_id):
         return models.get_deleted_object_name_and_type(self.active_workspace, obj_id)
 
+    def get_changed_objects(self, changes):
+        """Return a dictionary of (type, id) -> object with the objects
+        created or updated by changes. Objects are built from the change
+        when it carries them, the rest are fetched together.
+        """
+        changed_objects = {}
+        ids_to_fetch = {}
+        for change in changes:
+            if not isinstance(change, dict) or change.get('action') not in ('CREATE', 'UPDATE'):
+                continue
+            obj_id = change.get('id')
+            obj_type = change.get('type')
+            obj = models.get_object_from_change(self.active_workspace, change)
+            if obj is None:
+                ids_to_fetch.setdefault(obj_type, []).append(obj_id)
+            else:
+                changed_objects[(obj_type, obj_id)] = obj
+        for obj_type, obj_ids in ids_to_fetch.items():
+            for obj_id, obj in self.get_objects(obj_type, obj_ids).items():
+                changed_objects[(obj_type, obj_id)] = obj
+        return changed_objects
+
     def continously_get_changes(self):
         """Creates a thread which will continuously check the changes
         coming from other instances of Faraday. Return the thread on any
@@ -107,30 +150,30 @@ class ServerIO:
                 return False
             while True:
                 try:
-                    for obj_information in self.stream:
+                    # waits for the first change instead of polling, then
+                    # takes every change already queued
+                    changes = self.stream.get_changes(timeout=CHANGES_WAIT_TIMEOUT)
+                    if not changes:
+                        continue
+                    known_objects = self.get_changed_objects(changes)
+                    notifications = []
+                    for obj_information in changes:
+                        if not isinstance(obj_information, dict):
+                            continue
                         action = obj_information.get('action')
                         obj_id = obj_information.get('id')
                         obj_type = obj_information.get('type')
                         obj_name = obj_information.get('name')
-                        if action == 'CREATE':
-                            obj = self.get_object(obj_type, obj_id)
-                            notification_center.addObject(obj)
-                        elif action == 'UPDATE':
-                            obj = self.get_object(obj_type, obj_id)
-                            notification_center.editObject(obj)
-                        elif action == 'DELETE':
-                            notification_center.deleteObject(obj_id, obj_type)
-                        else:
-                            raise Exception('Invalid action')
-                        notification_center.changeFromInstance(
-                                action,
-                                obj_id,
-                                obj_type,
-                                obj_name)
+                        if action not in ('CREATE', 'UPDATE', 'DELETE'):
+                            logger.warning('Invalid action in change: {0}'.format(obj_information))
+                            continue
+                        obj = known_objects.get((obj_type, obj_id))
+                        notifications.append((action, obj_id, obj_type, obj_name, obj))
+                    if notifications:
+                        notification_center.changesFromInstance(notifications)
                 except server_io_exceptions.ChangesStreamStoppedAbruptly:
                     notification_center.WorkspaceProblem()
                     return False
-                time.sleep(0.5)
 
         get_changes_thread = threading.Thread(target=get_changes, name='get_changes')
         get_changes_thread.daemon = True
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Hosts asked to the server at once
+HOST_PAGE_SIZE = 100
+# Pages fetched ahead of the ones shown
+HOST_PREFETCH_PAGES = 1
+# Fetched pages kept until they are shown
+HOST_CACHED_PAGES = 10
+
+
+class HostList:
+    """The hosts of a workspace shown in a list, loaded from the server
+    page by page as the list is scrolled. The hosts are kept by id, the
+    search is done by the server, and the changes of the workspace update
+    the list without loading it again.
+
+    fetch_page(page, page_size, search) runs in a background thread and
+    returns a list of hosts and the amount of hosts matching search.
+    deliver(function, *args) must run the function in the GUI thread,
+    where every other method is called. The listener is told of the
+    changes with hosts_added(hosts), host_updated(host),
+    host_removed(host_id) and cleared().
+    """
+
+    def __init__(self, fetch_page, deliver, listener, page_size=HOST_PAGE_SIZE,
+                 prefetch_pages=HOST_PREFETCH_PAGES, cached_pages=HOST_CACHED_PAGES):
+        self.page_size = page_size
+        self.prefetch_pages = prefetch_pages
+        self.cached_pages = cached_pages
+        self.search = ''
+        self.total = None
+        self._fetch_page = fetch_page
+        self._deliver = deliver
+        self._listener = listener
+        self._hosts = OrderedDict()
+        self._pages = OrderedDict()
+        self._fetching = set()
+        self._wanted_page = None
+        self._last_empty_page = 0
+        # results of the fetches started before a reset are dropped
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def __contains__(self, host_id):
+        return str(host_id) in self._hosts
+
+    def get(self, host_id):
+        return self._hosts.get(str(host_id))
+
+    @property
+    def loading(self):
+        return self._wanted_page is not None
+
+    @property
+    def complete(self):
+        return self.total is not None and len(self._hosts) >= self.total
+
+    def reset(self, search=''):
+        """Forget the hosts and start loading them again from the first
+        page, only the ones matching search."""
+        self._generation += 1
+        self.search = search
+        self.total = None
+        self._hosts.clear()
+        self._pages.clear()
+        self._fetching.clear()
+        self._wanted_page = None
+        self._last_empty_page = 0
+        self._listener.cleared()
+        self.load_more()
+
+    def load_more(self):
+        """Show the next page of hosts, now if it was already fetched or
+        when the server answers."""
+        if self.complete or self.loading:
+            return
+        # deleted or created hosts move the pages, the hosts of the next
+        # page already shown are skipped
+        page = max(len(self._hosts) // self.page_size + 1, self._last_empty_page + 1)
+        if self.total is not None and (page - 1) * self.page_size >= self.total:
+            # the server counted more hosts than it sent
+            self.total = len(self._hosts)
+            return
+        if page in self._pages:
+            self._show_page(page)
+        else:
+            self._wanted_page = page
+            self._request(page)
+        self._prefetch(page)
+
+    def _prefetch(self, page):
+        for next_page in range(page + 1, page + 1 + self.prefetch_pages):
+            if self.total is not None and (next_page - 1) * self.page_size >= self.total:
+                break
+            self._request(next_page)
+
+    def _request(self, page):
+        if page in self._pages or page in self._fetching:
+            return
+        self._fetching.add(page)
+        generation, search = self._generation, self.search
+
+        def fetch():
+            try:
+                hosts, total = self._fetch_page(page, self.page_size, search)
+            except Exception:
+                logger.exception('Could not fetch page %d of the hosts', page)
+                hosts, total = None, None
+            self._deliver(self._page_fetched, generation, page, hosts, total)
+
+        threading.Thread(target=fetch, name='HostListPageThread', daemon=True).start()
+
+    def _page_fetched(self, generation, page, hosts, total):
+        if generation != self._generation:
+            return
+        self._fetching.discard(page)
+        if hosts is None:
+            if self._wanted_page == page:
+                self._wanted_page = None
+            return
+        self.total = total
+        self._pages[page] = hosts
+        while len(self._pages) > self.cached_pages:
+            self._pages.popitem(last=False)
+        if self._wanted_page == page:
+            self._wanted_page = None
+            self._show_page(page)
+
+    def _show_page(self, page):
+        hosts = self._pages.pop(page)
+        new_hosts = []
+        for host in hosts:
+            host_id = str(host.getID())
+            if host_id not in self._hosts:
+                self._hosts[host_id] = host
+                new_hosts.append(host)
+        if len(hosts) < self.page_size:
+            # the last page, whatever the count said
+            self.total = len(self._hosts)
+        if new_hosts:
+            self._listener.hosts_added(new_hosts)
+        elif not self.complete:
+            # every host of the page was already shown
+            self._last_empty_page = page
+            self.load_more()
+
+    def add_host(self, host):
+        """A host was created. It's shown if every host was loaded, if not
+        it comes with its page."""
+        if host.getID() is None or host.getID() in self:
+            return
+        # the hosts of the fetched pages moved
+        self._pages.clear()
+        if self.search or self.total is None:
+            # it may not match the search, or the first page is coming
+            return
+        was_complete = self.complete
+        self.total += 1
+        if was_complete:
+            self._hosts[str(host.getID())] = host
+            self._listener.hosts_added([host])
+
+    def update_host(self, host):
+        host_id = str(host.getID())
+        if host_id in self._hosts:
+            self._hosts[host_id] = host
+            self._listener.host_updated(host)
+
+    def remove_host(self, host_id):
+        host_id = str(host_id)
+        self._pages.clear()
+        if host_id in self._hosts:
+            del self._hosts[host_id]
+            if self.total is not None:
+                self.total -= 1
+            self._listener.host_removed(host_id)
+
+
+# I'm Py3
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    """Images decoded once for each size they are asked in, and shared
+    by everyone asking for them afterwards. They must not be modified.
+
+    load(path, width, height) decodes the image of path, a width and a
+    height of -1 meaning the size of the file. Names are relative to
+    directory, unless they are absolute paths.
+    """
+
+    def __init__(self, load, directory=''):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._load = load
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._images)
+
+    def get(self, name, width=-1, height=-1):
+        """Return the image of name at that size, None if it can't be
+        loaded."""
+        path = os.path.join(self.directory, name)
+        key = (path, width, height)
+        with self._lock:
+            if key in self._images:
+                self.hits += 1
+                return self._images[key]
+            self.misses += 1
+            try:
+                image = self._load(path, width, height)
+            except Exception as ex:
+                # not asked again, the file won't be there the next time
+                logger.warning('Could not load the image %s: %s', path, ex)
+                image = None
+            self._images[key] = image
+            return image
+
+    def preload(self, images, background=True):
+        """Decode images, a list of names or of (name, width, height)
+        tuples, so they are ready when they are needed. Return the thread
+        loading them if background, if not they are loaded now."""
+        def load_images():
+            for image in images:
+                if isinstance(image, tuple):
+                    self.get(*image)
+                else:
+                    self.get(image)
+
+        if not background:
+            load_images()
+            return None
+        thread = threading.Thread(target=load_images, name='ImageCachePreloadThread', daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+
+# I'm Py3
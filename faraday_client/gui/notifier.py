@@ -83,6 +83,13 @@ class NotificationCenter():
                                                                  obj_type,
                                                                  obj_name))
 
+    def changesFromInstance(self, changes):
+        """Take a list of (action, obj_id, obj_type, obj_name, obj) tuples
+        and notify them as one event."""
+        self._notifyWidgets(events.ChangesFromInstanceCustomEvent(
+            [(events.ChangeFromInstanceCustomEvent(action, obj_id, obj_type, obj_name), obj)
+             for action, obj_id, obj_type, obj_name, obj in changes]))
+
     def addHostFromChanges(self, obj):
         self._notifyWidgets(events.AddHostChangesEvent(obj))
 
@@ -4,7 +4,8 @@ Copyright (C) 2013  Infobyte LLC (http://www.infobytesec.com/)
 See the file 'doc/LICENSE' for the license information
 """
 import logging
-from faraday_client.persistence.server.models import create_object, get_object, update_object, delete_object
+from faraday_client.persistence.server.models import (create_object, get_object, update_object, delete_object,
+                                                       bulk_create)
 
 # NOTE: This class is intended to be instantiated by the
 # service or controller that needs it.
@@ -29,6 +30,9 @@ class MapperManager:
             return saved_raw_obj.get('_id', None) or saved_raw_obj['id']
         raise RuntimeError('Could not retrieve id from server.')
 
+    def bulk_save(self, hosts):
+        return bulk_create(self.workspace_name, hosts)
+
     def update(self, obj, command_id=None):
         if update_object(self.workspace_name, obj.class_signature, obj, command_id):
             return True
@@ -0,0 +1,237 @@
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+"""
+import os
+import sys
+import json
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Seconds the size and modification time of a file must stay the same
+# before it's considered completely written, when there are no
+# close-write notifications for it
+STABLE_TIME = 2
+# Max amount of files remembered by ProcessedReports
+PROCESSED_REPORTS_SIZE = 10000
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+def _file_signature(filename):
+    """Return (size, mtime) of filename, None if it doesn't exist."""
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime
+
+
+class ProcessedReports:
+    """Persistent record of the reports already processed, so they are not
+    processed again after a restart if they are still in the folder.
+
+    A report is identified by its name, size and modification time: a new
+    report dropped with the name of an old one is processed.
+    """
+
+    def __init__(self, path, max_size=PROCESSED_REPORTS_SIZE):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._reports = OrderedDict()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as record_file:
+                reports = json.load(record_file)
+        except (IOError, OSError, ValueError):
+            return
+        for name, signature in reports:
+            self._reports[name] = tuple(signature)
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as record_file:
+            json.dump(list(self._reports.items()), record_file)
+        os.replace(tmp_path, self.path)
+
+    def __contains__(self, filename):
+        signature = _file_signature(filename)
+        with self._lock:
+            return signature is not None and \
+                self._reports.get(os.path.basename(filename)) == signature
+
+    def add(self, filename):
+        signature = _file_signature(filename)
+        if signature is None:
+            return
+        name = os.path.basename(filename)
+        with self._lock:
+            self._reports.pop(name, None)
+            self._reports[name] = signature
+            while len(self._reports) > self.max_size:
+                self._reports.popitem(last=False)
+            try:
+                self._save()
+            except (IOError, OSError) as ex:
+                logger.warning('Could not save the processed reports record: %s', ex)
+
+
+class Inotify:
+    """Minimal inotify(7) binding over ctypes, watching the files written or
+    moved into a single directory."""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO
+
+    def __init__(self, path):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, os.strerror(error))
+
+    def read(self, timeout):
+        """Wait up to timeout seconds for events. Return the list of the
+        names of the written files, None if events were lost."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name:
+                names.append(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ReportWatcher(threading.Thread):
+    """Watches a folder and calls on_report with the path of every file
+    completely written to it.
+
+    Uses inotify close-write notifications where available. Otherwise, and
+    for the files found when it starts, a file is ready once its size and
+    modification time didn't change for stable_time seconds, checked every
+    poll_interval seconds. Hidden files and directories are ignored.
+    """
+
+    def __init__(self, path, on_report, poll_interval=1, stable_time=STABLE_TIME,
+                 use_inotify=True):
+        threading.Thread.__init__(self, name="ReportWatcherThread")
+        self.daemon = True
+        self.path = path
+        self.on_report = on_report
+        self.poll_interval = poll_interval
+        self.stable_time = stable_time
+        self._stop_event = threading.Event()
+        # filename -> (signature, time the signature was first seen)
+        self._candidates = {}
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = Inotify(path)
+            except (OSError, AttributeError) as ex:
+                logger.info('Can not use inotify on %s, polling it instead: %s', path, ex)
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def scan(self):
+        """Look for new files in the folder, they are reported once they
+        are stable."""
+        try:
+            entries = list(os.scandir(self.path))
+        except OSError as ex:
+            logger.warning('Can not list the reports folder %s: %s', self.path, ex)
+            return
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            if entry.path not in self._candidates:
+                self._candidates[entry.path] = (None, 0)
+        self._check_candidates()
+
+    def _check_candidates(self):
+        now = time.time()
+        for filename, (last_signature, since) in list(self._candidates.items()):
+            signature = _file_signature(filename)
+            if signature is None:
+                del self._candidates[filename]
+            elif signature != last_signature:
+                self._candidates[filename] = (signature, now)
+            elif now - since >= self.stable_time:
+                del self._candidates[filename]
+                self._report(filename)
+
+    def _report(self, filename):
+        self._candidates.pop(filename, None)
+        try:
+            self.on_report(filename)
+        except Exception:
+            logger.exception('Error handling report %s', filename)
+
+    def run(self):
+        self.scan()
+        try:
+            while not self._stop_event.is_set():
+                if self._inotify is None:
+                    self._stop_event.wait(self.poll_interval)
+                    self.scan()
+                    continue
+                names = self._inotify.read(self.poll_interval if self._candidates else 1)
+                if names is None:
+                    logger.info('inotify events lost, rescanning %s', self.path)
+                    self.scan()
+                    continue
+                for name in names:
+                    filename = os.path.join(self.path, name)
+                    if not name.startswith('.') and os.path.isfile(filename):
+                        self._report(filename)
+                if self._candidates:
+                    self._check_candidates()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+
+
+# I'm Py3
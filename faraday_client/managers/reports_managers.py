@@ -11,9 +11,11 @@ import traceback
 import logging
 
 from random import random
-from threading import Thread, Timer
+from collections import deque
+from threading import Thread, Timer, Condition, Event
 
 from faraday_client.config.configuration import getInstanceConfiguration
+from faraday_client.managers.report_watcher import ReportWatcher, ProcessedReports
 
 CONF = getInstanceConfiguration()
 
@@ -104,19 +106,197 @@ class ReportProcessor:
         return command_id
 
 
+class ReportJob:
+    """The processing of one report by a ReportWorkerPool.
+
+    state goes from PENDING to RUNNING and then to DONE or FAILED, or from
+    PENDING to CANCELLED if it's cancelled before a worker takes it.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, filename, process, key=None, on_finish=None):
+        self.filename = filename
+        self.key = key
+        self.state = self.PENDING
+        self.result = None
+        self.error = None
+        self.queued_time = time.time()
+        self.start_time = None
+        self.end_time = None
+        self._process = process
+        self._on_finish = on_finish
+        self._finished = Event()
+
+    def is_finished(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """Wait until the job is finished. Return False on timeout."""
+        return self._finished.wait(timeout)
+
+    def _run(self):
+        self.start_time = time.time()
+        try:
+            self.result = self._process()
+            self.state = self.DONE
+        except Exception as ex:
+            logger.error("Error processing report %s\n%s", self.filename, traceback.format_exc())
+            self.error = ex
+            self.state = self.FAILED
+        self.end_time = time.time()
+        self._finish()
+
+    def _finish(self):
+        if self._on_finish is not None:
+            try:
+                self._on_finish(self)
+            except Exception:
+                logger.error("Error finishing report %s\n%s", self.filename, traceback.format_exc())
+        self._finished.set()
+
+
+class ReportWorkerPool:
+    """Processes reports with up to max_workers threads, so a big report
+    doesn't block the ones queued after it.
+
+    Jobs with the same key are processed one at a time, in the order they
+    were submitted. Jobs without a key, or with different keys, run in
+    parallel.
+    """
+
+    def __init__(self, max_workers=None, name="ReportWorker"):
+        self.max_workers = max_workers or CONF.getReportWorkers()
+        self.name = name
+        self._condition = Condition()
+        self._pending = deque()
+        self._running = []
+        self._running_keys = set()
+        self._workers = []
+        self._stopped = False
+
+    def submit(self, filename, process, key=None, on_finish=None):
+        """Queue the processing of filename. process is called without
+        arguments by a worker and its return value is kept as the job's
+        result. on_finish is called with the job once it is finished.
+
+        Return the ReportJob.
+        """
+        job = ReportJob(filename, process, key, on_finish)
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("The report worker pool was shut down")
+            self._pending.append(job)
+            if len(self._workers) < self.max_workers:
+                worker = Thread(target=self._work,
+                                name="{0}-{1}".format(self.name, len(self._workers)))
+                worker.daemon = True
+                self._workers.append(worker)
+                worker.start()
+            self._condition.notify()
+        return job
+
+    def jobs(self):
+        """Return the jobs not finished yet, running ones first."""
+        with self._condition:
+            return list(self._running) + list(self._pending)
+
+    def has_job(self, filename):
+        return any(job.filename == filename for job in self.jobs())
+
+    def progress(self):
+        """Return a dictionary with the amount of pending and running jobs."""
+        with self._condition:
+            return {'pending': len(self._pending), 'running': len(self._running)}
+
+    def cancel(self, filename=None):
+        """Cancel the pending jobs of filename, or every pending job if
+        filename is None. Running jobs can't be cancelled.
+
+        Return the cancelled jobs.
+        """
+        with self._condition:
+            cancelled = [job for job in self._pending
+                         if filename is None or job.filename == filename]
+            for job in cancelled:
+                self._pending.remove(job)
+                job.state = ReportJob.CANCELLED
+            self._condition.notify_all()
+        for job in cancelled:
+            job._finish()
+        return cancelled
+
+    def wait(self, timeout=None):
+        """Wait until every submitted job is finished. Return False on
+        timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while self._pending or self._running:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self, cancel_pending=True, wait=True):
+        """Stop the workers once they finish their current job."""
+        if cancel_pending:
+            self.cancel()
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+            workers = list(self._workers)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def _take_job(self):
+        """Return the first pending job whose key isn't being processed,
+        None if the pool was stopped."""
+        with self._condition:
+            while True:
+                for job in self._pending:
+                    if job.key is None or job.key not in self._running_keys:
+                        self._pending.remove(job)
+                        self._running.append(job)
+                        if job.key is not None:
+                            self._running_keys.add(job.key)
+                        job.state = ReportJob.RUNNING
+                        return job
+                if self._stopped and not self._pending:
+                    return None
+                self._condition.wait()
+
+    def _work(self):
+        while True:
+            job = self._take_job()
+            if job is None:
+                return
+            job._run()
+            with self._condition:
+                self._running.remove(job)
+                self._running_keys.discard(job.key)
+                self._condition.notify_all()
+
+
 class ReportManager(Thread):
 
-    def __init__(self, timer, ws_name, plugin_controller, polling=True):
+    def __init__(self, timer, ws_name, plugin_controller, polling=True, workers=None):
         Thread.__init__(self, name="ReportManagerThread")
         self.setDaemon(True)
         self.polling = polling
         self.ws_name = ws_name
         self.timer = timer
         self._must_stop = False
+        self._stop_event = Event()
         self._report_path = os.path.join(CONF.getReportPath(), ws_name)
         self._report_ppath = os.path.join(self._report_path, "process")
         self._report_upath = os.path.join(self._report_path, "unprocessed")
         self.processor = ReportProcessor(plugin_controller, ws_name)
+        self.pool = ReportWorkerPool(workers)
         self.online_plugins = OnlinePlugins(plugin_controller)
         if not os.path.exists(self._report_path):
             os.mkdir(self._report_path)
@@ -124,51 +304,88 @@ class ReportManager(Thread):
             os.mkdir(self._report_ppath)
         if not os.path.exists(self._report_upath):
             os.mkdir(self._report_upath)
+        self.processed_reports = ProcessedReports(
+            os.path.join(self._report_path, ".processed_reports.json"))
 
     def run(self):
         self.online_plugins.start()
-        tmp_timer = .0
-        while not self._must_stop:
-            time.sleep(.1)
-            tmp_timer += .1
-            if tmp_timer >= self.timer:
-                try:
-                    self.syncReports()
-                    if not self.polling:
-                        break
-                except Exception:
-                    logger.error("An exception was captured while saving reports\n%s", traceback.format_exc())
-                finally:
-                    tmp_timer = 0
+        if not self.polling:
+            try:
+                self.syncReports()
+                self.pool.wait()
+            except Exception:
+                logger.error("An exception was captured while saving reports\n%s", traceback.format_exc())
+            return
+        # created here, so its inotify descriptor is only opened by a
+        # running manager and closed when the watcher stops. The folder is
+        # polled every timer seconds when there are no file notifications
+        watcher = ReportWatcher(self._report_path, self.queueReport,
+                                poll_interval=self.timer)
+        watcher.start()
+        self._stop_event.wait()
+        watcher.stop()
 
     def stop(self):
         self._must_stop = True
+        self._stop_event.set()
         self.online_plugins.stop()
+        # reports not started yet are left in the folder for the next time
+        self.pool.shutdown(wait=False)
 
     def syncReports(self):
         """
-        Synchronize report directory using the DataManager and Plugins online
-        We first make sure that all shared reports were added to the repo
+        Queue every report in the report directory, without waiting for
+        the watcher to find them
         """
-        for root, dirs, files in os.walk(self._report_path, False):
+        for name in sorted(os.listdir(self._report_path)):
+            filename = os.path.join(self._report_path, name)
             # skip processed and unprocessed directories
-            if root == self._report_path:
-                for name in files:
-                    filename = os.path.join(root, name)
-                    name = os.path.basename(filename)
-                    # If plugin not is detected... move to unprocessed
-                    # PluginCommiter will rename the file to processed or unprocessed
-                    # when the plugin finishes
-                    if self.processor.processReport(filename) is False:
-                        logger.info('Plugin not detected. Moving {0} to unprocessed'.format(filename))
-                        os.rename(filename, os.path.join(self._report_upath, name))
-                    else:
-                        logger.info("Detected valid report {%s}", filename)
-                        os.rename(filename, os.path.join(self._report_ppath, name))
+            if name.startswith('.') or not os.path.isfile(filename):
+                continue
+            self.queueReport(filename)
+
+    def queueReport(self, filename):
+        """Queue a report found in the report directory, unless it's
+        already queued or it was processed before a restart"""
+        if self.pool.has_job(filename):
+            return None
+        if filename in self.processed_reports:
+            logger.info("Report %s was already processed", filename)
+            self._move_report_file(filename, processed=True)
+            return None
+        return self.pool.submit(filename,
+                                lambda: self.processor.processReport(filename),
+                                key=filename,
+                                on_finish=self._move_report)
+
+    def _move_report(self, job):
+        """Move the report of a finished job to the processed or
+        unprocessed directory"""
+        if job.state == ReportJob.CANCELLED:
+            return
+        # If plugin not is detected... move to unprocessed
+        if job.state != ReportJob.DONE or job.result is False:
+            logger.info('Plugin not detected. Moving {0} to unprocessed'.format(job.filename))
+            self._move_report_file(job.filename, processed=False)
+        else:
+            logger.info("Detected valid report {%s}", job.filename)
+            self.processed_reports.add(job.filename)
+            self._move_report_file(job.filename, processed=True)
+
+    def _move_report_file(self, filename, processed):
+        name = os.path.basename(filename)
+        destination = self._report_ppath if processed else self._report_upath
+        try:
+            os.rename(filename, os.path.join(destination, name))
+        except OSError as ex:
+            logger.error("Could not move report %s: %s", filename, ex)
 
     def sendReportToPluginById(self, plugin_id, filename):
-        """Sends a report to be processed by the specified plugin_id"""
-        self.processor.sendReport(plugin_id, filename)
+        """Queues a report to be processed by the specified plugin_id.
+        Return the ReportJob"""
+        return self.pool.submit(filename,
+                                lambda: self.processor.sendReport(plugin_id, filename),
+                                key=filename)
 
 
 class ReportAnalyzer:
@@ -9,6 +9,8 @@ import time
 
 from faraday_client.model.workspace import Workspace
 from faraday_client.persistence.server.models import create_workspace, get_workspaces_names, get_workspace, delete_workspace
+from faraday_client.persistence.server.identity_map import discard_identity_maps
+from faraday_client.persistence.server.workspace_stats import discard_workspace_stats
 from faraday_client.persistence.server.server_io_exceptions import Unauthorized
 from faraday_client.model.guiapi import notification_center
 
@@ -70,6 +72,9 @@ class WorkspaceManager:
         except Exception as e:
             notification_center.DBConnectionProblem(e)
             raise WorkspaceException(str(e))
+        # objects cached for the previous workspace won't be used anymore
+        discard_identity_maps()
+        discard_workspace_stats()
         self.mappersManager.createMappers(name)
         self.setActiveWorkspace(workspace)
         notification_center.workspaceChanged(workspace)
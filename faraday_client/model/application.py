@@ -137,11 +137,14 @@ class MainApplication:
         faraday_client.model.api.devlog("stopping model controller thread...")
         faraday_client.model.api.stopAPIServer()
         restapi.stopServer()
+        faraday_client.model.api.devlog("sending the queued shell commands...")
+        self._plugin_controller.stop()
         self._model_controller.stop()
         if self._model_controller.isAlive():
             # runs only if thread has started, i.e. self._model_controller.start() is run first
             self._model_controller.join()
         faraday_client.model.api.devlog("Waiting for controller threads to end...")
+        CONF.flushConfig()
         return exit_code
 
     def quit(self):
@@ -0,0 +1,202 @@
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import time
+import logging
+from itertools import count
+from collections import OrderedDict
+
+from faraday_client.persistence.server import models
+from faraday_client.persistence.server.utils import (
+    get_bulk_create_host_properties,
+    get_bulk_create_service_properties,
+    get_bulk_create_vuln_properties,
+    get_bulk_create_credential_properties,
+)
+
+logger = logging.getLogger(__name__)
+
+PENDING_ID_PREFIX = 'pending-'
+
+_pending_ids = count(1)
+
+
+def new_pending_id():
+    """Return a new provisional ID for an object the server doesn't
+    know yet."""
+    return '{0}{1}'.format(PENDING_ID_PREFIX, next(_pending_ids))
+
+
+def is_pending_id(obj_id):
+    """True if obj_id was given by a BulkCreateBatch and the object
+    may still not exist on the server."""
+    return isinstance(obj_id, str) and obj_id.startswith(PENDING_ID_PREFIX)
+
+
+class BulkCreateBatch:
+    """Collects objects waiting to be created so they can be sent to the
+    server's bulk_create endpoint in one request.
+
+    Objects added to the batch get a provisional (pending) ID, so the
+    plugin creating them doesn't have to wait for the server to use it as
+    the parent of the next object. Children are nested inside their parents
+    when the payload is built, that's how bulk_create keeps the parent/child
+    relations without knowing the server IDs.
+
+    Newer servers answer with the IDs they gave the objects, match_results
+    pairs them with the objects sent. With older servers the objects keep
+    their pending ID until someone needs the real one (see
+    ModelController._resolve_pending_id). Only objects without a command
+    are batched.
+    """
+
+    BULK_CLASSES = (models.Host.class_signature,
+                    models.Service.class_signature,
+                    models.Vuln.class_signature,
+                    models.VulnWeb.class_signature,
+                    models.Credential.class_signature)
+
+    def __init__(self, max_size, window, max_known_objects=10000):
+        self.max_size = max_size
+        self.window = window
+        self.max_known_objects = max_known_objects
+        self._items = []
+        self._first_item_time = None
+        # pending id -> object, for every object that went through the batch.
+        # Objects created in a later batch may use them as parents.
+        self._known_objects = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def accepts(self, obj):
+        """True if obj can be sent with bulk_create: hosts always can,
+        the rest only when its parent also went through the batch."""
+        if obj.class_signature == models.Host.class_signature:
+            return True
+        if obj.class_signature not in self.BULK_CLASSES:
+            return False
+        return self._find_host(obj) is not None
+
+    def add(self, obj):
+        pending_id = new_pending_id()
+        obj.setID(pending_id)
+        self._known_objects[pending_id] = obj
+        while len(self._known_objects) > self.max_known_objects:
+            self._known_objects.popitem(last=False)
+        if not self._items:
+            self._first_item_time = time.time()
+        self._items.append(obj)
+        return pending_id
+
+    def get_known_object(self, pending_id):
+        return self._known_objects.get(pending_id)
+
+    def is_waiting(self, obj):
+        """True if obj is in the batch and wasn't sent yet."""
+        return any(item is obj for item in self._items)
+
+    def is_full(self):
+        return len(self._items) >= self.max_size
+
+    def time_left(self):
+        """Seconds until the batch must be sent, None if it's empty."""
+        if not self._items:
+            return None
+        return max(0, self._first_item_time + self.window - time.time())
+
+    def is_due(self):
+        return bool(self._items) and (self.is_full() or self.time_left() == 0)
+
+    def take(self):
+        """Return the pending objects, in the order they were added, and
+        empty the batch."""
+        items, self._items = self._items, []
+        self._first_item_time = None
+        return items
+
+    def build_hosts(self, objects, entries=None):
+        """Return the list of host dictionaries for bulk_create with every
+        object of objects nested inside its host.
+
+        Parents created in a previous batch are sent again to nest the new
+        children; bulk_create reuses existing hosts and services.
+
+        If entries is a dictionary it's filled with the object of objects
+        each host dictionary (or nested one) was built from, keyed by the
+        dictionary's id(), for match_results.
+        """
+        if entries is None:
+            entries = {}
+        hosts = OrderedDict()
+        services = {}
+
+        def host_entry(host):
+            if host.getID() not in hosts:
+                hosts[host.getID()] = get_bulk_create_host_properties(host)
+            return hosts[host.getID()]
+
+        def service_entry(service):
+            if service.getID() not in services:
+                parent = self._known_objects[service.getParent()]
+                services[service.getID()] = get_bulk_create_service_properties(service)
+                host_entry(parent)['services'].append(services[service.getID()])
+            return services[service.getID()]
+
+        def parent_entry(obj):
+            parent = self._known_objects[obj.getParent()]
+            if parent.class_signature == models.Service.class_signature:
+                return service_entry(parent)
+            return host_entry(parent)
+
+        for obj in objects:
+            signature = obj.class_signature
+            if signature == models.Host.class_signature:
+                entry = host_entry(obj)
+            elif signature == models.Service.class_signature:
+                entry = service_entry(obj)
+            elif signature == models.Credential.class_signature:
+                entry = get_bulk_create_credential_properties(obj)
+                parent_entry(obj)['credentials'].append(entry)
+            else:
+                entry = get_bulk_create_vuln_properties(obj)
+                parent_entry(obj)['vulnerabilities'].append(entry)
+            entries[id(entry)] = obj
+        return list(hosts.values())
+
+    @staticmethod
+    def match_results(hosts, results, entries):
+        """Return a list of (object, result) pairs with the result the
+        server gave to every object sent, parents before their children.
+
+        hosts and entries are the ones of build_hosts, results the 'hosts'
+        of the bulk_create answer, nested and ordered like hosts. Parents
+        sent again only to nest their children are left out.
+        """
+        matches = []
+
+        def match(sent, answered):
+            for entry, result in zip(sent, answered):
+                obj = entries.get(id(entry))
+                if obj is not None:
+                    matches.append((obj, result))
+                for key in ('services', 'vulnerabilities', 'credentials'):
+                    match(entry.get(key) or [], result.get(key) or [])
+
+        match(hosts, results)
+        return matches
+
+    def _find_host(self, obj):
+        while obj is not None and obj.class_signature != models.Host.class_signature:
+            if not is_pending_id(obj.getParent()):
+                return None
+            obj = self._known_objects.get(obj.getParent())
+        return obj
+
+
+# I'm Py3
@@ -6,16 +6,28 @@ See the file 'doc/LICENSE' for the license information
 """
 from __future__ import absolute_import
 
+import time
 import socket
+import logging
 import subprocess
 import getpass
 from faraday_client.config.configuration import getInstanceConfiguration
 CONF = getInstanceConfiguration()
 
 
-from threading import Event
+from threading import Event, Lock, Thread
 from sys import platform as _platform
 
+logger = logging.getLogger(__name__)
+
+# Seconds the private ip and hostname of this machine are reused before
+# looking them up again
+HOST_IDENTITY_REFRESH_INTERVAL = 300
+# rtnetlink(7) multicast groups notifying link and address changes
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
 
 def get_private_ip():
     """
@@ -58,6 +70,106 @@ def get_user():
     return user
 
 
+def _open_network_changes_socket():
+    """Return a non blocking rtnetlink socket which receives a message every
+    time a network interface or address changes, None if it's not available."""
+    if not hasattr(socket, 'AF_NETLINK'):
+        return None
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, 0)  # NETLINK_ROUTE
+        sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+        sock.setblocking(False)
+    except OSError as ex:
+        logger.debug('Can not listen to network changes: %s', ex)
+        return None
+    return sock
+
+
+class HostIdentity:
+    """Private ip and hostname of this machine, shared by every
+    CommandRunInformation. get_private_ip may do DNS lookups and run a
+    shell, it's too slow to call it for every command.
+
+    They are looked up the first time and then again, in the background,
+    when they are older than refresh_interval or when the network
+    addresses changed. The last values are used until then.
+    """
+
+    def __init__(self, refresh_interval=HOST_IDENTITY_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self._lock = Lock()
+        self._ready = Event()
+        self._refreshing = False
+        self._updated = None
+        self._ip = ''
+        self._hostname = ''
+        self._network_changes = _open_network_changes_socket()
+
+    def get(self):
+        """Return the (ip, hostname) of this machine."""
+        if not self._ready.is_set():
+            self.refresh_async()
+            self._ready.wait()
+        elif self._network_changed() or \
+                time.time() - self._updated >= self.refresh_interval:
+            self.refresh_async()
+        return self._ip, self._hostname
+
+    def invalidate(self):
+        """Look up the values again, i.e. when the network changed."""
+        self.refresh_async()
+
+    def refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        Thread(target=self.refresh, name="HostIdentityRefreshThread", daemon=True).start()
+
+    def refresh(self):
+        try:
+            hostname = get_hostname()
+            ip = get_private_ip()
+            if isinstance(ip, bytes):
+                ip = ip.decode('utf8', 'replace').strip()
+            self._ip, self._hostname = ip, hostname
+        except (OSError, subprocess.SubprocessError) as ex:
+            logger.warning('Could not get the private ip of this machine: %s', ex)
+        finally:
+            with self._lock:
+                self._updated = time.time()
+                self._refreshing = False
+            self._ready.set()
+
+    def _network_changed(self):
+        if self._network_changes is None:
+            return False
+        changed = False
+        try:
+            while self._network_changes.recv(65536):
+                changed = True
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as ex:
+            # i.e. ENOBUFS: messages were lost, so something changed
+            logger.debug('Error reading network changes: %s', ex)
+            changed = True
+        return changed
+
+
+_host_identity = None
+_host_identity_lock = Lock()
+
+
+def get_host_identity():
+    """Return the HostIdentity shared by the whole client."""
+    global _host_identity
+    with _host_identity_lock:
+        if _host_identity is None:
+            _host_identity = HostIdentity()
+    return _host_identity
+
+
 class CommandRunInformation:
     """Command Run information object containing:
         command, parameters, time, workspace, etc."""
@@ -66,8 +178,7 @@ class CommandRunInformation:
     def __init__(self, **kwargs):
         self.type = self.__class__.__name__
         self.user = get_user()
-        self.ip = get_private_ip()
-        self.hostname = get_hostname()
+        self.ip, self.hostname = get_host_identity().get()
         self.itime = None
         self.duration = None
         self.params = None
@@ -16,6 +16,7 @@ from threading import Thread
 
 from faraday_client.config.configuration import getInstanceConfiguration
 from faraday_client.model import Modelactions
+from faraday_client.model.bulk import BulkCreateBatch, is_pending_id
 from faraday_client.persistence.server.server_io_exceptions import ConflictInDatabase
 import faraday_client.model.api as api
 from faraday_client.model.guiapi import notification_center as notifier
@@ -29,15 +30,26 @@ from faraday_client.persistence.server import models
 CONF = getInstanceConfiguration()
 logger = logging.getLogger(__name__)
 
+# Max amount of objects sent in one bulk_create request and max seconds
+# an object waits in the batch. A batch size of 1 disables batching.
+BULK_CREATE_BATCH_SIZE = 250
+BULK_CREATE_WINDOW = 1.0
+
 
 class ModelController(Thread):
 
-    def __init__(self, mappers_manager, pending_actions):
+    def __init__(self, mappers_manager, pending_actions,
+                 batch_size=BULK_CREATE_BATCH_SIZE, batch_window=BULK_CREATE_WINDOW):
         #Thread.__init__(self)
         super().__init__(name="ModelControllerThread")
 
         self.mappers_manager = mappers_manager
 
+        # add actions waiting to be sent together to bulk_create
+        self._add_batch = None
+        if batch_size > 1:
+            self._add_batch = BulkCreateBatch(batch_size, batch_window)
+
         # set as daemon
 #        self.setDaemon(True)
         # sets the flag to stop the thread when it has finished processing
@@ -201,6 +213,10 @@ class ModelController(Thread):
                    (action, str(parameters)))
 
         action_callback = self._actionDispatcher[action]
+        if action_callback != self.__add:
+            # objects waiting in the batch must be created before
+            # anything else can modify or use them
+            self.flushAddBatch()
         res = self._dispatchActionWithLock(action_callback, *parameters)
 
         # finally we notify the widgets about this change
@@ -277,10 +293,12 @@ class ModelController(Thread):
                 # sleep the thread execution for a moment to let others work
                 # XXX: check if this time is not too much...
                 time.sleep(0.01)
+        self.flushAddBatch()
 
     def processAllPendingActions(self):
         for _ in range(self._pending_actions.qsize()):
             self.processAction()
+        self.flushAddBatch()
 
     def processAction(self):
         # check the queue for new actions
@@ -288,7 +306,10 @@ class ModelController(Thread):
         try:
             # get new action or timeout (in secs)
             # TODO: timeout should be set through config
-            current_action = self._pending_actions.get(timeout=2)
+            timeout = 2
+            if self._add_batch is not None and len(self._add_batch):
+                timeout = min(timeout, self._add_batch.time_left())
+            current_action = self._pending_actions.get(timeout=timeout)
             action = current_action[0]
             parameters = current_action[1:]
             # dispatch the action
@@ -302,6 +323,56 @@ class ModelController(Thread):
             logger.debug(
                 "something strange happened... unhandled exception?")
             logger.debug(traceback.format_exc())
+        if self._add_batch is not None and self._add_batch.is_due():
+            self.flushAddBatch()
+
+    def flushAddBatch(self):
+        """Send every object waiting in the add batch to the server."""
+        if self._add_batch is not None and len(self._add_batch):
+            self._dispatchActionWithLock(self._sendAddBatch)
+
+    def _sendAddBatch(self):
+        objects = self._add_batch.take()
+        entries = {}
+        try:
+            hosts = self._add_batch.build_hosts(objects, entries)
+            answer = self.mappers_manager.bulk_save(hosts)
+        except Exception as ex:
+            # the objects are created one by one, so each conflict
+            # goes through the usual merge process
+            logger.warning('Could not send %d objects with bulk_create (%s). '
+                           'Sending them one by one', len(objects), ex)
+            for obj in objects:
+                try:
+                    self._add_now(obj)
+                except Exception:
+                    # already logged by _add_now
+                    pass
+        else:
+            results = answer.get('hosts') if isinstance(answer, dict) else None
+            if not results:
+                # older servers don't answer with the IDs: the objects keep
+                # their pending ID and the GUI gets them from the changes
+                # stream, with the real one
+                return True
+            for obj, result in self._add_batch.match_results(hosts, results, entries):
+                self._apply_bulk_result(obj, result)
+        return True
+
+    def _apply_bulk_result(self, obj, result):
+        """Give obj the ID bulk_create answered with. Objects the server
+        already had are merged like the conflicts of a single create."""
+        if result.get('id') is None:
+            return
+        obj.setID(result['id'])
+        parent = self._add_batch.get_known_object(obj.getParent())
+        if parent is not None and not is_pending_id(parent.getID()):
+            obj.setParent(parent.getID())
+        if result.get('created', True) or not result.get('object'):
+            notifier.addObject(obj)
+            return
+        old_obj = obj.__class__(result['object'], obj._workspace_name)
+        self._handle_conflict(old_obj, obj, None)
 
     def sync_lock(self):
         self._sync_api_request = True
@@ -361,16 +432,72 @@ class ModelController(Thread):
         if not old_obj.needs_merge(new_obj): return True
         return self.addUpdate(old_obj, new_obj, command_id)
 
+    def _record_controller_action(self, obj, action):
+        """Store in the metadata of obj the controller call which is
+        saving it. Metadata coming from the server is a dictionary and
+        it's sent back untouched."""
+        metadata = obj.getMetadata()
+        if isinstance(metadata, models.Metadata):
+            metadata.update_controller_action = 'ModelControler.' + action
+
     def __add(self, new_obj, command_id=None, *args):
         """
             This method sends requests to the faraday-server.
+            Objects that can be created with bulk_create are queued
+            in the add batch and sent later by flushAddBatch. The ones
+            of a command are sent one by one, bulk_create can't link
+            them to it.
 
         :param new_obj:
         :param command_id:
         :param args:
         :return:
         """
+        self._record_controller_action(new_obj, '__add')
+        if command_id is None and self._add_batch is not None and self._add_batch.accepts(new_obj):
+            self._add_batch.add(new_obj)
+            if self._add_batch.is_full():
+                self._sendAddBatch()
+            return True
+        return self._add_now(new_obj, command_id)
+
+    def _resolve_pending_id(self, obj_id):
+        """Return the server ID of the object which got the pending obj_id
+        when it was batched, None if it's unknown. Other IDs are returned
+        as they are.
+
+        Sending the batch writes the server IDs back to the batched
+        objects, which keep the pending -> real mapping for the next
+        lookups. Older servers don't answer bulk_create with the IDs, then
+        the object is created again on its own the first time the real ID
+        is needed: the server answers with a conflict holding the existing
+        object.
+        """
+        if not is_pending_id(obj_id):
+            return obj_id
+        obj = self._add_batch.get_known_object(obj_id) if self._add_batch is not None else None
+        if obj is None:
+            return None
+        if self._add_batch.is_waiting(obj):
+            self._sendAddBatch()
+        if is_pending_id(obj.getID()):
+            self._add_now(obj)
+        return obj.getID()
+
+    def _resolve_pending_parent(self, new_obj):
+        """If the parent of new_obj only has a pending ID, create it
+        (or find it) in the server and use its real ID."""
+        parent_id = new_obj.getParent()
+        if not is_pending_id(parent_id):
+            return
+        server_id = self._resolve_pending_id(parent_id)
+        if server_id is None:
+            raise RuntimeError('Unknown parent {0}'.format(parent_id))
+        new_obj.setParent(server_id)
+
+    def _add_now(self, new_obj, command_id=None):
         try:
+            self._resolve_pending_parent(new_obj)
             self._save_new_object(new_obj, command_id)
         except ConflictInDatabase as conflict:
             old_obj = new_obj.__class__(conflict.answer.json()['object'], new_obj._workspace_name)
@@ -382,12 +509,23 @@ class ModelController(Thread):
             raise
 
     def __edit(self, obj, command_id=None, *args, **kwargs):
+        if is_pending_id(obj.getID()):
+            server_id = self._resolve_pending_id(obj.getID())
+            if server_id is None:
+                # not known by the batch anymore, its conflict tells us
+                self._add_now(obj, command_id)
+            else:
+                obj.setID(server_id)
         obj.updateAttributes(*args, **kwargs)
+        self._record_controller_action(obj, '__edit')
         self.mappers_manager.update(obj, command_id)
         notifier.editHost(obj)
         return True
 
     def __del(self, objId, *args):
+        objId = self._resolve_pending_id(objId)
+        if objId is None:
+            return False
         obj = self.mappers_manager.find(objId)
         if obj:
             obj_parent = obj.getParent()
@@ -14,8 +14,10 @@ import os
 from past.builtins import basestring
 
 import json
+import time
 import logging
 import threading
+from collections import OrderedDict
 from queue import Queue, Empty
 import requests
 import websocket
@@ -25,8 +27,84 @@ from urllib.parse import urlparse
 from faraday_client.persistence.server.server_io_exceptions import (
     ChangesStreamStoppedAbruptly
 )
+from faraday_client.persistence.server.identity_map import apply_change
+from faraday_client.persistence.server import workspace_stats
 logger = logging.getLogger(__name__)
 
+# Max amount of messages taken from the queue at once
+CHANGES_BATCH_SIZE = 500
+# Seconds a change may wait in the queue before we warn we are behind
+CHANGES_LAG_WARNING = 5
+# Seconds between two lag warnings
+CHANGES_LAG_WARNING_INTERVAL = 30
+# Port of the websockets server when it is not behind the https server
+WEBSOCKETS_PORT = 9000
+
+
+def coalesce_changes(changes):
+    """Take a list of changes as they came from the server and return
+    a new one with at most one change per object, keeping the position
+    of the first change of each object.
+
+    A CREATE followed by UPDATEs is still a CREATE, a DELETE makes the
+    previous changes useless and an object created and deleted in the
+    same batch is not reported at all. Changes that don't refer to an
+    object are kept as they are.
+    """
+    coalesced = OrderedDict()
+    for position, change in enumerate(changes):
+        if not isinstance(change, dict) or change.get('id') is None:
+            coalesced[position] = change
+            continue
+        key = (change.get('type'), str(change['id']))
+        previous = coalesced.get(key)
+        if previous is None:
+            coalesced[key] = change
+            continue
+        action = change.get('action')
+        previous_action = previous.get('action')
+        if previous_action == 'CREATE' and action == 'DELETE':
+            del coalesced[key]
+        elif previous_action == 'CREATE':
+            coalesced[key] = dict(change, action='CREATE')
+        elif previous_action == 'DELETE' and action == 'CREATE':
+            # the GUI still has the deleted object
+            coalesced[key] = dict(change, action='UPDATE')
+        else:
+            coalesced[key] = change
+    return list(coalesced.values())
+
+
+class ChangesStreamStats:
+    """Counters of a changes stream, to know if we are falling behind
+    the server.
+
+    lag is the amount of seconds the oldest change of the last batch
+    waited in the queue.
+    """
+
+    def __init__(self, changes_queue):
+        self._changes_queue = changes_queue
+        self.received = 0
+        self.delivered = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.lag = 0
+        self.max_lag = 0
+
+    @property
+    def queue_depth(self):
+        return self._changes_queue.qsize()
+
+    def as_dict(self):
+        return {'received': self.received,
+                'delivered': self.delivered,
+                'coalesced': self.coalesced,
+                'batches': self.batches,
+                'queue_depth': self.queue_depth,
+                'lag': self.lag,
+                'max_lag': self.max_lag}
+
 
 class ChangesStream:
 
@@ -82,9 +160,11 @@ class WebsocketsChangesStream(ChangesStream):
     def __init__(self, workspace_name, server_url, **params):
         server_url_info = urlparse(server_url)
         self.changes_queue = Queue()
+        self.stats = ChangesStreamStats(self.changes_queue)
+        self._last_lag_warning = 0
         self.workspace_name = workspace_name
         self._response = None
-        ws_port = 9000
+        ws_port = WEBSOCKETS_PORT
         self._base_url = server_url_info.hostname
         ws_kwargs = {'ping_interval': 30}
         if server_url_info.scheme == "https":
@@ -111,12 +191,14 @@ class WebsocketsChangesStream(ChangesStream):
         else:
             websockets_url = f"ws://{server_url_info.hostname}:{ws_port}/"
         logger.info('Connecting to websocket url %s', websockets_url)
+        # websocket-client passes the WebSocketApp as the first argument
+        # of the callbacks since 0.58 and not before, so it is dropped here
         self.ws = websocket.WebSocketApp(
                 websockets_url,
-                on_message=self.on_message,
-                on_error=self.on_error,
-                on_open=self.on_open,
-                on_close=self.on_close
+                on_message=lambda *args: self.on_message(args[-1]),
+                on_error=lambda *args: self.on_error(args[-1]),
+                on_open=lambda *args: self.on_open(),
+                on_close=lambda *args: self.on_close()
         )
         # ws.run_forever will call on_message, on_error, on_close and on_open
         # see websocket client python docs on:
@@ -127,6 +209,7 @@ class WebsocketsChangesStream(ChangesStream):
 
     def stop(self):
         self.ws.close()
+        workspace_stats.get_workspace_stats(self.workspace_name).follow(False)
         super(WebsocketsChangesStream, self).stop()
 
     def on_open(self):
@@ -142,16 +225,26 @@ class WebsocketsChangesStream(ChangesStream):
             'workspace': self.workspace_name,
             'token': token,
         }))
+        # from now on the counters of the summary are updated by the changes
+        workspace_stats.get_workspace_stats(self.workspace_name).follow()
 
     def on_message(self, message):
         logger.debug('New message {0}'.format(message))
-        self.changes_queue.put(message)
+        self.stats.received += 1
+        try:
+            change = json.loads(message)
+        except ValueError:
+            logger.debug('Could not decode change {0}'.format(message))
+            return
+        apply_change(self.workspace_name, change)
+        workspace_stats.apply_change(self.workspace_name, change)
+        self.changes_queue.put((time.time(), change))
 
-    def on_error(ws, error):
+    def on_error(self, error):
         logger.error('Websocket connection error: {0}'.format(error))
 
     def on_close(self):
-        pass
+        workspace_stats.get_workspace_stats(self.workspace_name).follow(False)
 
     def __enter__(self):
         return self
@@ -163,11 +256,45 @@ class WebsocketsChangesStream(ChangesStream):
         return self
 
     def __iter__(self):
+        for change in self.get_changes():
+            yield change
+
+    def get_changes(self, max_changes=CHANGES_BATCH_SIZE, timeout=0):
+        """Return the changes waiting in the queue, at most max_changes
+        of them, coalesced with coalesce_changes.
+
+        Waits up to timeout seconds for the first change, return an
+        empty list if none came.
+        """
+        messages = []
         try:
-            data = json.loads(self.changes_queue.get_nowait())
+            if timeout:
+                messages.append(self.changes_queue.get(timeout=timeout))
+            while len(messages) < max_changes:
+                messages.append(self.changes_queue.get_nowait())
         except Empty:
-            return
-        yield data
+            pass
+        if not messages:
+            return []
+
+        coalesced_changes = coalesce_changes([change for _, change in messages])
+        self._update_stats(messages[0][0], len(messages), len(coalesced_changes))
+        return coalesced_changes
+
+    def _update_stats(self, oldest_change_time, taken, delivered):
+        now = time.time()
+        stats = self.stats
+        stats.batches += 1
+        stats.delivered += delivered
+        stats.coalesced += taken - delivered
+        stats.lag = now - oldest_change_time
+        stats.max_lag = max(stats.max_lag, stats.lag)
+        if stats.lag > CHANGES_LAG_WARNING and \
+                now - self._last_lag_warning > CHANGES_LAG_WARNING_INTERVAL:
+            self._last_lag_warning = now
+            logger.warning('Changes stream is %.1f seconds behind the server, '
+                           '%d changes waiting', stats.lag, stats.queue_depth)
+        logger.debug('Changes stream stats: {0}'.format(stats.as_dict()))
 
     def _get_object_type_and_name_from_change(self, change):
         try:
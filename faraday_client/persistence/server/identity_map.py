@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Max amount of objects kept for each workspace
+IDENTITY_MAP_SIZE = 5000
+# Seconds an object is served from memory. Processes without a changes
+# stream (ie. fplugin) only get fresh objects through this.
+IDENTITY_MAP_MAX_AGE = 60
+
+_identity_maps = {}
+_identity_maps_lock = threading.Lock()
+
+
+class IdentityMap:
+    """A bounded map of the objects of one workspace, keyed by
+    (class_signature, id), so lookups of the same object are served
+    from memory instead of asking the server again.
+
+    Least recently used objects are dropped when the map is full.
+    """
+
+    def __init__(self, max_size=IDENTITY_MAP_SIZE, max_age=IDENTITY_MAP_MAX_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._objects = OrderedDict()
+        # id -> class signatures cached with that id
+        self._signatures = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, class_signature, obj_id):
+        key = (class_signature, str(obj_id))
+        with self._lock:
+            entry = self._objects.get(key)
+            if entry is None or (self.max_age and time.time() - entry[1] > self.max_age):
+                self._pop(key)
+                self.misses += 1
+                return None
+            self._objects.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def add(self, class_signature, obj_id, obj):
+        if obj is None or obj_id is None:
+            return
+        key = (class_signature, str(obj_id))
+        with self._lock:
+            self._objects[key] = (obj, time.time())
+            self._objects.move_to_end(key)
+            self._signatures.setdefault(key[1], set()).add(class_signature)
+            while len(self._objects) > self.max_size:
+                self._pop(next(iter(self._objects)))
+
+    def remove(self, obj_id, class_signature=None):
+        """Forget the object of id obj_id. If class_signature is None,
+        objects of every class with that id are forgotten."""
+        obj_id = str(obj_id)
+        with self._lock:
+            if class_signature is not None:
+                self._pop((class_signature, obj_id))
+                return
+            for signature in list(self._signatures.get(obj_id, ())):
+                self._pop((signature, obj_id))
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            self._signatures.clear()
+
+    def _pop(self, key):
+        self._objects.pop(key, None)
+        signatures = self._signatures.get(key[1])
+        if signatures is not None:
+            signatures.discard(key[0])
+            if not signatures:
+                del self._signatures[key[1]]
+
+
+def get_identity_map(workspace_name):
+    """Return the IdentityMap of workspace_name, creating it if needed."""
+    with _identity_maps_lock:
+        identity_map = _identity_maps.get(workspace_name)
+        if identity_map is None:
+            identity_map = IdentityMap()
+            _identity_maps[workspace_name] = identity_map
+        return identity_map
+
+
+def discard_identity_maps():
+    """Forget every cached object of every workspace."""
+    with _identity_maps_lock:
+        _identity_maps.clear()
+
+
+def apply_change(workspace_name, change):
+    """Take a change coming from the changes stream and forget the
+    objects it made stale."""
+    if not isinstance(change, dict):
+        return
+    obj_id = change.get('id')
+    if obj_id is None or change.get('action') not in ('CREATE', 'UPDATE', 'DELETE'):
+        return
+    with _identity_maps_lock:
+        identity_map = _identity_maps.get(workspace_name)
+    if identity_map is not None:
+        # the type isn't always the class_signature (ie. 'Vulnerability' vs
+        # 'VulnerabilityWeb'), so forget any object with that id
+        identity_map.remove(obj_id)
+
+
+# I'm Py3
@@ -8,12 +8,16 @@ See the file 'doc/LICENSE' for the license information
 """
 from __future__ import absolute_import
 
+import sys
 import logging
 from time import time
-import traceback
-from threading import Lock, Condition, RLock, Event
+from threading import Lock, Condition, RLock, Event, local
 from faraday_client.persistence.server import server
+from faraday_client.persistence.server.identity_map import get_identity_map
 from faraday_client.persistence.server.server_io_exceptions import (WrongObjectSignature,
+                                                     ServerRequestException,
+                                                     ResourceDoesNotExist,
+                                                     CantCommunicateWithServerError,
                                                      CantAccessConfigurationWithoutTheClient)
 
 from faraday_client.persistence.server.utils import (force_unique,
@@ -29,6 +33,7 @@ from faraday_client.persistence.server.utils import (force_unique,
 from faraday_client.model.diff import ModelObjectDiff, MergeSolver
 from faraday_client.model.conflict import ConflictUpdate
 from functools import wraps
+from contextlib import contextmanager
 from difflib import Differ
 
 
@@ -55,6 +60,8 @@ def _get_merge_strategy():
     return merge_strategy
 
 _CHANGES_LOCK = Lock()
+# guards the lazy creation of ModelBase.id_available
+_ID_AVAILABLE_LOCK = Lock()
 
 
 def get_changes_lock():
@@ -78,6 +85,165 @@ def _ignore_in_changes(func):
     return func_wrapper
 
 
+def _use_identity_map(class_signature, id_param):
+    """Serve the objects requested only by their id from the workspace's
+    identity map, asking the server only for the ones it doesn't have."""
+    def decorator(func):
+        @wraps(func)
+        def func_wrapper(workspace_name, *args, **params):
+            object_id = args[0] if args else params.get(id_param)
+            if object_id is None or len(args) + len(params) > 1:
+                return func(workspace_name, *args, **params)
+            loader = _active_prefetch(workspace_name)
+            if loader is not None:
+                obj = loader.get_object(class_signature, object_id)
+                if obj is not None:
+                    return obj
+            identity_map = get_identity_map(workspace_name)
+            obj = identity_map.get(class_signature, object_id)
+            if obj is None:
+                obj = func(workspace_name, *args, **params)
+                identity_map.add(class_signature, object_id, obj)
+            return obj
+        return func_wrapper
+    return decorator
+
+
+class WorkspacePrefetch:
+    """Loads the hosts, services and vulns of a workspace with one request
+    each and keeps the parent/children relations between them in memory.
+
+    While it is active (see prefetch) Host.getServices, Host.getVulns,
+    Service.getVulns and the lookups of hosts and services by id are answered
+    from it instead of asking the server once per object. If host is given
+    only that host, its services and its vulns are loaded.
+
+    The objects are a snapshot: changes made after they were loaded are
+    not seen by the loader.
+    """
+
+    def __init__(self, workspace_name, host=None):
+        self.workspace_name = workspace_name
+        self.host = host
+        self._lock = RLock()
+        self._hosts = None
+        self._services = None
+        self._vulns = None
+        self._hosts_by_id = {}
+        self._services_by_id = {}
+        self._services_by_host = {}
+        self._vulns_by_host = {}
+        self._vulns_by_service = {}
+
+    def get_hosts(self):
+        with self._lock:
+            if self._hosts is None:
+                if self.host is not None:
+                    self._hosts = [self.host]
+                else:
+                    self._hosts = _get_faraday_ready_hosts(
+                        self.workspace_name, server.get_hosts(self.workspace_name))
+                self._hosts_by_id = {str(host.id): host for host in self._hosts}
+            return list(self._hosts)
+
+    def get_services(self):
+        with self._lock:
+            if self._services is None:
+                if self.host is not None:
+                    services = get_services(self.workspace_name, host_id=self.host.id)
+                else:
+                    services = get_services(self.workspace_name)
+                self._services_by_id = {}
+                self._services_by_host = {}
+                for service in services:
+                    self._services_by_id[str(service.id)] = service
+                    self._services_by_host.setdefault(str(service.getParent()), []).append(service)
+                self._services = services
+            return list(self._services)
+
+    def get_vulns(self):
+        with self._lock:
+            if self._vulns is None:
+                self.get_services()
+                if self.host is not None:
+                    vulns = get_all_vulns(self.workspace_name, target=self.host.ip)
+                else:
+                    vulns = get_all_vulns(self.workspace_name)
+                self._vulns_by_host = {}
+                self._vulns_by_service = {}
+                for vuln in vulns:
+                    host_id = parent_id = str(vuln.getParent())
+                    if vuln.getParentType() == Service.class_signature:
+                        self._vulns_by_service.setdefault(parent_id, []).append(vuln)
+                        service = self._services_by_id.get(parent_id)
+                        host_id = str(service.getParent()) if service is not None else None
+                    if host_id is not None:
+                        self._vulns_by_host.setdefault(host_id, []).append(vuln)
+                self._vulns = vulns
+            return list(self._vulns)
+
+    def get_host_services(self, host_id):
+        self.get_services()
+        return list(self._services_by_host.get(str(host_id), []))
+
+    def get_host_vulns(self, host_id):
+        """Return the vulns of the host and of its services."""
+        self.get_vulns()
+        return list(self._vulns_by_host.get(str(host_id), []))
+
+    def get_service_vulns(self, service_id):
+        self.get_vulns()
+        return list(self._vulns_by_service.get(str(service_id), []))
+
+    def get_object(self, class_signature, object_id):
+        """Return the host or service of id object_id, None if it wasn't
+        loaded."""
+        if class_signature == Host.class_signature:
+            self.get_hosts()
+            return self._hosts_by_id.get(str(object_id))
+        if class_signature == Service.class_signature:
+            self.get_services()
+            return self._services_by_id.get(str(object_id))
+        return None
+
+
+_prefetch_scopes = local()
+
+
+@contextmanager
+def prefetch(workspace_name, loader=None):
+    """Make the model accessors of workspace_name answer from a
+    WorkspacePrefetch while the with block runs. A loader can be given to
+    reuse the objects it already loaded.
+
+        with models.prefetch(workspace):
+            for host in models.get_hosts(workspace):
+                for service in host.getServices():
+                    ...
+
+    Scopes are per thread.
+    """
+    if loader is None:
+        loader = WorkspacePrefetch(workspace_name)
+    scopes = getattr(_prefetch_scopes, 'scopes', None)
+    if scopes is None:
+        scopes = _prefetch_scopes.scopes = []
+    scopes.append(loader)
+    try:
+        yield loader
+    finally:
+        scopes.remove(loader)
+
+
+def _active_prefetch(workspace_name):
+    """Return the innermost WorkspacePrefetch of workspace_name active in
+    this thread, None if there isn't one."""
+    for loader in reversed(getattr(_prefetch_scopes, 'scopes', None) or []):
+        if loader.workspace_name == workspace_name:
+            return loader
+    return None
+
+
 def _flatten_dictionary(dictionary):
     """Given a dictionary with dictionaries inside, create a new flattened
     dictionary from that one and return it.
@@ -192,10 +358,22 @@ def get_hosts(workspace_name, **params):
 
     Return a list of Host objects.
     """
+    loader = _active_prefetch(workspace_name)
+    if loader is not None and not params:
+        return loader.get_hosts()
     host_dictionaries = server.get_hosts(workspace_name, **params)
     return _get_faraday_ready_hosts(workspace_name, host_dictionaries)
 
 
+def get_hosts_page(workspace_name, page, page_size, **params):
+    """Return a tuple with a list of the Host objects of one page and the
+    amount of hosts matching the query, see server.get_hosts_page.
+    """
+    host_dictionaries, count = server.get_hosts_page(workspace_name, page, page_size, **params)
+    return _get_faraday_ready_hosts(workspace_name, host_dictionaries), count
+
+
+@_use_identity_map('Host', 'host_id')
 def get_host(workspace_name, host_id=None, **params):
     """Return the host by host_id. None if it can't be found."""
     hosts = get_hosts(workspace_name, object_id=host_id, **params)
@@ -227,6 +405,7 @@ def get_vulns(workspace_name, **params):
     return _get_faraday_ready_vulns(workspace_name, vulns_dictionaries, vulns_type='vulns')
 
 
+@_use_identity_map('Vulnerability', 'vuln_id')
 def get_vuln(workspace_name, vuln_id=None, **params):
     """Return the Vuln of id vuln_id. None if not found."""
     return force_unique(get_vulns(workspace_name, object_id=vuln_id, **params))
@@ -242,6 +421,7 @@ def get_web_vulns(workspace_name, **params):
     return _get_faraday_ready_vulns(workspace_name, vulns_web_dictionaries, vulns_type='vulns_web')
 
 
+@_use_identity_map('VulnerabilityWeb', 'vuln_id')
 def get_web_vuln(workspace_name, vuln_id=None, **params):
     """Return the WebVuln of id vuln_id. None if not found."""
     return force_unique(get_web_vulns(workspace_name, object_id=vuln_id, **params))
@@ -260,6 +440,7 @@ def get_services(workspace_name, **params):
     return _get_faraday_ready_services(workspace_name, services_dictionary)
 
 
+@_use_identity_map('Service', 'service_id')
 def get_service(workspace_name, service_id=None, **params):
     """Return the Service of id service_id. None if not found."""
     return force_unique(get_services(workspace_name, object_id=service_id, **params))
@@ -340,6 +521,108 @@ def get_object(workspace_name, object_signature, object_id):
     return appropiate_function(workspace_name, object_id)
 
 
+# object_signature -> (end point, row name) of the objects that can be
+# fetched many at once with server.get_objects_by_id
+_BATCH_FETCH_END_POINTS = {'Host': ('hosts', 'rows'),
+                           'Vulnerability': ('vulns', 'vulnerabilities'),
+                           'VulnerabilityWeb': ('vulns', 'vulnerabilities')}
+# signatures whose batch fetch the server rejected, probably an old one
+_batch_fetch_unsupported = set()
+
+
+def _is_batch_fetch_rejected(ex):
+    """True if the server answered the batch fetch with a 400 or 404 like
+    response, it won't work next time either. Connection errors or server
+    errors may not happen again."""
+    if isinstance(ex, ResourceDoesNotExist):
+        return True
+    if isinstance(ex, CantCommunicateWithServerError) and ex.response is not None:
+        return ex.response.status_code in (400, 404, 405)
+    return False
+
+
+def get_objects(workspace_name, object_signature, object_ids):
+    """Return a dictionary of id -> object with the objects of type
+    object_signature and ids object_ids that could be found.
+
+    Objects in the workspace's identity map aren't requested again. The rest
+    are fetched with one request when the server can filter them by id,
+    with one request per object otherwise.
+    """
+    identity_map = get_identity_map(workspace_name)
+    objects = {}
+    missing = []
+    for object_id in object_ids:
+        obj = identity_map.get(object_signature, object_id)
+        if obj is None:
+            missing.append(object_id)
+        else:
+            objects[object_id] = obj
+
+    if len(missing) > 1 and object_signature in _BATCH_FETCH_END_POINTS \
+            and object_signature not in _batch_fetch_unsupported:
+        end_point, row_name = _BATCH_FETCH_END_POINTS[object_signature]
+        try:
+            dictionaries = server.get_objects_by_id(workspace_name, end_point,
+                                                    row_name, missing)
+        except Exception as ex:
+            logger.info('Can not fetch many {0} at once, fetching them one by one: '
+                        '{1}'.format(end_point, ex))
+            if _is_batch_fetch_rejected(ex):
+                _batch_fetch_unsupported.add(object_signature)
+        else:
+            dictionaries = [dictionary if 'value' in dictionary
+                            else {'id': dictionary.get('id'), 'value': dictionary}
+                            for dictionary in dictionaries]
+            if end_point == 'hosts':
+                fetched = _get_faraday_ready_hosts(workspace_name, dictionaries)
+            else:
+                fetched = _get_faraday_ready_vulns(workspace_name, dictionaries)
+            ids = {str(object_id): object_id for object_id in missing}
+            for obj in fetched:
+                object_id = ids.get(str(obj.id))
+                if object_id is not None and obj.class_signature == object_signature:
+                    objects[object_id] = obj
+                    identity_map.add(object_signature, object_id, obj)
+            # the ones not found don't exist anymore
+            missing = []
+
+    for object_id in missing:
+        try:
+            obj = get_object(workspace_name, object_signature, object_id)
+        except ServerRequestException as ex:
+            logger.debug('Could not fetch {0} {1}: {2}'.format(object_signature, object_id, ex))
+            continue
+        if obj is not None:
+            objects[object_id] = obj
+    return objects
+
+
+def get_object_from_change(workspace_name, change):
+    """Build the object a change of the changes stream refers to with the
+    data the change carries under the 'object' key, so it doesn't have to be
+    fetched. Return None if the change doesn't carry enough data for that.
+    """
+    signature_to_class = {Host.class_signature: Host,
+                          Vuln.class_signature: Vuln,
+                          VulnWeb.class_signature: VulnWeb,
+                          Service.class_signature: Service,
+                          Credential.class_signature: Credential}
+    appropiate_class = signature_to_class.get(change.get('type'))
+    object_dictionary = change.get('object')
+    if appropiate_class is None or not isinstance(object_dictionary, dict):
+        return None
+    object_dictionary = _flatten_dictionary(object_dictionary)
+    object_dictionary.setdefault('id', change.get('id'))
+    try:
+        obj = appropiate_class(object_dictionary, workspace_name)
+    except (KeyError, TypeError, ValueError) as ex:
+        logger.debug('Change without enough data to build the object: {0}'.format(ex))
+        return None
+    get_identity_map(workspace_name).add(obj.class_signature, obj.id, obj)
+    return obj
+
+
 def get_deleted_object_name_and_type(workspace_name, object_id):
     """Return a tupe of (name, type) for the deleted object of object_id,
     if it can get around CouchDB to do it. Else None"""
@@ -519,6 +802,17 @@ def create_object(workspace_name, object_signature, obj, command_id):
     return appropiate_function(workspace_name, obj, command_id)
 
 
+def bulk_create(workspace_name, hosts, command=None):
+    """Take a workspace_name and a list of host dictionaries, built with the
+    get_bulk_create_*_properties functions, and save all of them with one
+    request to the server. command is a dictionary of the command which
+    found them, for the server to create.
+
+    Return the server's json response as a dictionary.
+    """
+    return server.bulk_create(workspace_name, hosts, command=command)
+
+
 def update_object(workspace_name, object_signature, obj, command_id):
     """Given a workspace name, an object_signature as string and obj, a Faraday
     object, update that object on the server.
@@ -542,6 +836,7 @@ def update_object(workspace_name, object_signature, obj, command_id):
     except KeyError:
         raise WrongObjectSignature(object_signature)
 
+    get_identity_map(workspace_name).remove(obj.getID(), object_signature)
     return appropiate_function(workspace_name, obj, command_id)
 
 
@@ -583,6 +878,12 @@ def get_services_number(workspace_name, **params):
     return server.get_services_number(workspace_name, **params)
 
 
+def get_interfaces_number(workspace_name, **params):
+    """Return the number of interfaces found on the workspace of name workspace_name
+    """
+    return server.get_interfaces_number(workspace_name, **params)
+
+
 def get_vulns_number(workspace_name, **params):
     """Return the number of vulns found on the workspace of name workspace_name
     """
@@ -669,6 +970,7 @@ def delete_object(workspace_name, object_signature, obj_id):
     except KeyError:
         raise WrongObjectSignature(object_signature)
 
+    get_identity_map(workspace_name).remove(obj_id)
     return appropiate_function(workspace_name, obj_id)
 
 
@@ -731,14 +1033,27 @@ class ModelBase:
         self.description = obj.get('description', "")
         self.owned = obj.get('owned', False)
         self.owner = obj.get('owner', '')
-        self._metadata = obj.get('metadata', Metadata(self.owner))
+        self._metadata = obj.get('metadata')
+        if self._metadata is None:
+            self._metadata = Metadata(self.owner)
         self.parent_id = obj.get('parent')
         self.updates = []
-        self.id_available = Event()
-        if self.id is not None:
-            self.id_available.set()
+        # only needed by the threads waiting in getID, created there
+        self._id_available = None
         self.parent_type = obj.get('parent_type', None)
 
+    @property
+    def id_available(self):
+        """Event set when the object has an ID."""
+        if self._id_available is None:
+            with _ID_AVAILABLE_LOCK:
+                if self._id_available is None:
+                    id_available = Event()
+                    if self.id is not None:
+                        id_available.set()
+                    self._id_available = id_available
+        return self._id_available
+
     def getParentType(self):
         return self.parent_type
 
@@ -755,7 +1070,9 @@ class ModelBase:
         if id:
             self.id = id
             self._server_id = id
-            self.id_available.set()
+            with _ID_AVAILABLE_LOCK:
+                if self._id_available is not None:
+                    self._id_available.set()
 
     def getID(self):
         # getId will wait until the id is not None
@@ -923,12 +1240,18 @@ class Host(ModelBase):
         """
         Get all vulns of this host.
         """
+        loader = _active_prefetch(self._workspace_name)
+        if loader is not None:
+            return loader.get_host_vulns(self._server_id)
         return get_all_vulns(self._workspace_name, target=self.ip)
 
     def getServices(self):
         """
         Get all services of this host.
         """
+        loader = _active_prefetch(self._workspace_name)
+        if loader is not None:
+            return loader.get_host_services(self._server_id)
         return get_services(self._workspace_name, host_id=self._server_id)
 
     def getService(self, service_id):
@@ -1014,6 +1337,9 @@ class Service(ModelBase):
         """
         Get all vulns of this service.
         """
+        loader = _active_prefetch(self._workspace_name)
+        if loader is not None:
+            return loader.get_service_vulns(self._server_id)
         return get_all_vulns(self._workspace_name, service_id=self._server_id)
 
 
@@ -1542,6 +1868,9 @@ class MetadataUpdateActions:
     UPDATE      = 1
 
 
+NO_CONTROLLER_ACTION = "No model controller call"
+
+
 class Metadata:
     """To save information about the modification of ModelObjects.
        All members declared public as this is only a wrapper"""
@@ -1555,7 +1884,8 @@ class Metadata:
         self.update_time    = time()
         self.update_user    = user
         self.update_action  = MetadataUpdateActions.CREATE
-        self.update_controller_action = self.__getUpdateAction()
+        # set by ModelController when it saves the object
+        self.update_controller_action = NO_CONTROLLER_ACTION
         self.command_id = ''
 
     def toDict(self):
@@ -1572,19 +1902,7 @@ class Metadata:
         self.update_user = user
         self.update_time = time()
         self.update_action = action
-
-        self.update_controller_action = self.__getUpdateAction()
-
-    def __getUpdateAction(self):
-        """This private method grabs the stackframes in look for the controller
-        call that generated the update"""
-
-        l_strace = traceback.extract_stack(limit=10)
-        controller_funcallnames = [x[2] for x in l_strace if "controller" in x[0]]
-
-        if controller_funcallnames:
-            return "ModelControler." + " ModelControler.".join(controller_funcallnames)
-        return "No model controller call"
+        self.update_controller_action = NO_CONTROLLER_ACTION
 
 
 # I'm Py3
@@ -48,6 +48,9 @@ from faraday_client.persistence.server.changes_stream import (
     WebsocketsChangesStream
 )
 from faraday_client.persistence.server.exceptions import Required2FAError
+from faraday_client.persistence.server.transport import get_transport
+from faraday_client.persistence.server.workspace_stats import (get_workspace_stats,
+                                                                invalidate_workspace_stats)
 
 # NOTE: Change is you want to use this module by itself.
 # If FARADAY_UP is False, SERVER_URL must be a valid faraday server url
@@ -222,7 +225,7 @@ def _get(request_url, **params):
 
     Return a dictionary with the information in the json.
     """
-    return _parse_json(_unsafe_io_with_server(requests.get,
+    return _parse_json(_unsafe_io_with_server(get_transport().get,
                                               [200],
                                               request_url,
                                               params=params))
@@ -240,14 +243,14 @@ def _put(post_url, expected_response=201, **params):
     Return a dictionary with the response from couchdb, which looks like this:
     {u'id': u'61', u'ok': True, u'rev': u'1-967a00dff5e02add41819138abb3284d'}
     """
-    return _parse_json(_unsafe_io_with_server(requests.put,
+    return _parse_json(_unsafe_io_with_server(get_transport().put,
                                               [expected_response],
                                               post_url,
                                               json=params))
 
 
 def _post(post_url, update=False, expected_response=201, **params):
-    return _parse_json(_unsafe_io_with_server(requests.post,
+    return _parse_json(_unsafe_io_with_server(get_transport().post,
                                               [expected_response],
                                               post_url,
                                               json=params))
@@ -260,7 +263,7 @@ def _delete(delete_url, database=False):
     if not database:
         last_rev = _get(delete_url)['_rev']
         params = {'rev': last_rev}
-    return _parse_json(_unsafe_io_with_server(requests.delete,
+    return _parse_json(_unsafe_io_with_server(get_transport().delete,
                                               [200,204],
                                               delete_url,
                                               params=params))
@@ -321,7 +324,10 @@ def _save_to_server(workspace_name, **params):
     :return:
     """
     post_url = _create_server_post_url(workspace_name, params['type'], params.get('command_id', None))
-    return _post(post_url, update=False, expected_response=201, **params)
+    try:
+        return _post(post_url, update=False, expected_response=201, **params)
+    finally:
+        invalidate_workspace_stats(workspace_name)
 
 def _get_raw_report_count_vulns(workspace_name, **params):
     request_url = _create_server_get_url(workspace_name, 'report/countVulns')
@@ -338,7 +344,10 @@ def _save_db_to_server(db_name, **params):
 
 def _delete_from_server(workspace_name, faraday_object_type, faraday_object_id):
     delete_url = _create_server_delete_url(workspace_name, faraday_object_type, faraday_object_id)
-    return _delete(delete_url)
+    try:
+        return _delete(delete_url)
+    finally:
+        invalidate_workspace_stats(workspace_name)
 
 
 def _get_faraday_ready_dictionaries(workspace_name, faraday_object_name,
@@ -394,6 +403,25 @@ def get_hosts(workspace_name, **params):
                                            'rows', **params)
 
 
+def get_hosts_page(workspace_name, page, page_size, **params):
+    """Get one page of the hosts from the server, with the amount of
+    hosts matching the query.
+
+    Args:
+        workspace_name (str): the workspace from which to get the hosts.
+        page (int): the number of the page, starting from 1.
+        page_size (int): the amount of hosts of every page.
+        **params: any other request parameter, ie. search or sort.
+
+    Returns:
+        A tuple with the list of host dictionaries and the total amount
+        of hosts matching the query.
+    """
+    raw_hosts = _get_raw_hosts(workspace_name, page=page, page_size=page_size, **params)
+    rows = raw_hosts.get('rows', [])
+    return rows, int(raw_hosts.get('count', len(rows)))
+
+
 def get_all_vulns(workspace_name, **params):
     """Get vulns, both normal and web, from the server.
 
@@ -433,6 +461,26 @@ def get_web_vulns(workspace_name, **params):
     """
     return get_all_vulns(workspace_name, type="VulnerabilityWeb", **params)
 
+def get_objects_by_id(workspace_name, object_name, row_name, object_ids):
+    """Get many objects of the same type with one request, using the
+    server's filter endpoint.
+
+    Args:
+        workspace_name (str): the workspace from which to get the objects.
+        object_name (str): the end point of the objects, 'hosts' or 'vulns'.
+        row_name (str): the key of the response holding the objects.
+        object_ids (list): the ids of the objects.
+
+    Returns:
+        A list with the dictionaries of the objects found.
+    """
+    filter_url = _create_server_get_url(workspace_name, object_name) + '/filter'
+    query = {'filters': [{'name': 'id', 'op': 'in', 'val': list(object_ids)}]}
+    response = _get(filter_url, q=json.dumps(query))
+    if isinstance(response, list):
+        return response
+    return response.get(row_name, [])
+
 def get_interfaces(workspace_name, **params):
     """Get interfaces from the server.
 
@@ -531,7 +579,7 @@ def get_report_docx(workspace_name, report_object_id):
         report_object_id,
         filename)
 
-    return _unsafe_io_with_server(requests.get, 200, request_url)
+    return _unsafe_io_with_server(get_transport().get, 200, request_url)
 
 def get_report_count_vulns(workspace_name, confirmed=False, tags=[]):
     """
@@ -629,7 +677,7 @@ def get_object_before_last_revision(workspace_name, object_id):
     """
     get_url = _create_couch_get_url(workspace_name, object_id)
 
-    response = _unsafe_io_with_server(requests.get, [200], get_url,
+    response = _unsafe_io_with_server(get_transport().get, [200], get_url,
                                       params={'revs': 'true', 'open_revs': 'all'})
     try:
         valid_json_response = _clean_up_stupid_couch_response(response.text)
@@ -821,7 +869,8 @@ def get_workspace(workspace_name, **params):
     return _get(request_url, **params)
 
 def get_workspace_summary(workspace_name):
-    """Get a collection of data about the workspace.
+    """Get a collection of data about the workspace. The summary is
+    fetched once and shared by every caller, see WorkspaceStats.
 
     Args:
         workspace_name (str): the workspace to get the stats from.
@@ -829,7 +878,7 @@ def get_workspace_summary(workspace_name):
     Returns:
         A dictionary with the workspace's information
     """
-    return _get_raw_workspace_summary(workspace_name)['stats']
+    return get_workspace_stats(workspace_name).get()
 
 def get_workspace_numbers(workspace_name):
     """Get the number of hosts, interfaces, services and vulns in the workspace.
@@ -840,7 +889,7 @@ def get_workspace_numbers(workspace_name):
     Return:
         A tuple of 4 elements with the amounts of hosts, interfaces, services and vulns.
     """
-    stats = _get_raw_workspace_summary(workspace_name)['stats']
+    stats = get_workspace_summary(workspace_name)
     return stats['hosts'], stats['services'], stats['total_vulns']
 
 def get_hosts_number(workspace_name, **params):
@@ -1548,6 +1597,40 @@ def create_executive_report(workspace_name, id, name, tags=[], title="", enterpr
         type="Reports")
 
 
+def bulk_create(workspace_name, hosts, command=None):
+    """Create many hosts, with their services, vulns and credentials
+    nested inside them, with only one request.
+
+    The command they belong to is sent with them. The server creates it,
+    unless the command has the 'id' of one it already has, then the objects
+    are linked to that one.
+
+    Args:
+        workspace_name (str): the name of the workspace where the objects will be saved.
+        hosts ([dict]): a list of host dictionaries. Every host may have
+            'services', 'vulnerabilities' and 'credentials' lists, and every
+            service may have 'vulnerabilities' and 'credentials' lists.
+        command (dict): the command which found the objects, for the
+            server to create, or with the 'id' of an existing command.
+
+    Returns:
+        A dictionary with the server's response. Newer servers answer with
+        the 'command_id' of the command they created, and with the 'hosts'
+        in the order they were sent, each one with its 'id' and its
+        'services', 'vulnerabilities' and 'credentials' answered the same
+        way. Objects the server already had come with 'created' False and
+        the existing 'object'.
+    """
+    post_url = '{0}/ws/{1}/bulk_create'.format(_create_server_api_url(), workspace_name)
+    params = {'hosts': hosts}
+    if command:
+        params['command'] = command
+    try:
+        return _post(post_url, expected_response=201, **params)
+    finally:
+        invalidate_workspace_stats(workspace_name)
+
+
 def create_workspace(workspace_name, description, start_date, finish_date,
                      customer=None, duration=None):
     """Create a workspace.
@@ -1621,7 +1704,7 @@ def login_user(uri, uname, upass, u2fa_token=None):
     auth = {"email": uname, "password": upass}
     headers = {'User-Agent': f'faraday-client/{f_version}'}
     try:
-        resp = requests.post(urlparse.urljoin(uri, "/_api/login"), json=auth, headers=headers)
+        resp = get_transport().post(urlparse.urljoin(uri, "/_api/login"), json=auth, headers=headers)
         if resp.status_code == 401:
             return None
         elif resp.status_code == 202:
@@ -1630,8 +1713,8 @@ def login_user(uri, uname, upass, u2fa_token=None):
             else:
 
                 json_2fa = {"secret": u2fa_token}
-                resp_2fa = requests.post(urlparse.urljoin(uri, "/_api/confirmation"), json=json_2fa, headers=headers,
-                                         cookies=resp.cookies)
+                resp_2fa = get_transport().post(urlparse.urljoin(uri, "/_api/confirmation"), json=json_2fa, headers=headers,
+                                                cookies=resp.cookies)
                 if resp_2fa.status_code == 200:
                     return resp_2fa.cookies
                 else:
@@ -1654,7 +1737,7 @@ def login_user(uri, uname, upass, u2fa_token=None):
 
 def is_authenticated(uri, cookies):
     try:
-        resp = requests.get(urlparse.urljoin(uri, "/_api/session"), cookies=cookies, timeout=1)
+        resp = get_transport().get(urlparse.urljoin(uri, "/_api/session"), cookies=cookies, timeout=1)
         if resp.status_code not in [401, 403]:
             user_info = resp.json()
             return bool(user_info.get('username', {}))
@@ -1680,7 +1763,7 @@ def check_server_url(url_to_test):
 
 def get_user_info():
     try:
-        resp = requests.get(urlparse.urljoin(_get_base_server_url(), "/_api/session"), cookies=_conf().getFaradaySessionCookies(), timeout=1)
+        resp = get_transport().get(urlparse.urljoin(_get_base_server_url(), "/_api/session"), cookies=_conf().getFaradaySessionCookies(), timeout=1)
         if (resp.status_code != 401) and (resp.status_code != 403):
             return resp.json()
         else:
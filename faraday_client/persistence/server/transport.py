@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import logging
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from faraday_client import __version__ as f_version
+
+logger = logging.getLogger(__name__)
+
+# Number of different hosts whose connection pools are kept alive.
+DEFAULT_POOL_CONNECTIONS = 4
+# Maximum number of keep-alive connections kept against a single host.
+DEFAULT_POOL_MAXSIZE = 10
+# If True, requests wait for a free connection instead of opening
+# a new one when the per host limit is reached.
+DEFAULT_POOL_BLOCK = False
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+class _RejectCookiesPolicy(DefaultCookiePolicy):
+    """Never store a cookie set by the server."""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class ServerTransport:
+    """A keep-alive HTTP transport shared by every request done to the
+    Faraday Server.
+
+    It wraps a requests.Session, so TCP/TLS connections are pooled per host.
+    The cookies set by the server are not stored: every request sends the
+    ones it's given (the session cookies of the configuration), so a login
+    with another user or an expired session is seen at once. The underlying
+    urllib3 pools are thread safe, so one instance is shared by the whole
+    process.
+    """
+
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=DEFAULT_POOL_BLOCK):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = f'faraday-client/{f_version}'
+        self.session.cookies.set_policy(_RejectCookiesPolicy())
+        for prefix in ('http://', 'https://'):
+            self.session.mount(prefix, HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block))
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.session.post(url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.session.put(url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.session.delete(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def get_transport():
+    """Return the process wide ServerTransport, creating it if needed."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                logger.debug('Creating server transport')
+                _transport = ServerTransport()
+    return _transport
+
+
+def reset_transport():
+    """Close every pooled connection, a new transport is created on the
+    next request."""
+    global _transport
+    with _transport_lock:
+        old_transport, _transport = _transport, None
+    if old_transport is not None:
+        old_transport.close()
+
+# I'm Py3
@@ -154,6 +154,56 @@ def get_credential_properties(credential):
     return cred_dict
 
 
+def get_bulk_create_host_properties(host):
+    host_dict = get_host_properties(host)
+    return {
+        'ip': host_dict['ip'],
+        'os': host_dict['os'],
+        'hostnames': host_dict['hostnames'],
+        'mac': host_dict['mac'],
+        'description': host_dict['description'],
+        'owned': host_dict['owned'],
+        'services': [],
+        'vulnerabilities': [],
+        'credentials': [],
+    }
+
+
+def get_bulk_create_service_properties(service):
+    ports = service.getPorts()
+    return {
+        'name': service.getName(),
+        'description': service.getDescription(),
+        'protocol': service.getProtocol(),
+        'port': ports[0] if ports else None,
+        'status': service.getStatus(),
+        'version': service.getVersion(),
+        'owned': service.isOwned(),
+        'vulnerabilities': [],
+        'credentials': [],
+    }
+
+
+def get_bulk_create_vuln_properties(vuln):
+    if vuln.class_signature == 'VulnerabilityWeb':
+        vuln_dict = get_vuln_web_properties(vuln)
+    else:
+        vuln_dict = get_vuln_properties(vuln)
+    for key in ('parent', 'parent_type', 'metadata', 'owner'):
+        vuln_dict.pop(key, None)
+    vuln_dict['type'] = vuln.class_signature
+    return vuln_dict
+
+
+def get_bulk_create_credential_properties(credential):
+    return {
+        'name': credential.getName(),
+        'description': credential.getDescription(),
+        'username': credential.getUsername(),
+        'password': credential.getPassword(),
+    }
+
+
 def get_command_properties(command):
     return {
         'command': command.command,
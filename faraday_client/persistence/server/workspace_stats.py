@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+"""
+from __future__ import absolute_import
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Seconds the summary of a workspace is used while a changes stream keeps
+# its counters up to date
+WORKSPACE_STATS_MAX_AGE = 60
+# Seconds the summary is used when nothing keeps it up to date (ie. the
+# stream is not connected, or fplugin)
+WORKSPACE_STATS_UNFOLLOWED_MAX_AGE = 2
+
+# The counters of the summary changed by the creation or deletion of an
+# object of each type
+COUNTERS_BY_TYPE = {
+    'Host': ('hosts',),
+    'Service': ('services',),
+    'Vulnerability': ('total_vulns', 'std_vulns'),
+    'VulnerabilityWeb': ('total_vulns', 'web_vulns'),
+    'VulnerabilityCode': ('total_vulns', 'code_vulns'),
+    'Cred': ('credentials',),
+    'Credential': ('credentials',),
+}
+# Deleting these deletes their children too, the server must be asked
+CASCADE_DELETE_TYPES = ('Host', 'Service')
+
+_workspace_stats = {}
+_workspace_stats_lock = threading.Lock()
+
+
+def _fetch_summary(workspace_name):
+    from faraday_client.persistence.server.server import _get_raw_workspace_summary  # pylint:disable=import-outside-toplevel
+    return _get_raw_workspace_summary(workspace_name)['stats']
+
+
+class WorkspaceStats:
+    """The summary of a workspace (amount of hosts, services, vulns...),
+    fetched from the server once and shared by everyone asking for it.
+
+    The counters are kept up to date with the changes of the changes
+    stream while it is connected (see follow), and fetched again when
+    they are older than max_age, or when a change can't be applied.
+    A summary fetched while the workspace changed may miss the change, it's
+    returned but not kept.
+    """
+
+    def __init__(self, workspace_name, fetch=_fetch_summary,
+                 max_age=WORKSPACE_STATS_MAX_AGE,
+                 unfollowed_max_age=WORKSPACE_STATS_UNFOLLOWED_MAX_AGE):
+        self.workspace_name = workspace_name
+        self.max_age = max_age
+        self.unfollowed_max_age = unfollowed_max_age
+        self.followed = False
+        self.fetches = 0
+        self._fetch = fetch
+        self._stats = None
+        self._fetch_time = 0
+        # increased by every change of the counters, see get
+        self._generation = 0
+        self._lock = threading.Lock()
+        # only one thread asks the server, the others wait for its answer
+        self._fetch_lock = threading.Lock()
+
+    def _is_fresh(self):
+        max_age = self.max_age if self.followed else self.unfollowed_max_age
+        return self._stats is not None and time.time() - self._fetch_time <= max_age
+
+    def get(self):
+        """Return a copy of the summary, fetching it if it's stale."""
+        with self._lock:
+            if self._is_fresh():
+                return dict(self._stats)
+        with self._fetch_lock:
+            with self._lock:
+                if self._is_fresh():
+                    return dict(self._stats)
+                generation = self._generation
+            stats = self._fetch(self.workspace_name)
+            with self._lock:
+                self.fetches += 1
+                if generation == self._generation:
+                    self._stats = dict(stats)
+                    self._fetch_time = time.time()
+                return dict(stats)
+
+    def invalidate(self):
+        """Make the next get ask the server, and drop the summary being
+        fetched."""
+        with self._lock:
+            self._generation += 1
+            self._stats = None
+
+    def follow(self, followed=True):
+        """Tell if a changes stream is applying its changes to the
+        counters. Changes sent while it was not connected were lost, so
+        the summary is fetched again."""
+        with self._lock:
+            self.followed = followed
+            self._generation += 1
+            self._stats = None
+
+    def apply_change(self, change):
+        action = change.get('action')
+        obj_type = change.get('type')
+        step = {'CREATE': 1, 'DELETE': -1}.get(action)
+        if step is None:
+            return
+        with self._lock:
+            self._generation += 1
+            if self._stats is None:
+                return
+            if action == 'DELETE' and (obj_type is None or obj_type in CASCADE_DELETE_TYPES):
+                self._stats = None
+                return
+            for counter in COUNTERS_BY_TYPE.get(obj_type, ()):
+                if counter in self._stats:
+                    self._stats[counter] = max(0, int(self._stats[counter]) + step)
+
+
+def get_workspace_stats(workspace_name):
+    """Return the WorkspaceStats of workspace_name, creating it if needed."""
+    with _workspace_stats_lock:
+        stats = _workspace_stats.get(workspace_name)
+        if stats is None:
+            stats = WorkspaceStats(workspace_name)
+            _workspace_stats[workspace_name] = stats
+        return stats
+
+
+def discard_workspace_stats():
+    """Forget the summaries of every workspace."""
+    with _workspace_stats_lock:
+        _workspace_stats.clear()
+
+
+def invalidate_workspace_stats(workspace_name):
+    """Make the next summary of workspace_name be fetched from the
+    server, i.e. after objects were created or deleted in it."""
+    with _workspace_stats_lock:
+        stats = _workspace_stats.get(workspace_name)
+    if stats is not None:
+        stats.invalidate()
+
+
+def apply_change(workspace_name, change):
+    """Take a change coming from the changes stream and update the
+    counters of the workspace summary with it."""
+    if not isinstance(change, dict):
+        return
+    with _workspace_stats_lock:
+        stats = _workspace_stats.get(workspace_name)
+    if stats is not None:
+        stats.apply_change(change)
+
+
+# I'm Py3
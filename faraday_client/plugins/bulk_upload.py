@@ -0,0 +1,237 @@
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+"""
+import json
+import time
+import logging
+
+from faraday_client.persistence.server import server
+from faraday_client.persistence.server.server_io_exceptions import (
+    ServerRequestException,
+    CantCommunicateWithServerError
+)
+
+logger = logging.getLogger(__name__)
+
+# Max amount of objects and approximate max size in bytes of the JSON body
+# of one bulk_create request. A single object bigger than that is sent
+# alone in its own request.
+BULK_CREATE_CHUNK_OBJECTS = 1000
+BULK_CREATE_CHUNK_BYTES = 4 * 1024 * 1024
+# Times a chunk that failed because of the network or a server error is sent
+# again, and seconds to wait before the first retry (doubled every time)
+BULK_CREATE_RETRIES = 2
+BULK_CREATE_RETRY_DELAY = 1
+
+_HOST_CHILDREN = ('services', 'vulnerabilities', 'credentials')
+_SERVICE_CHILDREN = ('vulnerabilities', 'credentials')
+
+
+def _json_size(obj):
+    return len(json.dumps(obj))
+
+
+def _shell(obj, children):
+    """Return a shallow copy of obj without its children lists."""
+    return {key: value for key, value in obj.items() if key not in children}
+
+
+def _count_objects(hosts):
+    count = 0
+    for host in hosts:
+        count += 1
+        for service in host.get('services') or []:
+            count += 1 + sum(len(service.get(key) or []) for key in _SERVICE_CHILDREN)
+        count += sum(len(host.get(key) or []) for key in _SERVICE_CHILDREN)
+    return count
+
+
+def _iter_host_objects(host):
+    """Yield (service, key, obj) for every object nested in host, where obj
+    goes in the key list of service, or of the host if service is None.
+    Hosts and services without children are yielded as (service, None, None)
+    so they are sent anyway."""
+    empty = True
+    for key in _SERVICE_CHILDREN:
+        for obj in host.get(key) or []:
+            empty = False
+            yield None, key, obj
+    for service in host.get('services') or []:
+        empty = False
+        service_empty = True
+        for key in _SERVICE_CHILDREN:
+            for obj in service.get(key) or []:
+                service_empty = False
+                yield service, key, obj
+        if service_empty:
+            yield service, None, None
+    if empty:
+        yield None, None, None
+
+
+def iter_bulk_create_chunks(hosts, max_objects=BULK_CREATE_CHUNK_OBJECTS,
+                            max_bytes=BULK_CREATE_CHUNK_BYTES):
+    """Split the host dictionaries of a bulk_create payload in lists of hosts
+    with at most max_objects objects and about max_bytes bytes of JSON.
+
+    A host, or service, with more children than what fits in a chunk is
+    repeated in the following chunks with the rest of its children;
+    bulk_create reuses existing hosts and services. The chunks share the
+    vulnerabilities and credentials of the given hosts, they aren't copied.
+    """
+    chunk, objects, size = [], 0, 0
+    for host in hosts:
+        host_size = _json_size(_shell(host, _HOST_CHILDREN))
+        host_copy = service_copy = None
+        for service, key, obj in _iter_host_objects(host):
+            if service is not None and (service_copy is None or service_copy[0] is not service):
+                service_size = _json_size(_shell(service, _SERVICE_CHILDREN))
+                service_copy = None
+            for _ in range(2):
+                needed_objects, needed_size = 0, 0
+                if host_copy is None:
+                    needed_objects, needed_size = 1, host_size
+                if service is not None and service_copy is None:
+                    needed_objects += 1
+                    needed_size += service_size
+                if obj is not None:
+                    needed_objects += 1
+                    needed_size += _json_size(obj)
+                if not chunk or (objects + needed_objects <= max_objects and
+                                 size + needed_size <= max_bytes):
+                    break
+                yield chunk
+                chunk, objects, size = [], 0, 0
+                host_copy = service_copy = None
+            if host_copy is None:
+                host_copy = _shell(host, _HOST_CHILDREN)
+                chunk.append(host_copy)
+            if service is not None and service_copy is None:
+                service_copy = (service, _shell(service, _SERVICE_CHILDREN))
+                host_copy.setdefault('services', []).append(service_copy[1])
+            if obj is not None:
+                parent = host_copy if service is None else service_copy[1]
+                parent.setdefault(key, []).append(obj)
+            objects += needed_objects
+            size += needed_size
+    if chunk:
+        yield chunk
+
+
+def _is_retryable(error):
+    """Network errors and server errors may work the next time, a
+    rejected payload won't."""
+    if not isinstance(error, CantCommunicateWithServerError):
+        return False
+    return error.response is None or error.response.status_code >= 500
+
+
+class BulkCreateChunk:
+    """A part of a bulk_create upload and the result of sending it."""
+
+    def __init__(self, index, hosts, objects):
+        self.index = index
+        self.hosts = hosts
+        self.objects = objects
+        self.attempts = 0
+        self.sent = False
+        self.error = None
+
+    @property
+    def retryable(self):
+        return not self.sent and _is_retryable(self.error)
+
+    def as_dict(self):
+        return {'index': self.index,
+                'objects': self.objects,
+                'attempts': self.attempts,
+                'sent': self.sent,
+                'error': str(self.error) if self.error else None}
+
+
+class BulkCreateUpload:
+    """Sends the hosts found by a plugin to bulk_create in requests of
+    bounded size, instead of one request with the whole report.
+
+    Every chunk keeps its result, the ones which failed can be sent again
+    with retry(). The hosts of a chunk are released once it's sent.
+
+    The objects of every chunk belong to the same command: the one of
+    command_id if the server already has it, otherwise the command is
+    created with the first chunk sent and the following ones are linked to
+    the command_id the server answers with.
+    """
+
+    def __init__(self, workspace_name, hosts, command=None, command_id=None,
+                 max_objects=BULK_CREATE_CHUNK_OBJECTS, max_bytes=BULK_CREATE_CHUNK_BYTES):
+        self.workspace_name = workspace_name
+        self.hosts = hosts
+        self.command = command
+        self.command_id = command_id
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self.chunks = []
+
+    def __bool__(self):
+        return not self.failed
+
+    @property
+    def failed(self):
+        return [chunk for chunk in self.chunks if not chunk.sent]
+
+    @property
+    def sent_objects(self):
+        return sum(chunk.objects for chunk in self.chunks if chunk.sent)
+
+    def send(self, retries=BULK_CREATE_RETRIES, retry_delay=BULK_CREATE_RETRY_DELAY):
+        """Send every chunk, then retry up to retries times the ones which
+        failed because of the network or the server. Return self."""
+        chunks = iter_bulk_create_chunks(self.hosts, self.max_objects, self.max_bytes)
+        self.hosts = None
+        for index, hosts in enumerate(chunks):
+            chunk = BulkCreateChunk(index, hosts, _count_objects(hosts))
+            self.chunks.append(chunk)
+            self._send_chunk(chunk)
+        for attempt in range(retries):
+            failed = [chunk for chunk in self.chunks if chunk.retryable]
+            if not failed:
+                break
+            time.sleep(retry_delay * 2 ** attempt)
+            self.retry(failed)
+        return self
+
+    def retry(self, chunks=None):
+        """Send again the given chunks, all the failed ones by default."""
+        for chunk in self.failed if chunks is None else chunks:
+            if not chunk.sent:
+                self._send_chunk(chunk)
+        return self
+
+    def _chunk_command(self):
+        if self.command_id is None:
+            return self.command
+        return dict(self.command or {}, id=self.command_id)
+
+    def _send_chunk(self, chunk):
+        chunk.attempts += 1
+        try:
+            response = server.bulk_create(self.workspace_name, chunk.hosts,
+                                          command=self._chunk_command())
+        except ServerRequestException as ex:
+            chunk.error = ex
+            logger.warning('Could not send chunk %d of bulk_create (%d objects, attempt %d): %s',
+                           chunk.index, chunk.objects, chunk.attempts, ex)
+            return False
+        chunk.sent = True
+        chunk.error = None
+        chunk.hosts = None
+        if self.command_id is None and isinstance(response, dict):
+            self.command_id = response.get('command_id')
+        logger.info('Sent chunk %d of bulk_create to workspace %s: %d objects',
+                    chunk.index, self.workspace_name, chunk.objects)
+        return True
+
+
+# I'm Py3
@@ -0,0 +1,133 @@
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+"""
+import time
+import logging
+from queue import Queue, Empty
+from threading import Thread, Event
+
+from faraday_client.model.bulk import new_pending_id
+from faraday_client.plugins.bulk_upload import _is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before saving again a command the server could not
+# receive, doubled on every failure up to COMMAND_SAVE_MAX_RETRY_DELAY
+COMMAND_SAVE_RETRY_DELAY = 1
+COMMAND_SAVE_MAX_RETRY_DELAY = 60
+# Seconds the queued commands have to reach the server when exiting
+COMMANDS_FLUSH_TIMEOUT = 10
+
+
+class CommandsQueue(Thread):
+    """Saves the commands run in the shells on the server in the background,
+    so the shell doesn't wait for the server before running them.
+
+    A registered command gets a provisional (pending) ID right away. The
+    tasks submitted for it, i.e. processing its output, run after it's
+    saved and has its real ID. Everything runs in order, in one thread: a
+    command the server can not receive is retried until it's saved and the
+    following ones wait for it.
+
+    A command the server rejects, i.e. answering with a 4xx status, isn't
+    retried, it would be rejected again.
+    Its tasks run anyway with the command still having its pending ID, so
+    they can keep what the command found without it.
+    """
+
+    def __init__(self, save, retry_delay=COMMAND_SAVE_RETRY_DELAY,
+                 max_retry_delay=COMMAND_SAVE_MAX_RETRY_DELAY):
+        Thread.__init__(self, name="CommandsQueueThread")
+        self.daemon = True
+        self._save = save
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._queue = Queue()
+        self._stop_event = Event()
+
+    def register(self, cmd_info):
+        """Give cmd_info a provisional ID and queue it to be saved. Return
+        the provisional ID."""
+        pending_id = new_pending_id()
+        cmd_info.setID(pending_id)
+        self._put(cmd_info, None)
+        return pending_id
+
+    def submit(self, cmd_info, task):
+        """Run task after cmd_info, and every command registered before
+        it, were saved."""
+        self._put(cmd_info, task)
+
+    def pending(self):
+        """Amount of commands and tasks not processed yet, the one being
+        processed included."""
+        return self._queue.unfinished_tasks
+
+    def join_queue(self):
+        """Wait until every registered command and task was processed."""
+        self._queue.join()
+
+    def flush(self, timeout=COMMANDS_FLUSH_TIMEOUT):
+        """Wait up to timeout seconds for the queued commands and tasks to
+        be processed and stop. Return True if every one was."""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._queue.all_tasks_done.wait(remaining)
+            flushed = not self._queue.unfinished_tasks
+        self.stop()
+        return flushed
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _put(self, cmd_info, task):
+        if not self.is_alive() and not self._stop_event.is_set():
+            try:
+                self.start()
+            except RuntimeError:
+                # already started by another thread
+                pass
+        self._queue.put((cmd_info, task))
+
+    def _save_command(self, cmd_info):
+        delay = self.retry_delay
+        while not self._stop_event.is_set():
+            try:
+                cmd_info.setID(self._save(cmd_info))
+                return True
+            except Exception as ex:
+                if not _is_retryable(ex):
+                    logger.exception('The server rejected command %s', cmd_info.command)
+                    return False
+                logger.warning('Could not save command %s, retrying in %s seconds: %s',
+                               cmd_info.command, delay, ex)
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+        return False
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                cmd_info, task = self._queue.get(timeout=1)
+            except Empty:
+                continue
+            try:
+                if task is None:
+                    self._save_command(cmd_info)
+                else:
+                    task()
+            except Exception:
+                logger.exception('Error processing command %s', cmd_info.command)
+            finally:
+                self._queue.task_done()
+        if self.pending():
+            logger.warning('%d commands were not sent to the server', self.pending())
+
+
+# I'm Py3
@@ -14,14 +14,18 @@ import os
 import time
 import shlex
 import logging
-from threading import Thread
+from collections import deque
+from threading import Thread, Lock
 from multiprocessing import JoinableQueue, Process
 
 from faraday_client.config.configuration import getInstanceConfiguration
 from faraday_client.persistence.server.server import _conf, _get_base_server_url
 from faraday_client.plugins.plugin import PluginProcess
+from faraday_client.plugins.bulk_upload import BulkCreateUpload
+from faraday_client.plugins.commands_queue import CommandsQueue
+from faraday_client.model.bulk import is_pending_id
 import faraday_client.model.api
-from faraday_client.model.commands_history import CommandRunInformation
+from faraday_client.model.commands_history import CommandRunInformation, get_host_identity
 from faraday_client.model import Modelactions
 
 from faraday_client.config.constant import (
@@ -34,6 +38,10 @@ from faraday_client.start_client import (
 
 CONF = getInstanceConfiguration()
 
+# Commands of a shell kept waiting for their output, the oldest ones are
+# forgotten, as their output was lost
+MAX_ACTIVE_COMMANDS = 16
+
 logger = logging.getLogger(__name__)
 
 
@@ -52,12 +60,20 @@ class PluginController(Thread):
         self.output_path = os.path.join(
             os.path.expanduser(CONST_FARADAY_HOME_PATH),
             CONST_FARADAY_ZSH_OUTPUT_PATH)
+        # commands of every shell waiting for their output, oldest first:
+        # a shell may send the next command before the last output arrived
         self._active_plugins = {}
+        self._active_plugins_lock = Lock()
         self.plugin_sets = {}
         self.plugin_manager.addController(self, self.id)
-        self.stop = False
         self.pending_actions = pending_actions
         self.end_event = end_event
+        # reports may be processed by many threads at the same time
+        self._mapper_manager_lock = Lock()
+        # look up the host information of the commands before the first one
+        get_host_identity().refresh_async()
+        # shell commands are saved in the background, see processCommandInput
+        self.commands_queue = CommandsQueue(self._save_command)
 
     def _find_plugin(self, plugin_id):
         return self._plugins.get(plugin_id, None)
@@ -107,8 +123,10 @@ class PluginController(Thread):
         return self._plugins
 
     def stop(self):
-        self.plugin_process.stop()
-        self.stop = True
+        """Send the shell commands still queued to the server, for a while,
+        before exiting."""
+        # the ones left are logged by the queue
+        self.commands_queue.flush()
 
     def processOutput(self, plugin, output, command, isReport=False):
         """
@@ -123,12 +141,19 @@ class PluginController(Thread):
         :return: None
         """
         plugin.processOutput(output.decode('utf8'))
+        self._send_plugin_result(plugin, command)
+
+    def _send_plugin_result(self, plugin, command):
         base_url = _get_base_server_url()
         cookies = _conf().getFaradaySessionCookies()
         command.duration = time.time() - command.itime
-        plugin_result = plugin.get_json()
-        self.send_data(command.workspace, plugin_result)
         command_id = command.getID()
+        if is_pending_id(command_id):
+            # the server rejected it, the objects are sent with the
+            # plugin's command
+            self.send_data(command.workspace, plugin.get_data())
+            return
+        self.send_data(command.workspace, plugin.get_data(), command_id)
         data = command.toDict()
         data['tool'] = data['command']
         data.pop('id_available')
@@ -138,17 +163,27 @@ class PluginController(Thread):
             cookies=cookies)
         logger.info(f'Sent command duration {res.status_code}')
 
-    def send_data(self, workspace, data):
-        cookies = _conf().getFaradaySessionCookies()
-        base_url = _get_base_server_url()
-        res = requests.post(
-            f'{base_url}/_api/v3/ws/{workspace}/bulk_create',
-            cookies=cookies,
-            json=json.loads(data))
-        if res.status_code != 201:
-            logger.error('Server responded with status code {0}. API response was {1}'.format(res.status_code, res.text))
-            return False
-        return True
+    def send_data(self, workspace, data, command_id=None):
+        """
+            Send the hosts found by a plugin to the server with bulk_create,
+            in requests of bounded size.
+
+        :param workspace: name of the workspace
+        :param data: the plugin data, as returned by get_data or get_json,
+            with the hosts and the command which found them
+        :param command_id: id of the command already saved the hosts belong
+            to, the plugin's command is created otherwise
+        :return: the BulkCreateUpload, with the result of every chunk.
+            It's False if some chunk could not be sent.
+        """
+        if isinstance(data, (str, bytes)):
+            data = json.loads(data)
+        upload = BulkCreateUpload(workspace, data.get('hosts', []),
+                                  command=data.get('command'), command_id=command_id).send()
+        for chunk in upload.failed:
+            logger.error('Could not send {0} objects to the server (chunk {1}): {2}'.format(
+                chunk.objects, chunk.index, chunk.error))
+        return upload
 
     def _processAction(self, action, parameters):
         """
@@ -211,28 +246,51 @@ class PluginController(Thread):
                         'import_source': 'shell',
                         'command': cmd.split()[0],
                         'params': ' '.join(cmd.split()[1:])})
-                cmd_info.setID(self._mapper_manager.save(cmd_info))
+                # the shell runs the command now, it's saved in the background
+                self.commands_queue.register(cmd_info)
 
-                self._active_plugins[pid] = plugin, cmd_info
+                with self._active_plugins_lock:
+                    self._active_plugins.setdefault(
+                        pid, deque(maxlen=MAX_ACTIVE_COMMANDS)).append((plugin, cmd_info))
 
                 return plugin.id, modified_cmd_string
         return None, None
 
     def onCommandFinished(self, pid, exit_code, term_output):
-        if pid not in list(self._active_plugins.keys()):
-            return False
+        with self._active_plugins_lock:
+            commands = self._active_plugins.get(pid)
+            if not commands:
+                return False
+            plugin, cmd_info = commands.popleft()
+            if not commands:
+                del self._active_plugins[pid]
         if exit_code != 0:
-            del self._active_plugins[pid]
             return False
 
-        plugin, cmd_info = self._active_plugins.get(pid)
-
         cmd_info.duration = time.time() - cmd_info.itime
-        self._mapper_manager.update(cmd_info)
+        # processed once the command has its real ID
+        self.commands_queue.submit(
+            cmd_info, lambda: self._finishCommand(plugin, cmd_info, term_output))
+        return True
 
+    def _save_command(self, cmd_info):
+        with self._mapper_manager_lock:
+            self._mapper_manager.createMappers(cmd_info.workspace)
+            return self._mapper_manager.save(cmd_info)
+
+    def _finishCommand(self, plugin, cmd_info, term_output):
+        if is_pending_id(cmd_info.getID()):
+            logger.warning('Command %s was rejected by the server, its output is '
+                           'processed without it', cmd_info.command)
+        else:
+            with self._mapper_manager_lock:
+                self._mapper_manager.createMappers(cmd_info.workspace)
+                self._mapper_manager.update(cmd_info)
+        if hasattr(term_output, 'read'):
+            # streamed outputs are spooled to a file until they are parsed
+            with term_output:
+                term_output = term_output.read()
         self.processOutput(plugin, term_output, cmd_info)
-        del self._active_plugins[pid]
-        return True
 
     def processReport(self, plugin_id, filepath, ws_name=None):
         if plugin_id not in [plugin[0] for plugin in self._plugins]:
@@ -249,14 +307,18 @@ class PluginController(Thread):
                'params': filepath,
             })
 
-        self._mapper_manager.createMappers(ws_name)
-        command_id = self._mapper_manager.save(cmd_info)
+        with self._mapper_manager_lock:
+            self._mapper_manager.createMappers(ws_name)
+            command_id = self._mapper_manager.save(cmd_info)
         cmd_info.setID(command_id)
 
         logger.info('Processing report with plugin {0}'.format(plugin_id))
-        with open(filepath, 'rb') as output:
+        plugin = self.plugin_manager.get_plugin(plugin_id)
+        if plugin is None:
             plugin = [plugin[1] for plugin in self._plugins if plugin[0] == plugin_id].pop()
-            self.processOutput(plugin, output.read(), cmd_info, True)
+        # the plugin reads the report itself, it's not copied here
+        plugin.processReport(filepath)
+        self._send_plugin_result(plugin, cmd_info)
         return command_id
 
         # Plugin to process this report not found, update duration of plugin process
@@ -265,4 +327,5 @@ class PluginController(Thread):
         return False
 
     def clearActivePlugins(self):
-        self._active_plugins = {}
+        with self._active_plugins_lock:
+            self._active_plugins = {}
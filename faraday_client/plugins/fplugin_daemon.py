@@ -0,0 +1,332 @@
+"""
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+Optional server mode of fplugin. `fplugin --daemon` loads the available
+scripts once, then listens on a unix socket of the user. Every other
+`fplugin` invocation sends its arguments, working directory and stdin,
+stdout and stderr to it, and exits with the exit code of the script.
+
+The daemon keeps the logins to the server and the imported scripts, and
+runs every request in a forked child, so a request can't change the state
+seen by the next ones. Without a daemon, fplugin runs as always.
+
+Only the standard library is imported until the daemon is needed, so the
+thin invocations start fast.
+"""
+from __future__ import absolute_import
+
+import io
+import os
+import sys
+import json
+import array
+import select
+import signal
+import socket
+import logging
+import threading
+import contextlib
+import traceback
+
+logger = logging.getLogger(__name__)
+
+FPLUGIN_DAEMON_SOCKET = os.path.expanduser('~/.faraday/fplugin.sock')
+# Set it to run fplugin in the process even if a daemon is running
+FPLUGIN_NO_DAEMON_VAR = 'FPLUGIN_NO_DAEMON'
+# Environment of the client which is applied to the request
+FORWARDED_ENVIRON = ('REQUESTS_CA_BUNDLE', 'TERM', 'COLUMNS', 'LINES')
+MAX_REQUEST_SIZE = 64 * 1024
+
+
+def _send_fds(sock, data, fds):
+    """Send data and the file descriptors fds (socket.send_fds needs
+    Python 3.9)."""
+    return sock.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))])
+
+
+def _recv_fds(sock, bufsize, maxfds):
+    """Return the data and the file descriptors received, as
+    socket.recv_fds does on Python 3.9."""
+    fds = array.array('i')
+    data, ancdata, _, _ = sock.recvmsg(bufsize, socket.CMSG_LEN(maxfds * fds.itemsize))
+    for level, kind, cmsg_data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(cmsg_data[:len(cmsg_data) - (len(cmsg_data) % fds.itemsize)])
+    return data, list(fds)
+
+
+def _wait_exit_code(status):
+    """Return the exit code of a wait status, minus the signal number if
+    the process was killed (os.waitstatus_to_exitcode needs Python 3.9)."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _send_message(sock, message, fds=()):
+    data = json.dumps(message).encode() + b'\n'
+    if fds:
+        _send_fds(sock, data, list(fds))
+    else:
+        sock.sendall(data)
+
+
+def _receive_message(sock, maxfds=0):
+    """Return the next message sent with _send_message and the file
+    descriptors sent with it."""
+    data, fds = _recv_fds(sock, MAX_REQUEST_SIZE, maxfds)
+    while data and not data.endswith(b'\n') and len(data) < MAX_REQUEST_SIZE:
+        block = sock.recv(MAX_REQUEST_SIZE)
+        if not block:
+            break
+        data += block
+    if not data.endswith(b'\n'):
+        for fd in fds:
+            os.close(fd)
+        raise ValueError('Incomplete fplugin request')
+    return json.loads(data), fds
+
+
+def _is_listening(socket_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+
+def run_in_daemon(argv, socket_path=FPLUGIN_DAEMON_SOCKET):
+    """Run fplugin with argv in the daemon, with the stdin, stdout and stderr
+    of this process. Return the exit code, or None if no daemon is running."""
+    if not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    with sock:
+        request = {'argv': list(argv),
+                   'cwd': os.getcwd(),
+                   'environ': {name: os.environ[name] for name in FORWARDED_ENVIRON if name in os.environ}}
+        _send_message(sock, request, (0, 1, 2))
+        try:
+            answer = sock.makefile('rb').readline()
+        except KeyboardInterrupt:
+            # closing the connection interrupts the script
+            return 130
+    try:
+        return json.loads(answer)['exit_code']
+    except (ValueError, KeyError):
+        return 1
+
+
+def _exit_code(code):
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    sys.stderr.write('%s\n' % code)
+    return 1
+
+
+class FPluginDaemon:
+    """Serves fplugin requests from a unix socket, forking a child with the
+    warm registry, sessions and scripts for every one of them."""
+
+    def __init__(self, socket_path=FPLUGIN_DAEMON_SOCKET):
+        self.socket_path = socket_path
+        self._listener = None
+        # the caches are filled and the children forked one at a time, so no
+        # child starts with a lock held by another request
+        self._lock = threading.Lock()
+        self._running = False
+
+    def listen(self):
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise RuntimeError('A fplugin daemon is already listening on %s' % self.socket_path)
+            os.remove(self.socket_path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            self._listener.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        self._listener.listen(16)
+
+    def serve_forever(self):
+        from faraday_client.bin import fplugin  # pylint:disable=import-outside-toplevel
+        fplugin.load_plugins()
+        fplugin.get_model_controller()
+        if self._listener is None:
+            self.listen()
+        logger.info('fplugin daemon listening on %s', self.socket_path)
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    connection, _ = self._listener.accept()
+                except OSError:
+                    if not self._running:
+                        break
+                    raise
+                threading.Thread(target=self._handle, args=(connection,), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        self._running = False
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+            try:
+                # wakes up serve_forever
+                listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            listener.close()
+
+    def _handle(self, connection):
+        with connection:
+            try:
+                request, fds = _receive_message(connection, maxfds=3)
+            except (OSError, ValueError) as ex:
+                logger.warning('Invalid fplugin request: %s', ex)
+                return
+            try:
+                with self._lock:
+                    self._warm_up(request)
+                    pid = self._fork(request, fds, connection)
+                exit_code = self._wait(pid, connection)
+            except Exception as ex:  # pylint:disable=broad-except
+                logger.error('Could not run fplugin request %s: %s', request.get('argv'), ex)
+                exit_code = 1
+            finally:
+                for fd in fds:
+                    os.close(fd)
+            try:
+                _send_message(connection, {'exit_code': exit_code})
+            except OSError:
+                pass
+
+    def _warm_up(self, request):
+        """Log in and import the script in the daemon, so the next requests
+        for them find them ready."""
+        from faraday_client.bin import fplugin  # pylint:disable=import-outside-toplevel
+        try:
+            # the help and the usage errors are for the child to print
+            with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                args, _ = fplugin.build_parser().parse_known_args(request['argv'])
+        except SystemExit:
+            return
+        if args.command in fplugin.load_plugins():
+            try:
+                fplugin.load_script(args.command)
+            except Exception as ex:  # pylint:disable=broad-except
+                logger.debug('Could not import %s: %s', args.command, ex)
+        if args.username and args.password:
+            ca_bundle = args.cert_path or request['environ'].get(fplugin.REQUESTS_CA_BUNDLE_VAR)
+            old_ca_bundle = os.environ.pop(fplugin.REQUESTS_CA_BUNDLE_VAR, None)
+            if ca_bundle:
+                os.environ[fplugin.REQUESTS_CA_BUNDLE_VAR] = ca_bundle
+            try:
+                fplugin.login(args.url, args.username, args.password)
+            except Exception as ex:  # pylint:disable=broad-except
+                logger.debug('Could not log in %s: %s', args.url, ex)
+            finally:
+                os.environ.pop(fplugin.REQUESTS_CA_BUNDLE_VAR, None)
+                if old_ca_bundle is not None:
+                    os.environ[fplugin.REQUESTS_CA_BUNDLE_VAR] = old_ca_bundle
+
+    def _fork(self, request, fds, connection):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            return pid
+        code = 1
+        try:
+            connection.close()
+            if self._listener is not None:
+                self._listener.close()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            # the streams of the daemon may have buffered data or not be
+            # on these descriptors at all
+            sys.stdin = open(0, 'r', closefd=False)
+            sys.stdout = open(1, 'w', closefd=False)
+            sys.stderr = open(2, 'w', closefd=False)
+            code = self._run(request)
+        except BaseException:  # pylint:disable=broad-except
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+        return None
+
+    @staticmethod
+    def _run(request):
+        """Run the request in the forked child, return its exit code."""
+        from faraday_client.bin import fplugin  # pylint:disable=import-outside-toplevel
+        from faraday_client.persistence.server.transport import reset_transport  # pylint:disable=import-outside-toplevel
+        # the pooled connections belong to the daemon
+        reset_transport()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.chdir(request['cwd'])
+        os.environ.update(request['environ'])
+        sys.argv = ['fplugin'] + request['argv']
+        try:
+            fplugin.main(request['argv'])
+        except SystemExit as ex:
+            return _exit_code(ex.code)
+        return 0
+
+    @staticmethod
+    def _wait(pid, connection):
+        """Wait for the child running a request, interrupting it if the
+        client goes away. Return its exit code."""
+        while True:
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                return _wait_exit_code(status)
+            readable, _, _ = select.select([connection], [], [], 0.1)
+            if readable and not connection.recv(1, socket.MSG_PEEK):
+                os.kill(pid, signal.SIGINT)
+                _, status = os.waitpid(pid, 0)
+                return _wait_exit_code(status)
+
+
+def main(argv=None):
+    """Entry point of fplugin: serve as the daemon with --daemon, run in the
+    daemon if one is running, else run here."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['--daemon']:
+        socket_path = argv[1] if len(argv) > 1 else FPLUGIN_DAEMON_SOCKET
+        FPluginDaemon(socket_path).serve_forever()
+        return
+    if not os.environ.get(FPLUGIN_NO_DAEMON_VAR):
+        exit_code = run_in_daemon(argv)
+        if exit_code is not None:
+            sys.exit(exit_code)
+    from faraday_client.bin import fplugin  # pylint:disable=import-outside-toplevel
+    fplugin.main(argv)
+
+
+if __name__ == '__main__':
+    main()
+# I'm Py3
@@ -6,9 +6,11 @@ See the file 'doc/LICENSE' for the license information
 """
 from __future__ import absolute_import
 
-import imp
 import os
+import ast
 import sys
+import json
+import hashlib
 import logging
 
 from colorama import Fore
@@ -18,65 +20,162 @@ from faraday_client.config.configuration import getInstanceConfiguration
 CONF = getInstanceConfiguration()
 logger = logging.getLogger(__name__)
 
+# Bump it when the metadata stored in the index changes
+PLUGINS_INDEX_VERSION = 1
+PLUGINS_INDEX_FILENAME = 'fplugin_index.json'
+
+
+def inspect_plugin(source, filename='<fplugin>'):
+    """Return the description, pretty name and whether there is a main
+    function of a script, reading its source instead of running it.
+    Raise SyntaxError if it can't be parsed."""
+    metadata = {'description': None, 'prettyname': None, 'has_main': False}
+    for node in ast.parse(source, filename).body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            names = [node.name]
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = [alias.asname or alias.name for alias in node.names]
+        elif isinstance(node, ast.Assign):
+            names = [target.id for target in node.targets if isinstance(target, ast.Name)]
+            for name in names:
+                if name in ('__description__', '__prettyname__'):
+                    try:
+                        metadata[name.strip('_')] = ast.literal_eval(node.value)
+                    except ValueError:
+                        # not a literal, ie. built at runtime
+                        pass
+        else:
+            continue
+        if 'main' in names:
+            metadata['has_main'] = True
+    return metadata
+
+
+class PluginsIndex:
+    """Metadata of the scripts, stored in a file so they are inspected again
+    only when they change. A script whose modification time or size changed
+    is hashed, and inspected only if its content did change."""
+
+    def __init__(self, path):
+        self.path = path
+        self._plugins = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as index_file:
+                index = json.load(index_file)
+        except (IOError, OSError, ValueError):
+            return
+        if isinstance(index, dict) and index.get('version') == PLUGINS_INDEX_VERSION:
+            self._plugins = index.get('plugins', {})
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w') as index_file:
+                json.dump({'version': PLUGINS_INDEX_VERSION, 'plugins': self._plugins}, index_file)
+            os.replace(tmp_path, self.path)
+        except (IOError, OSError) as ex:
+            logger.debug('Could not save the fplugin index %s: %s', self.path, ex)
+            return
+        self._dirty = False
+
+    def get(self, plugin_path):
+        """Return the metadata of the script, or raise SyntaxError or
+        OSError if it can't be read."""
+        stat = os.stat(plugin_path)
+        entry = self._plugins.get(plugin_path)
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            return self._metadata(entry)
+        with open(plugin_path, 'rb') as plugin_file:
+            source = plugin_file.read()
+        digest = hashlib.sha1(source).hexdigest()
+        if not entry or entry['sha1'] != digest:
+            try:
+                metadata, error = inspect_plugin(source, plugin_path), None
+            except SyntaxError as ex:
+                metadata, error = None, str(ex)
+            entry = {'sha1': digest, 'metadata': metadata, 'error': error}
+        entry.update(mtime=stat.st_mtime, size=stat.st_size)
+        self._plugins[plugin_path] = entry
+        self._dirty = True
+        return self._metadata(entry)
+
+    @staticmethod
+    def _metadata(entry):
+        if entry['error'] is not None:
+            raise SyntaxError(entry['error'])
+        return entry['metadata']
+
+    def prune(self, plugin_paths):
+        """Forget the scripts which are not in plugin_paths."""
+        for plugin_path in set(self._plugins) - set(plugin_paths):
+            del self._plugins[plugin_path]
+            self._dirty = True
+
+
+def get_available_plugins(scan_path=None, index_path=None):
+    """Return the scripts in bin by name, with their description, pretty
+    name and path. They are not imported, see fplugin.load_script."""
+    if scan_path is None:
+        import faraday_client  # pylint:disable=import-outside-toplevel
+        client_base_path = os.path.dirname(os.path.abspath(faraday_client.__file__))
+        scan_path = os.path.join(client_base_path, "bin")
+    if index_path is None:
+        index_path = os.path.join(CONF.getDataPath(), PLUGINS_INDEX_FILENAME)
 
-def get_available_plugins():
-    import faraday_client  # pylint:disable=import-outside-toplevel
-    client_base_path = os.path.dirname(os.path.abspath(faraday_client.__file__))
-
-    scan_path = os.path.join(client_base_path, "bin")
     plugin_list = os.listdir(scan_path)
 
     plugin_list = [
         p for p in plugin_list
-        if p.endswith('.py')
+        if p.endswith('.py') and p not in ('fplugin.py', '__init__.py')
         ]
-    plugin_list.remove('fplugin.py')
-    plugin_list.remove('__init__.py')
 
+    index = PluginsIndex(index_path)
     plugins_dic = {}
 
-    for plugin in plugin_list:
+    for plugin in sorted(plugin_list):
         plugin_path = os.path.join(scan_path, plugin)
+        plugin_name = os.path.splitext(plugin)[0]
 
         try:
-
-            plugin_name = os.path.splitext(plugin)[0]
-
-            module = imp.load_source('module_fplugin_%s' % plugin_name, plugin_path)
-
-            try:
-                description = getattr(module, '__description__')
-            except AttributeError:
-                description = 'Empty'
-                sys.stderr.write(Fore.YELLOW +
-                                 "WARNING: Plugin missing a description. Please update it! [%s]\n" % plugin +
-                                 Fore.RESET)
-
-            try:
-                prettyname = getattr(module, '__prettyname__')
-            except AttributeError:
-                prettyname = plugin_name
-                sys.stderr.write(Fore.YELLOW +
-                                 "WARNING: Plugin missing a pretty name. Please update it! [%s]\n" % plugin +
-                                 Fore.RESET)
-
-            try:
-                main = getattr(module, 'main')
-            except AttributeError:
-                main = None
-                sys.stderr.write(Fore.YELLOW +
-                                 "WARNING: Plugin missing a main function. Please fix it! [%s]\n" % plugin +
-                                 Fore.RESET)
-
-            plugins_dic[plugin[:-3]] = {
-                'description': description,
-                'prettyname': prettyname,
-                'main': main
-            }
-
-        except Exception:
-            logger.exception("Unable to import module %s\n" % plugin_path)
-
+            metadata = index.get(plugin_path)
+        except (SyntaxError, IOError, OSError) as ex:
+            logger.error("Unable to inspect module %s: %s", plugin_path, ex)
+            continue
+
+        description = metadata['description']
+        if description is None:
+            description = 'Empty'
+            sys.stderr.write(Fore.YELLOW +
+                             "WARNING: Plugin missing a description. Please update it! [%s]\n" % plugin +
+                             Fore.RESET)
+
+        prettyname = metadata['prettyname']
+        if prettyname is None:
+            prettyname = plugin_name
+            sys.stderr.write(Fore.YELLOW +
+                             "WARNING: Plugin missing a pretty name. Please update it! [%s]\n" % plugin +
+                             Fore.RESET)
+
+        if not metadata['has_main']:
+            sys.stderr.write(Fore.YELLOW +
+                             "WARNING: Plugin missing a main function. Please fix it! [%s]\n" % plugin +
+                             Fore.RESET)
+
+        plugins_dic[plugin_name] = {
+            'description': description,
+            'prettyname': prettyname,
+            'path': plugin_path,
+        }
+
+    index.prune(os.path.join(scan_path, plugin) for plugin in plugin_list)
+    index.save()
     return plugins_dic
 
 
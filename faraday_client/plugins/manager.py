@@ -73,6 +73,15 @@ class PluginManager:
             for c_id, c_instance in self._controllers.items():
                 c_instance.updatePluginSettings(plugin_id, new_settings)
 
+    def get_plugin(self, plugin_id):
+        """Return a new instance of the plugin of id plugin_id with its
+        settings, None if there isn't such plugin. Reports processed at
+        the same time must not share a plugin instance."""
+        plugin = self._plugins_manager.get_plugin(plugin_id)
+        if plugin is not None and plugin_id in self._plugin_settings:
+            plugin.updateSettings(self._plugin_settings[plugin_id]["settings"])
+        return plugin
+
     def plugins(self):
         plugins = list(self._plugins_manager.get_plugins())
         for plugin_id, plugin in plugins:
@@ -2,8 +2,11 @@
 # Copyright (C) 2016  Infobyte LLC (http://www.infobytesec.com/)
 # See the file 'doc/LICENSE' for the license information
 import os
+import queue
+import atexit
 import logging
 import logging.handlers
+import threading
 import errno
 
 from faraday_client.config.constant import CONST_FARADAY_HOME_PATH
@@ -21,6 +24,76 @@ ROOT_LOGGER = u'faraday_client'
 LOGGING_HANDLERS = []
 LVL_SETTABLE_HANDLERS = []
 LOGGING_LEVEL = 'INFO'
+# Records waiting to be written. When it's full the records below
+# LOG_BLOCKING_LEVEL are dropped, the others wait up to LOG_BLOCKING_TIMEOUT
+# seconds for room before being dropped too.
+LOG_QUEUE_SIZE = 10000
+LOG_BLOCKING_LEVEL = logging.WARNING
+LOG_BLOCKING_TIMEOUT = 0.1
+
+_queue_handler = None
+_listener = None
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Puts the records in a bounded queue instead of writing them, and
+    counts the ones dropped because it was full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self._dropped_lock = threading.Lock()
+        self.dropped = {}
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if record.levelno >= LOG_BLOCKING_LEVEL:
+            try:
+                self.queue.put(record, timeout=LOG_BLOCKING_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+        with self._dropped_lock:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+
+    def dropped_count(self):
+        with self._dropped_lock:
+            return sum(self.dropped.values())
+
+
+class LogListener(logging.handlers.QueueListener):
+    """Writes the queued records from its own thread, and reports the
+    records dropped once the queue has room again."""
+
+    def __init__(self, queue_handler, *handlers):
+        super().__init__(queue_handler.queue, *handlers, respect_handler_level=True)
+        self.queue_handler = queue_handler
+        self._reported_drops = 0
+
+    def handle(self, record):
+        super().handle(record)
+        dropped = self.queue_handler.dropped_count()
+        if dropped > self._reported_drops and self.queue.qsize() < self.queue.maxsize // 2:
+            self.report_drops()
+
+    def report_drops(self):
+        """Write how many records were dropped, if some were since the
+        last report."""
+        dropped = self.queue_handler.dropped.copy()
+        if sum(dropped.values()) > self._reported_drops:
+            self._reported_drops = sum(dropped.values())
+            report = logging.getLogger(ROOT_LOGGER).makeRecord(
+                ROOT_LOGGER, logging.WARNING, __file__, 0,
+                'Log queue full, %d records dropped so far: %s',
+                (sum(dropped.values()), dropped), None)
+            super().handle(report)
+
+    def enqueue_sentinel(self):
+        # the queue may be full, wait for room instead of failing
+        self.queue.put(self._sentinel)
 
 
 def setup_logging():
@@ -31,6 +104,61 @@ def setup_logging():
     formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
     setup_console_logging(formatter)
     setup_file_logging(formatter)
+    start_logging_thread()
+    atexit.register(stop_logging_thread)
+    os.register_at_fork(after_in_child=_restart_logging_thread)
+
+
+def start_logging_thread():
+    """Send the records of the client to LOGGING_HANDLERS from a thread,
+    so logging doesn't wait for the disk or the console."""
+    global _queue_handler, _listener
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in LOGGING_HANDLERS + [_queue_handler]:
+        logger.removeHandler(handler)
+    _queue_handler = BoundedQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _listener = LogListener(_queue_handler, *LOGGING_HANDLERS)
+    _listener.start()
+    logger.addHandler(_queue_handler)
+    _update_level()
+
+
+def stop_logging_thread():
+    """Write the queued records and go back to writing them in the
+    calling thread, so the records logged at exit aren't lost."""
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener.report_drops()
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.removeHandler(_queue_handler)
+    _queue_handler = _listener = None
+    for handler in LOGGING_HANDLERS:
+        logger.addHandler(handler)
+        try:
+            handler.flush()
+        except (OSError, ValueError):
+            # ie. the console was already closed
+            pass
+
+
+def _restart_logging_thread():
+    # the thread of the parent doesn't exist in a forked child
+    if _listener is not None:
+        start_logging_thread()
+
+
+def get_dropped_records():
+    """Return the amount of records dropped by level name."""
+    return _queue_handler.dropped.copy() if _queue_handler is not None else {}
+
+
+def _update_level():
+    """Don't even create the records no handler would write."""
+    levels = [handler.level for handler in LOGGING_HANDLERS]
+    level = min(levels) if levels else logging.WARNING
+    logging.getLogger(ROOT_LOGGER).setLevel(level or logging.DEBUG)
 
 
 def setup_console_logging(formatter):
@@ -52,9 +180,21 @@ def setup_file_logging(formatter):
 
 
 def add_handler(handler):
-    logger = logging.getLogger(ROOT_LOGGER)
-    logger.addHandler(handler)
     LOGGING_HANDLERS.append(handler)
+    if _listener is not None:
+        _listener.handlers = tuple(LOGGING_HANDLERS)
+    else:
+        logging.getLogger(ROOT_LOGGER).addHandler(handler)
+    _update_level()
+
+
+def remove_handler(handler):
+    LOGGING_HANDLERS.remove(handler)
+    if _listener is not None:
+        _listener.handlers = tuple(LOGGING_HANDLERS)
+    else:
+        logging.getLogger(ROOT_LOGGER).removeHandler(handler)
+    _update_level()
 
 
 def get_logger(obj=None):
@@ -77,6 +217,7 @@ def get_logger(obj=None):
 def set_logging_level(level):
     for handler in LVL_SETTABLE_HANDLERS:
         handler.setLevel(level)
+    _update_level()
 
 
 def create_logging_path():
@@ -3,105 +3,190 @@ Faraday Penetration Test IDE
 Copyright (C) 2013  Infobyte LLC (http://www.infobytesec.com/)
 See the file 'doc/LICENSE' for the license information
 
+Helper of the zsh integration. faraday.zsh starts it once per shell as a
+coprocess and asks it, one line per request, what it used to ask curl,
+python and grep for every command and every prompt:
+
+    input <pid> <pwd> <cmd>             ->  ok <plugin> <new cmd> | none
+    output <pid> <exit code> <file>     ->  ok
+    workspace                           ->  <workspace name>
+    status                              ->  <status code of /status/check>
+
+Every request starts with an id, repeated at the start of its answer, and
+an answer is "error" if the request failed. Fields are separated by tabs. Tabs, newlines and backslashes inside them
+are escaped as \\t, \\n and \\\\. The outputs are sent gzipped in the
+background, in order, and their files are removed once sent.
+
+Only the standard library is used, so it starts fast with any python3.
 """
 from __future__ import absolute_import
 from __future__ import print_function
 
-import json
-import requests
-import sys
-import uuid
 import os
+import re
+import sys
+import json
+import zlib
 import base64
-
-#TODO: load output dir from faraday config
-#check if output dir already exists, otherwise create it
-file_path = os.path.realpath(__file__)
-output_folder = "%s/output" % os.path.dirname(file_path)
-if not os.path.exists(output_folder):
-    os.mkdir(output_folder)
-
-host = os.environ["FARADAY_ZSH_HOST"]
-port = int(os.environ["FARADAY_ZSH_RPORT"])
-
-url_input = "http://%s:%d/cmd/input" % (host, port)
-url_output = "http://%s:%d/cmd/output" % (host, port)
-url_active_plugins = "http://%s:%d/cmd/active-plugins" % (host, port)
-headers = {'Content-type': 'application/json', 'Accept': 'application/json'}
-
-
-def send_cmd(pid, cmd):
-
-    data = {'pid': pid, 'cmd': cmd}
-    new_cmd = cmd
-    response = ''
-
-    try:
-        request = requests.post(
-            url_input,
-            data=json.dumps(data),
-            headers=headers)
-
-        if request.status_code == 200:
-
-            response = request.json()
-            if response.get("cmd") is not None:
-                new_cmd = response.get("cmd")
-
-            output_file = "%s/%s%s.output" % (
-                output_folder, data['pid'], uuid.uuid4())
-
-            new_cmd += " >&1 > %s" % output_file
-    except:
-        response = ''
-    finally:
-        print(response)
-        return 0
-
-def gen_output(pid):
-    print("%s/%s.%s.output" % (output_folder, pid, uuid.uuid4()))
-    return 0
-
-def send_output(pid, exit_code, output_file):
-    output_file = open(output_file)
-    output = output_file.read()
-
-    data = {
-        'pid': pid,
-        'exit_code': exit_code,
-        'output': base64.b64encode(output)
-    }
-
-    response = requests.post(url_output,
-                             data=json.dumps(data),
-                             headers=headers)
-    if response.status_code != 200:
-        print(response.json())
-        return -1
-    return 0
+import logging
+import threading
+import http.client
+from queue import Queue
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.path.expanduser('~/.faraday/config/user.xml')
+# Seconds to wait for the REST API, faraday.zsh waits 5 for an answer
+TIMEOUT = 2
+OUTPUT_BLOCK_SIZE = 64 * 1024
+
+_ESCAPES = {'\\': '\\', 'n': '\n', 't': '\t'}
+_LAST_WORKSPACE = re.compile(r'<last_workspace>([^<]*)</last_workspace>')
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('\t', '\\t')
+
+
+def unescape(value):
+    return re.sub(r'\\(.)', lambda match: _ESCAPES.get(match.group(1), match.group(0)), value)
+
+
+def _gzip_blocks(filename):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    with open(filename, 'rb') as output:
+        for block in iter(lambda: output.read(OUTPUT_BLOCK_SIZE), b''):
+            compressed = compressor.compress(block)
+            if compressed:
+                yield compressed
+    yield compressor.flush()
+
+
+class ZshHelper:
+    """Answers the requests of a zsh session, keeping its connection to the
+    REST API and the last workspace read from the configuration."""
+
+    def __init__(self, host, port, config_path=CONFIG_PATH):
+        self.host = host
+        self.port = port
+        self.config_path = config_path
+        # one connection per thread: the outputs are sent by another one
+        self._connections = threading.local()
+        self._workspace = ''
+        self._config_signature = None
+        self._outputs = Queue()
+        self._outputs_thread = threading.Thread(target=self._send_outputs,
+                                                name='OutputsThread', daemon=True)
+        self._outputs_thread.start()
+
+    def _request(self, method, path, body=None, headers=None, encode_chunked=False):
+        """Send a request reusing the connection, connecting again once if
+        the server closed it. Return (status, body)."""
+        for retry in (False, True):
+            connection = getattr(self._connections, 'connection', None)
+            if connection is None:
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=TIMEOUT)
+                self._connections.connection = connection
+            try:
+                connection.request(method, path, body=body, headers=headers or {},
+                                   encode_chunked=encode_chunked)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                self._connections.connection = None
+                if retry or encode_chunked:
+                    raise
+        return None
+
+    def input(self, pid, pwd, cmd):
+        # not waiting for the previous output, the server pairs the
+        # outputs of a shell with its commands in order
+        data = {'pid': int(pid),
+                'pwd': base64.b64encode(pwd.encode()).decode(),
+                'cmd': base64.b64encode(cmd.encode()).decode()}
+        status, body = self._request('POST', '/cmd/input', json.dumps(data),
+                                     {'Content-Type': 'application/json'})
+        response = json.loads(body) if status == 200 else {}
+        if response.get('code') != 200:
+            return ['none']
+        new_cmd = response.get('cmd')
+        return ['ok', str(response.get('plugin')), new_cmd if new_cmd is not None else cmd]
+
+    def output(self, pid, exit_code, filename):
+        self._outputs.put((pid, exit_code, filename))
+        return ['ok']
+
+    def _send_outputs(self):
+        while True:
+            pid, exit_code, filename = self._outputs.get()
+            try:
+                path = '/cmd/output/stream?' + urlencode({'pid': pid, 'exit_code': exit_code})
+                self._request('POST', path, _gzip_blocks(filename),
+                              {'Content-Type': 'application/octet-stream',
+                               'Content-Encoding': 'gzip'},
+                              encode_chunked=True)
+            except (http.client.HTTPException, OSError) as ex:
+                logger.warning('Could not send the output of %s: %s', filename, ex)
+            finally:
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+                self._outputs.task_done()
+
+    def workspace(self):
+        """Return the last workspace, reading the configuration only when
+        it changed."""
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return [self._workspace]
+        signature = (stat.st_mtime, stat.st_size)
+        if signature != self._config_signature:
+            with open(self.config_path) as config:
+                match = _LAST_WORKSPACE.search(config.read())
+            self._workspace = match.group(1) if match else ''
+            self._config_signature = signature
+        return [self._workspace]
+
+    def status(self):
+        return [str(self._request('GET', '/status/check')[0])]
+
+    def handle(self, line):
+        """Return the answer to one request line."""
+        request_id, _, request = line.rstrip('\n').partition('\t')
+        fields = [unescape(field) for field in request.split('\t')]
+        handler = {'input': self.input,
+                   'output': self.output,
+                   'workspace': self.workspace,
+                   'status': self.status}.get(fields[0])
+        answer = ['error']
+        if handler is not None:
+            try:
+                answer = handler(*fields[1:])
+            except Exception as ex:  # pylint:disable=broad-except
+                logger.debug('Error answering %s: %s', fields[0], ex)
+        return '\t'.join([request_id] + [escape(field) for field in answer])
+
+    def serve(self, stdin=sys.stdin, stdout=sys.stdout):
+        for line in stdin:
+            print(self.handle(line), file=stdout, flush=True)
+        # the shell exited, send its last output before leaving
+        self._outputs.join()
 
 
 def main(argv):
-    if len(argv) < 2:
-        sys.exit(0)
-
-    action = argv[1]
-
-    # dispatcher = {
-    #     'send_cmd': send_cmd,
-    #     'send_output': send_output,
-    #     'gen_output': gen_output}
-
-    if action == 'send_cmd' and len(argv[2:]) == 2:
-        send_cmd(argv[2], argv[3])
-    if action == 'send_output' and len(argv[2:]) == 3:
-        send_cmd(argv[2], argv[3], argv[4])
-    if action == 'gen_output' and len(argv[2:]) == 1:
-        send_cmd(argv[2])
-
-    # if action in dispatcher.keys():
-    #     if len(argv[2:]) > 0:
-    #         dispatcher[action](*argv[2:])
+    host = os.environ.get("FARADAY_ZSH_HOST", "127.0.0.1")
+    port = int(os.environ.get("FARADAY_ZSH_RPORT", 9977))
+    helper = ZshHelper(host, port)
+    if len(argv) > 1:
+        # a single request from the command line
+        print(helper.handle('\t'.join(['0'] + argv[1:])))
+        helper._outputs.join()
+        return
+    helper.serve()
 
 
 if __name__ == '__main__':
@@ -36,17 +36,15 @@ except ImportError:
 setup(
     author="Matias Lang",
     author_email='matiasl@faradaysec.com',
-    python_requires='>=3.5',
+    python_requires='>=3.8',
     classifiers=[
         'Development Status :: 2 - Pre-Alpha',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: GNU General Public License v3 (GPLv3)',
         'Natural Language :: English',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
     ],
     description="Faraday GTK Client",
     install_requires=requirements,
@@ -65,7 +63,7 @@ setup(
     entry_points={  # Optional
           'console_scripts': [
               'faraday-client=faraday_client.start_client:main',
-              'fplugin=faraday_client.bin.fplugin:main',
+              'fplugin=faraday_client.plugins.fplugin_daemon:main',
           ],
       },
 )
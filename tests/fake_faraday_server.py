@@ -0,0 +1,500 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+A stand-in for the Faraday server, serving the parts of the v3 API the
+client uses from a thread of the test process: login and session,
+workspaces and their summary, hosts, services, vulns, credentials,
+commands, bulk_create, websocket_token and the websockets changes stream.
+
+The objects live in memory, generated from a fixed seed so every run gets
+the same workspace. Every request can be delayed to simulate the network,
+and the requests are counted by route:
+
+    with FakeFaradayServer(hosts=500, latency=0.002) as fake:
+        models.get_hosts(fake.workspace_name)
+        fake.requests['GET hosts']
+'''
+from __future__ import absolute_import
+
+import json
+import random
+import asyncio
+import itertools
+import threading
+from collections import Counter, OrderedDict
+
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.netutil import bind_sockets
+from tornado.web import Application, HTTPError, RequestHandler
+from tornado.websocket import WebSocketHandler
+
+from faraday_client.persistence.server import server, changes_stream
+from faraday_client.persistence.server.transport import reset_transport
+
+SESSION_COOKIE = 'faraday_session_2'
+SEVERITIES = ('critical', 'high', 'medium', 'low', 'info')
+SERVICES = ((22, 'ssh'), (80, 'http'), (443, 'https'), (3306, 'mysql'), (8080, 'http-proxy'))
+
+
+class FakeWorkspace:
+    """The objects of a workspace, with the ids and the shape the v3 API
+    gives them."""
+
+    def __init__(self, name, ids):
+        self.name = name
+        self._ids = ids
+        self.hosts = OrderedDict()
+        self.services = OrderedDict()
+        self.vulns = OrderedDict()
+        self.credentials = OrderedDict()
+        self.commands = OrderedDict()
+        self._hosts_by_ip = {}
+        self._services_by_port = {}
+        self._vulns_by_name = {}
+
+    def populate(self, hosts, services_per_host, vulns_per_service, vulns_per_host, seed=0):
+        generator = random.Random(seed)
+        for host_number in range(hosts):
+            ip = '10.{0}.{1}.{2}'.format(host_number // 65536, host_number // 256 % 256, host_number % 256)
+            host = self.add_host({'ip': ip, 'os': generator.choice(('Linux', 'Windows', 'unknown'))})
+            for port, name in SERVICES[:services_per_host]:
+                service = self.add_service(host, {'name': name, 'port': port, 'protocol': 'tcp',
+                                                  'status': 'open'})
+                for number in range(vulns_per_service):
+                    self.add_vuln(service, 'Service', {'name': '{0} vuln {1}'.format(name, number),
+                                                       'severity': generator.choice(SEVERITIES)})
+            for number in range(vulns_per_host):
+                self.add_vuln(host, 'Host', {'name': 'host vuln {0}'.format(number),
+                                             'severity': generator.choice(SEVERITIES)})
+
+    def add_host(self, data):
+        """Return the host with the ip of data, creating it if needed, as
+        bulk_create does. The created objects are in self.created."""
+        host = self._hosts_by_ip.get(data['ip'])
+        if host is not None:
+            return host
+        host_id = next(self._ids)
+        host = {'id': host_id, '_id': host_id, '_rev': '', 'type': 'Host', 'ip': data['ip'],
+                'name': data['ip'], 'os': data.get('os') or 'unknown',
+                'description': data.get('description', ''), 'hostnames': data.get('hostnames', []),
+                'mac': data.get('mac', ''), 'owned': False, 'owner': 'faraday',
+                'default_gateway': None, 'services': 0, 'vulns': 0,
+                'metadata': {'creator': '', 'owner': 'faraday', 'update_time': 0}}
+        self.hosts[host_id] = self._hosts_by_ip[data['ip']] = host
+        self.created.append(('Host', host_id))
+        return host
+
+    def add_service(self, host, data):
+        port = data.get('port') or (data.get('ports') or [0])[0]
+        key = (host['id'], int(port), data.get('protocol', 'tcp'))
+        service = self._services_by_port.get(key)
+        if service is not None:
+            return service
+        service_id = next(self._ids)
+        service = {'id': service_id, '_id': service_id, '_rev': '', 'type': 'Service',
+                   'name': data.get('name', ''), 'description': data.get('description', ''),
+                   'protocol': key[2], 'ports': key[1], 'status': data.get('status', 'open'),
+                   'version': data.get('version', ''), 'owned': False, 'owner': 'faraday',
+                   'parent': host['id'], 'host_id': host['id'], 'vulns': 0,
+                   'metadata': {'creator': '', 'owner': 'faraday', 'update_time': 0}}
+        self.services[service_id] = self._services_by_port[key] = service
+        host['services'] += 1
+        self.created.append(('Service', service_id))
+        return service
+
+    def add_vuln(self, parent, parent_type, data):
+        key = (parent_type, parent['id'], data.get('name'))
+        vuln = self._vulns_by_name.get(key)
+        if vuln is not None:
+            return vuln
+        host = parent if parent_type == 'Host' else self.hosts[parent['parent']]
+        vuln_id = next(self._ids)
+        vuln = {'id': vuln_id, '_id': vuln_id, '_rev': '', 'type': data.get('type', 'Vulnerability'),
+                'name': data.get('name', ''), 'desc': data.get('desc', 'A fake vulnerability'),
+                'data': data.get('data', ''), 'severity': data.get('severity', 'info'),
+                'refs': data.get('refs', []), 'confirmed': False, 'status': 'opened',
+                'resolution': '', 'owned': False, 'owner': 'faraday', 'policyviolations': [],
+                'parent': parent['id'], 'parent_type': parent_type, 'target': host['ip'],
+                'metadata': {'creator': '', 'owner': 'faraday', 'update_time': 0}}
+        self.vulns[vuln_id] = self._vulns_by_name[key] = vuln
+        host['vulns'] += 1
+        self.created.append(('Vulnerability', vuln_id))
+        return vuln
+
+    def add_credential(self, parent, parent_type, data):
+        credential_id = next(self._ids)
+        credential = {'id': credential_id, '_id': credential_id, '_rev': '', 'type': 'Cred',
+                      'name': data.get('name', ''), 'username': data.get('username', ''),
+                      'password': data.get('password', ''), 'owned': False, 'owner': 'faraday',
+                      'parent': parent['id'], 'parent_type': parent_type}
+        self.credentials[credential_id] = credential
+        self.created.append(('Cred', credential_id))
+        return credential
+
+    def add_command(self, data):
+        command_id = next(self._ids)
+        command = {'command': '', 'duration': 0, 'hostname': '', 'ip': '', 'itime': 0,
+                   'params': '', 'user': '', 'import_source': 'shell', 'tool': ''}
+        command.update({key: value for key, value in data.items() if key in command})
+        command.update(id=command_id, _id=command_id, _rev='', workspace=self.name)
+        self.commands[command_id] = command
+        self.created.append(('CommandRunInformation', command_id))
+        return command
+
+    def bulk_create(self, hosts):
+        """Create the objects of hosts and return the answer of each one,
+        nested like hosts."""
+
+        def answer(add, *args):
+            created = len(self.created)
+            obj = add(*args)
+            result = {'id': obj['id'], 'created': len(self.created) > created}
+            if not result['created']:
+                result['object'] = obj
+            return obj, result
+
+        def children(parent, parent_type, data, result):
+            result['vulnerabilities'] = [answer(self.add_vuln, parent, parent_type, vuln_data)[1]
+                                         for vuln_data in data.get('vulnerabilities') or []]
+            result['credentials'] = [answer(self.add_credential, parent, parent_type, credential_data)[1]
+                                     for credential_data in data.get('credentials') or []]
+
+        results = []
+        for host_data in hosts:
+            host, host_result = answer(self.add_host, host_data)
+            host_result['services'] = []
+            for service_data in host_data.get('services') or []:
+                service, service_result = answer(self.add_service, host, service_data)
+                children(service, 'Service', service_data, service_result)
+                host_result['services'].append(service_result)
+            children(host, 'Host', host_data, host_result)
+            results.append(host_result)
+        return results
+
+    def stats(self):
+        web_vulns = sum(1 for vuln in self.vulns.values() if vuln['type'] == 'VulnerabilityWeb')
+        return {'hosts': len(self.hosts), 'services': len(self.services), 'interfaces': 0,
+                'total_vulns': len(self.vulns), 'web_vulns': web_vulns,
+                'std_vulns': len(self.vulns) - web_vulns, 'code_vulns': 0,
+                'credentials': len(self.credentials), 'notes': 0}
+
+    def as_dict(self):
+        return {'id': self.name, 'name': self.name, 'description': '', 'customer': '',
+                'active': True, 'public': False, 'readonly': False,
+                'duration': {'start_date': None, 'end_date': None}, 'stats': self.stats()}
+
+
+def _rows(objects):
+    return [{'id': obj['id'], 'key': obj['id'], 'value': obj} for obj in objects]
+
+
+class FakeHandler(RequestHandler):
+    route = None
+
+    @property
+    def fake(self):
+        return self.application.settings['fake']
+
+    async def prepare(self):
+        self.fake.requests['{0} {1}'.format(self.request.method, self.route)] += 1
+        if self.fake.latency:
+            await asyncio.sleep(self.fake.latency)
+
+    def workspace(self, name):
+        workspace = self.fake.workspaces.get(name)
+        if workspace is None:
+            raise HTTPError(404, reason='No such workspace')
+        workspace.created = []
+        return workspace
+
+    def json_body(self):
+        return json.loads(self.request.body or b'{}')
+
+    def send_json(self, obj, status=200):
+        self.set_status(status)
+        self.set_header('Content-Type', 'application/json')
+        self.finish(json.dumps(obj))
+
+    def publish_created(self, workspace):
+        for object_type, object_id in workspace.created:
+            self.fake.publish(workspace.name, {'action': 'CREATE', 'type': object_type,
+                                               'id': object_id, 'workspace': workspace.name})
+
+    def write_error(self, status_code, **kwargs):
+        self.finish(json.dumps({'messages': self._reason}))
+
+
+class LoginHandler(FakeHandler):
+    route = 'login'
+
+    def post(self):
+        self.set_cookie(SESSION_COOKIE, 'fake-session')
+        self.send_json({})
+
+
+class SessionHandler(FakeHandler):
+    route = 'session'
+
+    def get(self):
+        self.send_json({'username': 'faraday', 'roles': ['admin'], 'user_id': 1})
+
+
+class InfoHandler(FakeHandler):
+    route = 'info'
+
+    def get(self):
+        self.send_json({'Faraday Server': 'Running', 'Version': 'fake-3'})
+
+
+class WorkspacesHandler(FakeHandler):
+    route = 'workspaces'
+
+    def get(self):
+        self.send_json([workspace.as_dict() for workspace in self.fake.workspaces.values()])
+
+    def post(self):
+        name = self.json_body()['name']
+        self.fake.add_workspace(name)
+        self.send_json(self.fake.workspaces[name].as_dict(), 201)
+
+
+class WorkspaceHandler(FakeHandler):
+    route = 'workspace'
+
+    def get(self, name):
+        self.send_json(self.workspace(name).as_dict())
+
+    def delete(self, name):
+        self.workspace(name)
+        del self.fake.workspaces[name]
+        self.set_status(204)
+
+
+class ObjectsHandler(FakeHandler):
+    """GET, POST, PUT and DELETE of hosts, services, vulns, credentials and
+    commands, with the filters the client uses."""
+    route = 'objects'
+    list_keys = {'hosts': 'rows', 'services': 'services', 'vulns': 'vulnerabilities',
+                 'credential': 'rows', 'commands': 'commands'}
+
+    async def prepare(self):
+        self.route = self.path_kwargs['kind']
+        await super().prepare()
+
+    def _objects(self, workspace, kind):
+        return {'hosts': workspace.hosts, 'services': workspace.services, 'vulns': workspace.vulns,
+                'credential': workspace.credentials, 'commands': workspace.commands}[kind]
+
+    def get(self, name, kind, object_id=None):
+        objects = self._objects(self.workspace(name), kind)
+        if object_id:
+            obj = objects.get(int(object_id))
+            if obj is None:
+                return self.send_json({'messages': 'Not found'}, 404)
+            return self.send_json(obj)
+        selected = objects.values()
+        host_id = self.get_argument('host_id', None)
+        if host_id:
+            selected = [obj for obj in selected if str(obj.get('parent')) == host_id]
+        target = self.get_argument('target', None)
+        if target:
+            selected = [obj for obj in selected if obj.get('target') == target]
+        search = self.get_argument('search', None)
+        if search:
+            selected = [obj for obj in selected
+                        if search in obj.get('ip', '') or search in obj.get('name', '')]
+        sort = self.get_argument('sort', None)
+        if sort:
+            selected = sorted(selected, key=lambda obj: obj.get(sort),
+                              reverse=self.get_argument('sort_dir', 'asc') == 'desc')
+        count = len(selected)
+        page = self.get_argument('page', None)
+        if page:
+            page_size = int(self.get_argument('page_size', 20))
+            selected = list(selected)[(int(page) - 1) * page_size:int(page) * page_size]
+        self.send_json({self.list_keys[kind]: _rows(selected), 'count': count})
+
+    def post(self, name, kind, object_id=None):
+        workspace = self.workspace(name)
+        data = self.json_body()
+        if kind == 'hosts':
+            obj = workspace.add_host(data)
+        elif kind == 'services':
+            obj = workspace.add_service(workspace.hosts[int(data['parent'])], data)
+        elif kind == 'vulns':
+            parent_type = data.get('parent_type', 'Host')
+            parents = workspace.hosts if parent_type == 'Host' else workspace.services
+            obj = workspace.add_vuln(parents[int(data['parent'])], parent_type, data)
+        elif kind == 'credential':
+            obj = workspace.add_credential(workspace.services[int(data['parent'])], 'Service', data)
+        else:
+            obj = workspace.add_command(data)
+        self.publish_created(workspace)
+        self.send_json(obj, 201)
+
+    def put(self, name, kind, object_id=None):
+        workspace = self.workspace(name)
+        obj = self._objects(workspace, kind).get(int(object_id))
+        if obj is None:
+            return self.send_json({'messages': 'Not found'}, 404)
+        obj.update({key: value for key, value in self.json_body().items()
+                    if key in obj and key not in ('id', '_id', 'parent')})
+        self.fake.publish(name, {'action': 'UPDATE', 'type': obj['type'] if 'type' in obj else kind,
+                                 'id': obj['id'], 'workspace': name})
+        self.send_json(obj)
+
+    def delete(self, name, kind, object_id=None):
+        workspace = self.workspace(name)
+        obj = self._objects(workspace, kind).pop(int(object_id), None)
+        if obj is None:
+            return self.send_json({'messages': 'Not found'}, 404)
+        self.fake.publish(name, {'action': 'DELETE', 'type': obj.get('type', kind),
+                                 'id': obj['id'], 'workspace': name})
+        self.send_json({})
+
+
+class BulkCreateHandler(FakeHandler):
+    route = 'bulk_create'
+
+    def post(self, name):
+        workspace = self.workspace(name)
+        data = self.json_body()
+        command_id = None
+        command = data.get('command')
+        if command:
+            command_id = command.get('id')
+            if command_id not in workspace.commands:
+                command_id = workspace.add_command(command)['id']
+        hosts = workspace.bulk_create(data.get('hosts', []))
+        self.publish_created(workspace)
+        self.send_json({'message': 'Created', 'command_id': command_id, 'hosts': hosts}, 201)
+
+
+class WebsocketTokenHandler(FakeHandler):
+    route = 'websocket_token'
+
+    def post(self, name):
+        self.workspace(name)
+        self.send_json({'token': 'fake-token'})
+
+
+class ChangesHandler(WebSocketHandler):
+
+    @property
+    def fake(self):
+        return self.application.settings['fake']
+
+    def on_message(self, message):
+        message = json.loads(message)
+        if message.get('action') == 'JOIN_WORKSPACE' and message.get('token') == 'fake-token':
+            self.fake.subscribers.setdefault(message['workspace'], set()).add(self)
+
+    def on_close(self):
+        for subscribers in self.fake.subscribers.values():
+            subscribers.discard(self)
+
+
+class FakeFaradayServer:
+    """Serves a fake Faraday server from its own thread, see the module
+    docstring. Use it as a context manager to point the client to it."""
+
+    def __init__(self, hosts=10, services_per_host=3, vulns_per_service=2, vulns_per_host=1,
+                 latency=0, workspace_name='benchmark', seed=0):
+        self.latency = latency
+        self.workspace_name = workspace_name
+        self.requests = Counter()
+        self.subscribers = {}
+        self.workspaces = OrderedDict()
+        self._ids = itertools.count(1)
+        self.add_workspace(workspace_name).populate(hosts, services_per_host, vulns_per_service,
+                                                    vulns_per_host, seed)
+        self.port = self.websockets_port = None
+        self._loop = None
+        self._servers = []
+        self._thread = None
+        self._saved_settings = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}'.format(self.port)
+
+    @property
+    def workspace(self):
+        return self.workspaces[self.workspace_name]
+
+    def add_workspace(self, name):
+        workspace = self.workspaces[name] = FakeWorkspace(name, self._ids)
+        workspace.created = []
+        return workspace
+
+    def publish(self, workspace_name, change):
+        message = json.dumps(change)
+        for subscriber in list(self.subscribers.get(workspace_name, ())):
+            subscriber.write_message(message)
+
+    def start(self):
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._serve, args=(started,),
+                                        name='FakeFaradayServer', daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def _serve(self, started):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self._loop = IOLoop.current()
+        workspace = r'/_api/v3/ws/([^/]+)'
+        api = Application([
+            (r'/_api/login', LoginHandler),
+            (r'/_api/session', SessionHandler),
+            (r'/_api/v3/info', InfoHandler),
+            (r'/_api/v3/ws/?', WorkspacesHandler),
+            (workspace + r'/?', WorkspaceHandler),
+            (workspace + r'/bulk_create/?', BulkCreateHandler),
+            (workspace + r'/websocket_token/?', WebsocketTokenHandler),
+            (r'/_api/v3/ws/(?P<name>[^/]+)/(?P<kind>hosts|services|vulns|credential|commands)'
+             r'(?:/(?P<object_id>\d+))?/?', ObjectsHandler),
+        ], fake=self)
+        websockets = Application([(r'/.*', ChangesHandler)], fake=self)
+        for application in (api, websockets):
+            sockets = bind_sockets(0, '127.0.0.1')
+            http_server = HTTPServer(application)
+            http_server.add_sockets(sockets)
+            self._servers.append(http_server)
+            if self.port is None:
+                self.port = sockets[0].getsockname()[1]
+            else:
+                self.websockets_port = sockets[0].getsockname()[1]
+        started.set()
+        self._loop.start()
+        for http_server in self._servers:
+            http_server.stop()
+        self._loop.close(all_fds=True)
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.add_callback(self._loop.stop)
+            self._thread.join()
+            self._loop = None
+
+    def __enter__(self):
+        if self._loop is None:
+            self.start()
+        self._saved_settings = (server.FARADAY_UP, server.SERVER_URL, changes_stream.WEBSOCKETS_PORT)
+        server.FARADAY_UP = False
+        server.SERVER_URL = self.url
+        changes_stream.WEBSOCKETS_PORT = self.websockets_port
+        reset_transport()
+        return self
+
+    def __exit__(self, *exc_info):
+        server.FARADAY_UP, server.SERVER_URL, changes_stream.WEBSOCKETS_PORT = self._saved_settings
+        reset_transport()
+        self.stop()
+        return False
+
+
+# I'm Py3
@@ -0,0 +1,134 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import queue
+import threading
+import unittest
+
+from faraday_client.gui.background_loader import BackgroundLoader
+from faraday_client.persistence.server import models
+from faraday_client.persistence.server.identity_map import discard_identity_maps
+from faraday_client.persistence.server.workspace_stats import discard_workspace_stats
+from tests.fake_faraday_server import FakeFaradayServer
+
+
+class BackgroundLoaderTest(unittest.TestCase):
+    """The fetches run in background threads, and deliver() queues their
+    results until wait() runs them, as the GUI thread does."""
+
+    def setUp(self):
+        self.delivered = queue.Queue()
+        self.loader = BackgroundLoader(self.deliver, batch_size=10)
+        self.shown = []
+        self.done = []
+
+    def deliver(self, function, *args):
+        self.delivered.put((function, args))
+
+    def wait(self, channel):
+        """Run the delivered results until channel finished loading."""
+        while self.loader.loading(channel):
+            function, args = self.delivered.get(timeout=5)
+            function(*args)
+
+    def run_delivered(self):
+        while not self.delivered.empty():
+            function, args = self.delivered.get()
+            function(*args)
+
+    def load(self, channel, objects, started=None):
+        def fetch():
+            if started is not None:
+                started.wait(5)
+            return objects
+        self.loader.load(channel, fetch, self.shown.append, lambda: self.done.append(channel))
+
+    def test_results_are_shown_in_batches(self):
+        self.load('vulns', list(range(25)))
+        self.wait('vulns')
+        self.assertEqual([len(batch) for batch in self.shown], [10, 10, 5])
+        self.assertEqual(self.done, ['vulns'])
+
+    def test_results_of_a_previous_fetch_are_dropped(self):
+        started = threading.Event()
+        self.load('vulns', ['stale'], started)
+        self.load('vulns', ['current'])
+        started.set()
+        self.wait('vulns')
+        self.run_delivered()
+        self.assertEqual(self.shown, [['current']])
+        self.assertEqual(self.done, ['vulns'])
+
+    def test_channels_are_loaded_apart(self):
+        self.load('services', ['ssh'])
+        self.load('vulns', ['weak password'])
+        self.wait('services')
+        self.wait('vulns')
+        self.assertCountEqual(self.shown, [['ssh'], ['weak password']])
+
+    def test_cancelled_fetches_show_nothing(self):
+        started = threading.Event()
+        self.load('services', ['ssh'], started)
+        self.load('vulns', ['weak password'], started)
+        self.loader.cancel()
+        self.assertFalse(self.loader.loading('vulns'))
+        started.set()
+        self.loader.load('wait', list, None, lambda: None)
+        self.wait('wait')
+        self.run_delivered()
+        self.assertEqual(self.shown, [])
+        self.assertEqual(self.done, [])
+
+    def test_errors_are_handed_to_the_gui_thread(self):
+        errors = []
+
+        def fetch():
+            raise ValueError('the server is down')
+
+        self.loader.load('vulns', fetch, self.shown.append, self.done.append, errors.append)
+        self.wait('vulns')
+        self.assertIsInstance(errors[0], ValueError)
+        self.assertEqual((self.shown, self.done), ([], []))
+
+
+class HostDataLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        discard_identity_maps()
+        discard_workspace_stats()
+
+    def test_the_services_and_vulns_of_a_host_are_fetched_once(self):
+        with FakeFaradayServer(hosts=3, services_per_host=3, vulns_per_service=2,
+                               vulns_per_host=1) as fake:
+            host = models.get_host(fake.workspace_name, 1)
+            loader = models.WorkspacePrefetch(fake.workspace_name, host=host)
+            requests = fake.requests.copy()
+            results = {}
+
+            def fetch(name, function):
+                with models.prefetch(fake.workspace_name, loader):
+                    results[name] = function()
+
+            threads = [threading.Thread(target=fetch, args=('services', host.getServices)),
+                       threading.Thread(target=fetch, args=('vulns', host.getVulns))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with models.prefetch(fake.workspace_name, loader):
+                for service in results['services']:
+                    self.assertEqual(len(service.getVulns()), 2)
+
+            self.assertEqual(len(results['services']), 3)
+            self.assertEqual(len(results['vulns']), 7)
+            fetched = fake.requests - requests
+            self.assertEqual(fetched['GET services'], 1)
+            self.assertEqual(fetched['GET vulns'], 1)
+
+
+# I'm Py3
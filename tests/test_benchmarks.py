@@ -0,0 +1,297 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+Benchmarks of the client against the fake Faraday server of
+tests/fake_faraday_server.py, so they need no network nor a real server:
+loading a workspace, get_all_vulns, a report ingested by the
+PluginController, an fplugin script and the changes stream.
+
+The tests run them at a tiny scale. Run the module directly to measure
+them, keeping a history to catch regressions between runs:
+
+    python -m tests.test_benchmarks --hosts 2000 --latency 0.005 \\
+        --history benchmarks.json
+
+It exits with 1 when a benchmark got slower than the last run with the
+same parameters by more than --tolerance.
+'''
+from __future__ import absolute_import
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import unittest
+from queue import Queue
+from contextlib import redirect_stdout
+
+from faraday_client.bin import fplugin
+from faraday_client.managers.mapper_manager import MapperManager
+from faraday_client.persistence.server import models, server
+from faraday_client.persistence.server.identity_map import discard_identity_maps
+from faraday_client.persistence.server.workspace_stats import discard_workspace_stats
+from faraday_client.plugins.controller import PluginController
+from tests.fake_faraday_server import FakeFaradayServer
+
+BENCHMARK_TOLERANCE = 0.2
+
+
+def discard_caches():
+    """Forget what was cached from the previous fake server."""
+    discard_identity_maps()
+    discard_workspace_stats()
+
+
+class ReportPlugin:
+    """A plugin whose reports are the JSON it sends to bulk_create."""
+    id = 'benchmark_report'
+
+    def __init__(self):
+        self._data = None
+
+    def processReport(self, filepath):
+        with open(filepath) as report:
+            self._data = json.load(report)
+
+    def get_data(self):
+        return self._data
+
+
+class SinglePluginManager:
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+
+    def plugins(self):
+        return [(self._plugin.id, self._plugin)]
+
+    def addController(self, controller, controller_id):
+        pass
+
+    def get_plugin(self, plugin_id):
+        return self._plugin
+
+
+def report_hosts(amount, first_host=0):
+    return [{'ip': '172.16.{0}.{1}'.format((first_host + number) // 256, (first_host + number) % 256),
+             'os': 'Linux', 'hostnames': [], 'description': '',
+             'services': [{'name': 'http', 'port': 80, 'protocol': 'tcp', 'status': 'open',
+                           'vulnerabilities': [{'name': 'Outdated server', 'desc': 'Outdated',
+                                                'severity': 'medium'}]}],
+             'vulnerabilities': [{'name': 'Weak ciphers', 'desc': 'Weak', 'severity': 'low'}]}
+            for number in range(amount)]
+
+
+def workspace_load(fake):
+    """What the GUI does when a workspace is opened: the counters, and
+    every host with its services and vulns."""
+    workspace = fake.workspace_name
+    server.get_workspace_numbers(workspace)
+    with models.prefetch(workspace):
+        for host in models.get_hosts(workspace):
+            for service in host.getServices():
+                service.getVulns()
+            host.getVulns()
+
+
+def get_all_vulns(fake):
+    models.get_all_vulns(fake.workspace_name)
+
+
+def plugin_ingest(fake, hosts=None):
+    amount = hosts if hosts is not None else len(fake.workspace.hosts)
+    directory = tempfile.mkdtemp()
+    try:
+        report_path = os.path.join(directory, 'report.json')
+        with open(report_path, 'w') as report:
+            json.dump({'hosts': report_hosts(amount, len(fake.workspace.hosts))}, report)
+        plugin = ReportPlugin()
+        controller = PluginController('benchmark', SinglePluginManager(plugin),
+                                      MapperManager(), Queue())
+        controller.processReport(plugin.id, report_path, fake.workspace_name)
+    finally:
+        shutil.rmtree(directory)
+
+
+def fplugin_script(fake):
+    with redirect_stdout(io.StringIO()):
+        fplugin.load_script('list_hosts').main(fake.workspace_name, [],
+                                               argparse.ArgumentParser())
+
+
+def changes_stream(fake, changes=50, timeout=10):
+    """Seconds from the creation of the objects until the stream has
+    every change."""
+    stream = models.get_changes_stream(fake.workspace_name)
+    try:
+        deadline = time.time() + timeout
+        while not fake.subscribers.get(fake.workspace_name) and time.time() < deadline:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        server.bulk_create(fake.workspace_name,
+                           [{'ip': host['ip']} for host in report_hosts(changes, 60000)])
+        received = 0
+        while received < changes and time.time() < deadline:
+            received += len(stream.get_changes(timeout=0.1))
+        if received < changes:
+            raise RuntimeError('Only {0} of {1} changes were received'.format(received, changes))
+        return time.perf_counter() - start
+    finally:
+        stream.stop()
+
+
+BENCHMARKS = (
+    ('workspace_load', workspace_load),
+    ('get_all_vulns', get_all_vulns),
+    ('plugin_ingest', plugin_ingest),
+    ('fplugin_script', fplugin_script),
+    ('changes_stream', changes_stream),
+)
+
+
+def run_benchmark(function, repeat=3, **server_options):
+    """Run function against a new fake server every time and return the
+    best time and the requests of the last run."""
+    timings = []
+    for _ in range(repeat):
+        discard_caches()
+        with FakeFaradayServer(**server_options) as fake:
+            start = time.perf_counter()
+            seconds = function(fake)
+            timings.append(seconds if seconds is not None else time.perf_counter() - start)
+            requests = dict(fake.requests)
+    discard_caches()
+    return {'seconds': min(timings), 'requests': sum(requests.values())}
+
+
+def run_benchmarks(repeat=3, names=None, **server_options):
+    return {name: run_benchmark(function, repeat, **server_options)
+            for name, function in BENCHMARKS if names is None or name in names}
+
+
+def find_regressions(results, previous_results, tolerance=BENCHMARK_TOLERANCE):
+    """Return the names of the benchmarks slower than in previous_results
+    by more than tolerance, or needing more requests."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        previous = previous_results.get(name)
+        if previous is None:
+            continue
+        if result['seconds'] > previous['seconds'] * (1 + tolerance) or \
+                result['requests'] > previous['requests']:
+            regressions.append(name)
+    return regressions
+
+
+def load_history(path):
+    try:
+        with open(path) as history_file:
+            return json.load(history_file)
+    except (IOError, ValueError):
+        return []
+
+
+def save_history(path, history):
+    with open(path + '.tmp', 'w') as history_file:
+        json.dump(history, history_file, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+class BenchmarksTest(unittest.TestCase):
+    server_options = {'hosts': 5, 'services_per_host': 2, 'vulns_per_service': 1}
+
+    def setUp(self):
+        self.addCleanup(discard_caches)
+
+    def run_on_fake(self, function, **server_options):
+        discard_caches()
+        with FakeFaradayServer(**dict(self.server_options, **server_options)) as fake:
+            function(fake)
+            return fake
+
+    def test_every_benchmark_runs(self):
+        results = run_benchmarks(repeat=1, **self.server_options)
+        self.assertEqual(sorted(results), sorted(name for name, _ in BENCHMARKS))
+        for result in results.values():
+            self.assertGreater(result['seconds'], 0)
+            self.assertGreater(result['requests'], 0)
+
+    def test_a_workspace_is_loaded_with_a_fixed_amount_of_requests(self):
+        small = self.run_on_fake(workspace_load, hosts=2)
+        big = self.run_on_fake(workspace_load, hosts=40)
+        self.assertEqual(small.requests, big.requests)
+        self.assertEqual(small.requests['GET hosts'], 1)
+
+    def test_reports_are_ingested_in_the_fake_server(self):
+        fake = self.run_on_fake(lambda fake: plugin_ingest(fake, hosts=3))
+        self.assertEqual(len(fake.workspace.hosts), 8)
+        self.assertEqual(len(fake.workspace.commands), 1)
+        self.assertEqual(fake.requests['PUT commands'], 1)
+        command = list(fake.workspace.commands.values())[0]
+        self.assertEqual(command['import_source'], 'report')
+
+    def test_the_fplugin_script_lists_the_hosts(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.run_on_fake(lambda fake: fplugin.load_script('list_hosts').main(
+                fake.workspace_name, [], argparse.ArgumentParser()))
+        self.assertEqual(len(output.getvalue().splitlines()), 5)
+
+    def test_the_latency_is_simulated(self):
+        start = time.perf_counter()
+        self.run_on_fake(get_all_vulns, latency=0.2)
+        self.assertGreater(time.perf_counter() - start, 0.2)
+
+    def test_slower_benchmarks_and_more_requests_are_regressions(self):
+        previous = {'a': {'seconds': 1, 'requests': 4}, 'b': {'seconds': 1, 'requests': 4},
+                    'c': {'seconds': 1, 'requests': 4}}
+        results = {'a': {'seconds': 1.1, 'requests': 4}, 'b': {'seconds': 1.5, 'requests': 4},
+                   'c': {'seconds': 0.5, 'requests': 5}, 'new': {'seconds': 9, 'requests': 9}}
+        self.assertEqual(find_regressions(results, previous, tolerance=0.2), ['b', 'c'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks against a fake Faraday server')
+    parser.add_argument('--hosts', type=int, default=500)
+    parser.add_argument('--services-per-host', type=int, default=3)
+    parser.add_argument('--vulns-per-service', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help='Seconds the fake server waits before answering')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--benchmark', action='append', dest='names',
+                        choices=[name for name, _ in BENCHMARKS])
+    parser.add_argument('--history', help='JSON file with the results of the previous runs')
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    parameters = {'hosts': args.hosts, 'services_per_host': args.services_per_host,
+                  'vulns_per_service': args.vulns_per_service, 'latency': args.latency}
+    results = run_benchmarks(args.repeat, args.names, **parameters)
+    for name, result in results.items():
+        print('{0:<16}{1:>10.3f}s{2:>8} requests'.format(name, result['seconds'], result['requests']))
+    if not args.history:
+        return 0
+
+    history = load_history(args.history)
+    previous = [run for run in history if run['parameters'] == parameters]
+    regressions = find_regressions(results, previous[-1]['results'], args.tolerance) if previous else []
+    for name in regressions:
+        print('Regression in {0}: {1[seconds]:.3f}s and {1[requests]} requests, '
+              'it was {2[seconds]:.3f}s and {2[requests]} requests'.format(
+                  name, results[name], previous[-1]['results'][name]))
+    history.append({'time': time.time(), 'parameters': parameters, 'results': results})
+    save_history(args.history, history)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+
+# I'm Py3
@@ -0,0 +1,111 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import json
+import unittest
+from unittest import mock
+
+import faraday_client.gui.customevents as events
+from faraday_client.gui.notifier import NotificationCenter
+from faraday_client.persistence.server.changes_stream import (
+    WebsocketsChangesStream,
+    coalesce_changes,
+)
+
+
+def change(action, obj_id, obj_type='Host', name='name'):
+    return {'action': action, 'id': obj_id, 'type': obj_type, 'name': name}
+
+
+class CoalesceChangesTest(unittest.TestCase):
+
+    def test_updates_of_the_same_object_are_merged(self):
+        changes = [change('UPDATE', 1, name='a'), change('UPDATE', 2),
+                   change('UPDATE', 1, name='b')]
+        self.assertEqual(coalesce_changes(changes),
+                         [change('UPDATE', 1, name='b'), change('UPDATE', 2)])
+
+    def test_created_objects_stay_created(self):
+        changes = [change('CREATE', 1, name='a'), change('UPDATE', 1, name='b')]
+        self.assertEqual(coalesce_changes(changes), [change('CREATE', 1, name='b')])
+
+    def test_created_and_deleted_objects_are_dropped(self):
+        changes = [change('CREATE', 1), change('UPDATE', 1), change('DELETE', 1),
+                   change('UPDATE', 2)]
+        self.assertEqual(coalesce_changes(changes), [change('UPDATE', 2)])
+
+    def test_objects_of_different_types_are_kept_apart(self):
+        changes = [change('UPDATE', 1), change('UPDATE', 1, 'Service')]
+        self.assertEqual(coalesce_changes(changes), changes)
+
+
+class WebsocketsChangesStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch('faraday_client.persistence.server.changes_stream.websocket.WebSocketApp')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stream = WebsocketsChangesStream('a_ws', 'http://localhost:5985')
+
+    def test_queued_changes_are_taken_in_batches(self):
+        for i in range(10):
+            self.stream.on_message(json.dumps(change('UPDATE', i % 4)))
+        self.assertEqual(self.stream.stats.queue_depth, 10)
+        self.assertEqual(len(self.stream.get_changes(max_changes=6)), 4)
+        self.assertEqual(len(list(self.stream)), 4)
+        self.assertEqual(self.stream.get_changes(), [])
+        stats = self.stream.stats.as_dict()
+        self.assertEqual(stats['received'], 10)
+        self.assertEqual(stats['delivered'], 8)
+        self.assertEqual(stats['coalesced'], 2)
+        self.assertEqual(stats['batches'], 2)
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_messages_are_decoded_once(self):
+        message = json.dumps(change('UPDATE', 1))
+        with mock.patch('faraday_client.persistence.server.changes_stream.json.loads',
+                        wraps=json.loads) as loads:
+            self.stream.on_message(message)
+            self.stream.on_message('not a change')
+            self.assertEqual(self.stream.get_changes(), [change('UPDATE', 1)])
+        self.assertEqual(loads.call_count, 2)
+        self.assertEqual(self.stream.stats.received, 2)
+        self.assertEqual(self.stream.stats.queue_depth, 0)
+
+    def test_lag_is_measured_from_the_oldest_change(self):
+        with mock.patch('faraday_client.persistence.server.changes_stream.time.time',
+                        return_value=100):
+            self.stream.on_message(json.dumps(change('UPDATE', 1)))
+        with mock.patch('faraday_client.persistence.server.changes_stream.time.time',
+                        return_value=103):
+            self.stream.on_message(json.dumps(change('UPDATE', 2)))
+            self.stream.get_changes()
+        self.assertEqual(self.stream.stats.lag, 3)
+
+
+class ChangesEventsTest(unittest.TestCase):
+
+    def test_batches_and_added_objects_have_their_own_events(self):
+        change_event = events.ChangeFromInstanceCustomEvent('CREATE', 1, 'Host', '10.0.0.1')
+        batch = events.ChangesFromInstanceCustomEvent([(change_event, None)])
+        self.assertEqual(batch.type(), events.CHANGESFROMINSTANCE)
+        self.assertEqual(batch.changes, [(change_event, None)])
+        added = events.AddObjectCustomEvent('new host')
+        self.assertEqual(added.type(), events.ADDOBJECT)
+        self.assertEqual(added.new_obj, 'new host')
+
+    def test_added_objects_are_notified(self):
+        notifier = NotificationCenter(mock.Mock())
+        notifier.registerWidget(None)
+        notifier.addObject('new host')
+        event = notifier.uiapp.postEvent.call_args[0][1]
+        self.assertIsInstance(event, events.AddObjectCustomEvent)
+        self.assertEqual(event.new_obj, 'new host')
+
+
+# I'm Py3
@@ -0,0 +1,88 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import unittest
+from unittest import mock
+
+from faraday_client.model.bulk import is_pending_id
+from faraday_client.model.commands_history import CommandRunInformation
+from faraday_client.plugins.commands_queue import CommandsQueue
+from faraday_client.persistence.server.server_io_exceptions import CantCommunicateWithServerError
+
+
+def rejection(status_code=422):
+    return CantCommunicateWithServerError(None, 'url', {}, mock.Mock(status_code=status_code))
+
+
+class CommandsQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.failures = []
+        self.queue = CommandsQueue(self.save, retry_delay=0.01)
+
+    def tearDown(self):
+        self.queue.stop()
+
+    def save(self, cmd_info):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.events.append(('save', cmd_info.command))
+        return len(self.events)
+
+    def command(self, name):
+        return CommandRunInformation(command=name, workspace='a_ws')
+
+    def test_commands_get_a_provisional_id_and_tasks_run_once_saved(self):
+        nmap = self.command('nmap')
+        pending_id = self.queue.register(nmap)
+        self.assertTrue(is_pending_id(pending_id))
+        self.queue.submit(nmap, lambda: self.events.append(('output', nmap.getID())))
+        self.queue.join_queue()
+        self.assertEqual(self.events, [('save', 'nmap'), ('output', 1)])
+
+    def test_commands_are_retried_in_order_while_the_server_is_down(self):
+        self.failures = [CantCommunicateWithServerError(None, 'url', {})] * 3
+        nmap, ping = self.command('nmap'), self.command('ping')
+        self.queue.register(nmap)
+        self.queue.register(ping)
+        self.queue.submit(ping, lambda: self.events.append(('output', ping.getID())))
+        self.queue.join_queue()
+        self.assertEqual(self.events, [('save', 'nmap'), ('save', 'ping'), ('output', 2)])
+
+    def test_rejected_commands_are_not_retried_and_their_tasks_run(self):
+        self.failures = [rejection(400)]
+        nmap = self.command('nmap')
+        self.queue.register(nmap)
+        self.queue.submit(nmap, lambda: self.events.append(('output', is_pending_id(nmap.getID()))))
+        self.queue.register(self.command('ping'))
+        self.queue.join_queue()
+        self.assertEqual(self.events, [('output', True), ('save', 'ping')])
+
+    def test_server_errors_are_retried(self):
+        self.failures = [rejection(503), CantCommunicateWithServerError(None, 'url', {})]
+        self.queue.register(self.command('nmap'))
+        self.queue.join_queue()
+        self.assertEqual(self.events, [('save', 'nmap')])
+
+    def test_queued_commands_are_flushed_when_stopping(self):
+        ping = self.command('ping')
+        self.queue.register(ping)
+        self.queue.submit(ping, lambda: self.events.append(('output', ping.getID())))
+        self.assertTrue(self.queue.flush(timeout=5))
+        self.assertEqual(self.events, [('save', 'ping'), ('output', 1)])
+
+    def test_flushing_gives_up_while_the_server_is_down(self):
+        self.failures = [CantCommunicateWithServerError(None, 'url', {})] * 1000
+        self.queue.register(self.command('nmap'))
+        self.assertFalse(self.queue.flush(timeout=0.1))
+        self.queue.join(5)
+        self.assertFalse(self.queue.is_alive())
+
+
+# I'm Py3
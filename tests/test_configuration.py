@@ -0,0 +1,102 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from faraday_client.config import configuration
+from faraday_client.config.configuration import Configuration, DEFAULT_XML
+
+
+class SaveConfigTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'user.xml')
+        shutil.copy(DEFAULT_XML, self.path)
+        self.config = Configuration(self.path)
+
+    def other_process(self):
+        return Configuration(self.path)
+
+    def test_saves_are_coalesced_in_one_write(self):
+        with mock.patch.object(self.config, '_writeConfig', wraps=self.config._writeConfig) as write:
+            for name in ('ws1', 'ws2', 'ws3'):
+                self.config.setLastWorkspace(name)
+                self.config.saveConfig(self.path)
+            write.assert_not_called()
+            self.config.flushConfig()
+            write.assert_called_once_with(self.path)
+        self.assertEqual(self.other_process().getLastWorkspace(), 'ws3')
+
+    def test_the_pending_save_is_written_after_the_delay(self):
+        with mock.patch.object(configuration, 'CONFIG_SAVE_DELAY', 0.01):
+            self.config.setLastWorkspace('delayed')
+            self.config.saveConfig(self.path)
+        deadline = time.time() + 5
+        while self.other_process().getLastWorkspace() != 'delayed' and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.other_process().getLastWorkspace(), 'delayed')
+
+    def test_unchanged_configurations_are_not_written(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        self.config.saveConfig(self.path)
+        self.config.flushConfig()
+        self.assertEqual(os.stat(self.path).st_mtime_ns, mtime)
+
+    def test_changes_of_other_processes_are_kept(self):
+        other = self.other_process()
+        other.setAPIUrl('http://other:5985')
+        other.saveConfig(self.path)
+        other.flushConfig()
+        self.config.setLastWorkspace('mine')
+        self.config.saveConfig(self.path)
+        self.config.flushConfig()
+        saved = self.other_process()
+        self.assertEqual(saved.getServerURI(), 'http://other:5985')
+        self.assertEqual(saved.getLastWorkspace(), 'mine')
+
+    def test_changes_of_other_processes_are_kept_by_the_next_saves(self):
+        other = self.other_process()
+        other.setAPIUrl('http://other:5985')
+        other.saveConfig(self.path)
+        other.flushConfig()
+        for name in ('mine', 'mine again'):
+            self.config.setLastWorkspace(name)
+            self.config.saveConfig(self.path)
+            self.config.flushConfig()
+        self.assertEqual(self.config.getServerURI(), 'http://other:5985')
+        saved = self.other_process()
+        self.assertEqual(saved.getServerURI(), 'http://other:5985')
+        self.assertEqual(saved.getLastWorkspace(), 'mine again')
+
+    def test_pending_saves_are_written_when_exiting(self):
+        with mock.patch('atexit.register') as register:
+            Configuration(self.path)
+        register.assert_not_called()
+        self.config.setLastWorkspace('exiting')
+        self.config.saveConfig(self.path)
+        configuration._flush_configurations()
+        self.assertEqual(self.other_process().getLastWorkspace(), 'exiting')
+
+    def test_the_file_is_replaced_atomically(self):
+        self.config.setLastWorkspace('atomic')
+        self.config.saveConfig(self.path)
+        with mock.patch('xml.etree.ElementTree.ElementTree.write', side_effect=IOError('disk full')):
+            with self.assertRaises(IOError):
+                self.config.flushConfig()
+        self.assertEqual(os.listdir(self.directory), ['user.xml'])
+        self.assertTrue(self.other_process()._isConfig())
+
+
+# I'm Py3
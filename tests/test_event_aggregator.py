@@ -0,0 +1,100 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import time
+import threading
+import unittest
+
+from faraday_client.gui.event_aggregator import EventAggregator
+
+
+class Refreshes:
+
+    def __init__(self, duration=0):
+        self.batches = []
+        self.times = []
+        self.duration = duration
+        self.done = threading.Event()
+
+    def __call__(self, batch):
+        self.times.append(time.time())
+        time.sleep(self.duration)
+        self.batches.append(batch)
+        self.done.set()
+
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class EventAggregatorTest(unittest.TestCase):
+
+    def test_a_burst_is_refreshed_once(self):
+        refreshes = Refreshes()
+        aggregator = EventAggregator(refreshes, interval=0.2, delay=0.1)
+        for number in range(5000):
+            aggregator.post(number)
+        self.assertTrue(refreshes.done.wait(5))
+        self.assertEqual(refreshes.batches, [list(range(5000))])
+
+    def test_refreshes_are_limited_to_the_rate(self):
+        refreshes = Refreshes()
+        aggregator = EventAggregator(refreshes, interval=0.2, delay=0.01)
+        start = time.time()
+        number = 0
+        while time.time() - start < 0.7:
+            aggregator.post(number)
+            number += 1
+            time.sleep(0.005)
+        self.assertTrue(wait_for(lambda: len(refreshes.events()) == number))
+        self.assertLessEqual(len(refreshes.batches), 5)
+        for previous, following in zip(refreshes.times, refreshes.times[1:]):
+            self.assertGreaterEqual(following - previous, 0.19)
+
+    def test_events_posted_during_a_refresh_get_a_final_refresh(self):
+        refreshes = Refreshes(duration=0.2)
+        aggregator = EventAggregator(refreshes, interval=0, delay=0.01)
+        aggregator.post('first')
+        self.assertTrue(wait_for(lambda: refreshes.times))
+        aggregator.post('second')
+        self.assertTrue(wait_for(lambda: len(refreshes.batches) == 2))
+        self.assertEqual(refreshes.batches, [['first'], ['second']])
+
+    def test_flush_and_discard(self):
+        refreshes = Refreshes()
+        aggregator = EventAggregator(refreshes, delay=10)
+        aggregator.post('old')
+        aggregator.discard()
+        aggregator.post('new')
+        self.assertEqual(aggregator.pending(), 1)
+        aggregator.flush()
+        self.assertEqual(refreshes.batches, [['new']])
+        aggregator.stop()
+        aggregator.post('ignored')
+        self.assertEqual(aggregator.pending(), 0)
+
+    def test_a_failed_refresh_does_not_stop_the_next_ones(self):
+        batches = []
+
+        def refresh(batch):
+            batches.append(batch)
+            raise RuntimeError('no server')
+        aggregator = EventAggregator(refresh, interval=0, delay=0.01)
+        aggregator.post(1)
+        aggregator.flush()
+        aggregator.post(2)
+        self.assertTrue(wait_for(lambda: len(batches) == 2))
+
+
+# I'm Py3
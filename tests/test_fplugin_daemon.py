@@ -0,0 +1,158 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import os
+import sys
+import time
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import subprocess
+import unittest
+from unittest import mock
+
+from faraday_client.bin import fplugin
+from faraday_client.plugins import fplugin_daemon
+
+PACKAGE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLIENT = '''
+import sys
+from faraday_client.plugins.fplugin_daemon import run_in_daemon
+sys.exit(run_in_daemon(sys.argv[2:], sys.argv[1]))
+'''
+
+
+def fake_main(argv=None):
+    print('%s in %s' % (' '.join(argv), os.getcwd()))
+    sys.stderr.write('running %s\n' % sys.stdin.read())
+    sys.exit(int(argv[-1]))
+
+
+class FPluginDaemonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, 'fplugin.sock')
+        patches = [mock.patch.object(fplugin, 'main', fake_main),
+                   mock.patch.object(fplugin, 'load_plugins', return_value={}),
+                   mock.patch.object(fplugin, 'get_model_controller')]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.daemon = fplugin_daemon.FPluginDaemon(self.socket_path)
+        self.daemon.listen()
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.daemon.close()
+        self.thread.join(5)
+        shutil.rmtree(self.directory)
+
+    def run_client(self, *argv):
+        environ = dict(os.environ, PYTHONPATH=PACKAGE_PATH)
+        return subprocess.run([sys.executable, '-c', CLIENT, self.socket_path] + list(argv),
+                              input=b'stdin', stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              cwd=self.directory, env=environ, timeout=30)
+
+    def test_requests_run_with_the_stdio_and_cwd_of_the_client(self):
+        result = self.run_client('list_hosts', '--', '3')
+        self.assertEqual(result.returncode, 3)
+        self.assertEqual(result.stdout.decode().strip(),
+                         'list_hosts -- 3 in %s' % os.path.realpath(self.directory))
+        self.assertEqual(result.stderr.decode(), 'running stdin\n')
+
+    def test_requests_are_not_affected_by_previous_ones(self):
+        for exit_code in ('0', '1', '0'):
+            self.assertEqual(self.run_client('a_script', exit_code).returncode, int(exit_code))
+
+    def test_without_a_daemon_nothing_runs(self):
+        self.assertIsNone(fplugin_daemon.run_in_daemon(['a_script'], os.path.join(self.directory, 'none')))
+
+    def test_a_second_daemon_is_refused(self):
+        with self.assertRaises(RuntimeError):
+            fplugin_daemon.FPluginDaemon(self.socket_path).listen()
+
+    def test_the_socket_is_private(self):
+        self.assertEqual(os.stat(self.socket_path).st_mode & 0o777, 0o600)
+
+
+class FPluginDaemonMessagesTest(unittest.TestCase):
+
+    def test_file_descriptors_are_sent_with_the_message(self):
+        sender, receiver = socket.socketpair()
+        read_end, write_end = os.pipe()
+        with sender, receiver:
+            fplugin_daemon._send_message(sender, {'argv': ['list_hosts']}, [write_end])
+            os.close(write_end)
+            message, fds = fplugin_daemon._receive_message(receiver, maxfds=3)
+        self.assertEqual(message, {'argv': ['list_hosts']})
+        self.assertEqual(len(fds), 1)
+        with os.fdopen(fds[0], 'w') as received, os.fdopen(read_end) as pipe:
+            received.write('output')
+            received.close()
+            self.assertEqual(pipe.read(), 'output')
+
+    def test_exit_codes_are_taken_from_the_wait_status(self):
+        for code in (0, 3):
+            pid = os.fork()
+            if pid == 0:
+                os._exit(code)
+            self.assertEqual(fplugin_daemon._wait_exit_code(os.waitpid(pid, 0)[1]), code)
+        pid = os.fork()
+        if pid == 0:
+            time.sleep(30)
+            os._exit(0)
+        os.kill(pid, signal.SIGKILL)
+        self.assertEqual(fplugin_daemon._wait_exit_code(os.waitpid(pid, 0)[1]), -signal.SIGKILL)
+
+
+class FPluginCachesTest(unittest.TestCase):
+
+    def setUp(self):
+        fplugin._session_cookies.clear()
+        self.addCleanup(fplugin._session_cookies.clear)
+
+    @mock.patch.object(fplugin, 'login_user', return_value={'session': 'a'})
+    def test_logins_are_reused(self, login_user):
+        for _ in range(3):
+            fplugin.login('http://localhost:5985', 'faraday', 'pass')
+        login_user.assert_called_once_with('http://localhost:5985', 'faraday', 'pass')
+
+    @mock.patch.object(fplugin, 'login_user', return_value={'session': 'a'})
+    def test_passwords_are_not_kept(self, login_user):
+        fplugin.login('http://localhost:5985', 'faraday', 'pass')
+        fplugin.login('http://localhost:5985', 'faraday', 'other pass')
+        self.assertEqual(login_user.call_count, 2)
+        for key in fplugin._session_cookies:
+            self.assertNotIn('pass', key)
+            self.assertNotIn('other pass', key)
+
+    @mock.patch.object(fplugin, 'login_user', return_value=None)
+    def test_invalid_credentials_are_not_cached(self, login_user):
+        for _ in range(2):
+            with self.assertRaises(UserWarning):
+                fplugin.login('http://localhost:5985', 'faraday', 'wrong')
+        self.assertEqual(login_user.call_count, 2)
+
+    def test_scripts_are_imported_once(self):
+        first = fplugin.load_script('get_all_ips')
+        start = time.perf_counter()
+        self.assertIs(fplugin.load_script('get_all_ips'), first)
+        self.assertLess(time.perf_counter() - start, 0.05)
+
+    def test_the_main_signature_is_recognized(self):
+        def main(workspace='', args=None, parser=None):
+            pass
+        import inspect  # pylint:disable=import-outside-toplevel
+        self.assertEqual(inspect.getfullargspec(main), fplugin.CURRENT_MAIN_ARGSPEC)
+
+
+# I'm Py3
@@ -0,0 +1,90 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from faraday_client.plugins import fplugin_utils
+
+SCRIPT = '''
+import sys
+from faraday_client.persistence.server import models
+
+__description__ = 'Lists the hosts'
+__prettyname__ = 'List Hosts'
+
+raise RuntimeError('scripts must not run to be listed')
+
+
+def main(workspace='', args=None, parser=None):
+    return 0, None
+'''
+
+
+class AvailablePluginsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.bin_path = os.path.join(self.directory, 'bin')
+        os.mkdir(self.bin_path)
+        self.index_path = os.path.join(self.directory, 'data', 'fplugin_index.json')
+        self.write('fplugin.py', 'raise RuntimeError()')
+        self.write('__init__.py', '')
+        self.write('list_hosts.py', SCRIPT)
+
+    def write(self, filename, source):
+        with open(os.path.join(self.bin_path, filename), 'w') as script:
+            script.write(source)
+
+    def available_plugins(self):
+        return fplugin_utils.get_available_plugins(self.bin_path, self.index_path)
+
+    def test_scripts_are_listed_without_running_them(self):
+        self.assertEqual(self.available_plugins(), {
+            'list_hosts': {'description': 'Lists the hosts',
+                           'prettyname': 'List Hosts',
+                           'path': os.path.join(self.bin_path, 'list_hosts.py')}})
+
+    def test_a_broken_script_does_not_hide_the_others(self):
+        self.write('broken.py', 'def main(:\n')
+        self.write('no_metadata.py', 'from somewhere import main\n')
+        plugins = self.available_plugins()
+        self.assertEqual(sorted(plugins), ['list_hosts', 'no_metadata'])
+        self.assertEqual(plugins['no_metadata']['description'], 'Empty')
+        self.assertEqual(plugins['no_metadata']['prettyname'], 'no_metadata')
+
+    def test_scripts_are_inspected_only_when_they_change(self):
+        self.available_plugins()
+        self.assertTrue(os.path.exists(self.index_path))
+        with mock.patch.object(fplugin_utils, 'inspect_plugin') as inspect_plugin:
+            self.available_plugins()
+            # a new modification time but the same content
+            os.utime(os.path.join(self.bin_path, 'list_hosts.py'), (0, 0))
+            self.available_plugins()
+        inspect_plugin.assert_not_called()
+        self.write('list_hosts.py', SCRIPT.replace('Lists the hosts', 'Hosts'))
+        self.assertEqual(self.available_plugins()['list_hosts']['description'], 'Hosts')
+
+    def test_a_corrupt_index_is_rebuilt(self):
+        os.makedirs(os.path.dirname(self.index_path))
+        with open(self.index_path, 'w') as index_file:
+            index_file.write('{not json')
+        self.assertIn('list_hosts', self.available_plugins())
+
+    def test_the_installed_scripts_are_listed(self):
+        index_path = os.path.join(self.directory, 'index.json')
+        plugins = fplugin_utils.get_available_plugins(index_path=index_path)
+        self.assertEqual(plugins['hosts']['prettyname'], 'Show hosts')
+        self.assertNotIn('fplugin', plugins)
+
+
+# I'm Py3
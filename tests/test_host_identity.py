@@ -0,0 +1,66 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import time
+import threading
+import unittest
+from unittest import mock
+
+from faraday_client.model import commands_history
+from faraday_client.model.commands_history import CommandRunInformation, HostIdentity
+
+
+class HostIdentityTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(commands_history, 'get_private_ip', return_value='10.0.0.1')
+        self.get_private_ip = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(commands_history, 'get_hostname', return_value='faraday')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait_refresh(self, identity):
+        deadline = time.time() + 5
+        while identity._refreshing and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_commands_share_the_host_information(self):
+        identity = HostIdentity()
+        with mock.patch.object(commands_history, '_host_identity', identity):
+            commands = [CommandRunInformation(command='nmap') for _ in range(5)]
+        self.assertEqual(self.get_private_ip.call_count, 1)
+        self.assertEqual(commands[-1].ip, '10.0.0.1')
+        self.assertEqual(commands[-1].hostname, 'faraday')
+
+    def test_old_values_are_refreshed_in_background(self):
+        identity = HostIdentity(refresh_interval=0)
+        self.assertEqual(identity.get(), ('10.0.0.1', 'faraday'))
+        lookup = threading.Event()
+
+        def slow_get_private_ip():
+            lookup.wait(5)
+            return b'10.0.0.2\n'
+        self.get_private_ip.side_effect = slow_get_private_ip
+        self.assertEqual(identity.get(), ('10.0.0.1', 'faraday'))
+        lookup.set()
+        self.wait_refresh(identity)
+        self.assertEqual(identity.get()[0], '10.0.0.2')
+
+    def test_network_changes_refresh_the_values(self):
+        identity = HostIdentity()
+        identity.get()
+        identity._network_changes = mock.Mock()
+        identity._network_changes.recv.side_effect = [b'message', BlockingIOError, BlockingIOError]
+        self.get_private_ip.return_value = '10.0.0.3'
+        identity.get()
+        self.wait_refresh(identity)
+        self.assertEqual(identity.get()[0], '10.0.0.3')
+
+
+# I'm Py3
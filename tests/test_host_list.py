@@ -0,0 +1,156 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import queue
+import unittest
+
+from faraday_client.gui.host_list import HostList
+from faraday_client.persistence.server import models
+from faraday_client.persistence.server.identity_map import discard_identity_maps
+from faraday_client.persistence.server.workspace_stats import discard_workspace_stats
+from tests.fake_faraday_server import FakeFaradayServer
+
+
+class Host:
+
+    def __init__(self, host_id, name=None):
+        self.id = host_id
+        self.name = name or '10.0.0.{0}'.format(host_id)
+
+    def getID(self):
+        return self.id
+
+
+class Listener:
+
+    def __init__(self):
+        self.rows = []
+
+    def hosts_added(self, hosts):
+        self.rows += [host.id for host in hosts]
+
+    def host_updated(self, host):
+        pass
+
+    def host_removed(self, host_id):
+        self.rows.remove(int(host_id))
+
+    def cleared(self):
+        self.rows = []
+
+
+class HostListTest(unittest.TestCase):
+    """The fetches run in background threads, and deliver() queues their
+    results until wait() runs them, as the GUI thread does."""
+
+    def setUp(self):
+        self.server_hosts = [Host(host_id) for host_id in range(1, 26)]
+        self.fetched_pages = []
+        self.delivered = queue.Queue()
+        self.listener = Listener()
+        self.hosts = HostList(self.fetch_page, self.deliver, self.listener, page_size=10)
+
+    def fetch_page(self, page, page_size, search):
+        self.fetched_pages.append(page)
+        matching = [host for host in self.server_hosts if search in host.name]
+        return matching[(page - 1) * page_size:page * page_size], len(matching)
+
+    def deliver(self, function, *args):
+        self.delivered.put((function, args))
+
+    def wait(self):
+        """Run the delivered results until nothing is being fetched."""
+        while self.hosts._fetching:
+            function, args = self.delivered.get(timeout=5)
+            function(*args)
+
+    def test_pages_are_loaded_when_asked_and_the_next_one_is_prefetched(self):
+        self.hosts.reset()
+        self.wait()
+        self.assertEqual(self.listener.rows, list(range(1, 11)))
+        self.assertEqual(sorted(self.fetched_pages), [1, 2])
+        self.assertEqual(self.hosts.total, 25)
+        self.hosts.load_more()
+        # the prefetched page is shown without waiting for the server
+        self.assertEqual(self.listener.rows, list(range(1, 21)))
+        self.wait()
+        self.hosts.load_more()
+        self.assertTrue(self.hosts.complete)
+        self.assertEqual(self.listener.rows, list(range(1, 26)))
+        self.assertEqual(sorted(self.fetched_pages), [1, 2, 3])
+
+    def test_hosts_are_found_by_id(self):
+        self.hosts.reset()
+        self.wait()
+        self.assertIs(self.hosts.get('3'), self.server_hosts[2])
+        self.assertIn(3, self.hosts)
+        self.assertIsNone(self.hosts.get(15))
+
+    def test_the_search_is_done_by_the_server(self):
+        self.hosts.reset()
+        self.wait()
+        self.hosts.reset(search='10.0.0.2')
+        self.wait()
+        self.assertEqual(self.listener.rows, [2, 20, 21, 22, 23, 24, 25])
+        self.assertTrue(self.hosts.complete)
+
+    def test_pages_of_a_previous_search_are_dropped(self):
+        self.hosts.reset()
+        self.hosts.reset(search='10.0.0.1')
+        self.wait()
+        while not self.delivered.empty():
+            function, args = self.delivered.get()
+            function(*args)
+        self.assertEqual(self.listener.rows, [1, 10, 11, 12, 13, 14, 15, 16, 17, 18])
+
+    def test_deleted_hosts_do_not_hide_the_next_ones(self):
+        self.hosts.reset()
+        self.wait()
+        del self.server_hosts[0]
+        self.hosts.remove_host(1)
+        self.assertEqual(self.listener.rows, list(range(2, 11)))
+        self.hosts.load_more()
+        self.wait()
+        self.assertEqual(self.listener.rows, list(range(2, 12)))
+        self.hosts.load_more()
+        self.wait()
+        self.hosts.load_more()
+        self.wait()
+        self.assertEqual(self.listener.rows, list(range(2, 26)))
+        self.assertTrue(self.hosts.complete)
+
+    def test_created_hosts_are_shown_once_every_host_is_loaded(self):
+        self.server_hosts = self.server_hosts[:5]
+        self.hosts.reset()
+        self.wait()
+        self.assertTrue(self.hosts.complete)
+        self.hosts.add_host(Host(40))
+        self.hosts.add_host(Host(40))
+        self.assertEqual(self.listener.rows, [1, 2, 3, 4, 5, 40])
+        self.assertEqual(self.hosts.total, 6)
+
+
+class HostsPageTest(unittest.TestCase):
+
+    def setUp(self):
+        discard_identity_maps()
+        discard_workspace_stats()
+
+    def test_pages_are_sorted_and_counted_by_the_server(self):
+        with FakeFaradayServer(hosts=30, services_per_host=0, vulns_per_host=0) as fake:
+            fake.workspace.hosts[5]['vulns'] = 10
+            hosts, count = models.get_hosts_page(fake.workspace_name, 1, 10,
+                                                 sort='vulns', sort_dir='desc')
+            self.assertEqual(count, 30)
+            self.assertEqual(len(hosts), 10)
+            self.assertEqual(hosts[0].getID(), 5)
+            hosts, count = models.get_hosts_page(fake.workspace_name, 1, 10, search='10.0.0.2')
+            self.assertEqual(count, 11)
+
+
+# I'm Py3
@@ -0,0 +1,80 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import unittest
+from unittest import mock
+
+from faraday_client.persistence.server import models
+from faraday_client.persistence.server.identity_map import (
+    IdentityMap,
+    apply_change,
+    discard_identity_maps,
+    get_identity_map,
+)
+
+HOST = {'id': 1, 'ip': '127.0.0.1', 'name': '127.0.0.1', 'os': 'linux'}
+
+
+class IdentityMapTest(unittest.TestCase):
+
+    def setUp(self):
+        discard_identity_maps()
+
+    def tearDown(self):
+        discard_identity_maps()
+
+    def test_least_recently_used_objects_are_dropped(self):
+        identity_map = IdentityMap(max_size=2)
+        identity_map.add('Host', 1, 'host 1')
+        identity_map.add('Host', 2, 'host 2')
+        identity_map.get('Host', 1)
+        identity_map.add('Host', 3, 'host 3')
+        self.assertEqual(identity_map.get('Host', 1), 'host 1')
+        self.assertIsNone(identity_map.get('Host', 2))
+        self.assertEqual(len(identity_map), 2)
+
+    def test_old_objects_expire(self):
+        identity_map = IdentityMap(max_age=10)
+        with mock.patch('faraday_client.persistence.server.identity_map.time.time', return_value=100):
+            identity_map.add('Host', 1, 'host 1')
+        with mock.patch('faraday_client.persistence.server.identity_map.time.time', return_value=111):
+            self.assertIsNone(identity_map.get('Host', 1))
+
+    @mock.patch('faraday_client.persistence.server.server.get_hosts', return_value=[HOST])
+    def test_repeated_lookups_are_served_from_memory(self, get_hosts):
+        host = models.get_host('a_ws', 1)
+        self.assertIs(models.get_object('a_ws', 'Host', 1), host)
+        self.assertIs(models.get_host('a_ws', host_id=1), host)
+        get_hosts.assert_called_once_with('a_ws', object_id=1)
+        models.get_host('another_ws', 1)
+        self.assertEqual(get_hosts.call_count, 2)
+
+    @mock.patch('faraday_client.persistence.server.server.get_hosts', return_value=[HOST])
+    def test_lookups_with_filters_are_not_cached(self, get_hosts):
+        models.get_host('a_ws', ip='127.0.0.1')
+        models.get_host('a_ws', ip='127.0.0.1')
+        self.assertEqual(get_hosts.call_count, 2)
+
+    @mock.patch('faraday_client.persistence.server.server.get_hosts', return_value=[HOST])
+    def test_changes_invalidate_objects(self, get_hosts):
+        models.get_host('a_ws', 1)
+        apply_change('a_ws', {'action': 'UPDATE', 'id': 1, 'type': 'Host'})
+        models.get_host('a_ws', 1)
+        self.assertEqual(get_hosts.call_count, 2)
+        apply_change('a_ws', {'action': 'DELETE', 'id': '1', 'type': 'Host'})
+        self.assertIsNone(get_identity_map('a_ws').get('Host', 1))
+
+    @mock.patch('faraday_client.persistence.server.server.get_hosts', return_value=[HOST])
+    def test_discard_forgets_every_workspace(self, get_hosts):
+        models.get_host('a_ws', 1)
+        discard_identity_maps()
+        models.get_host('a_ws', 1)
+        self.assertEqual(get_hosts.call_count, 2)
+
+
+# I'm Py3
@@ -0,0 +1,57 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import os
+import unittest
+from unittest import mock
+
+from faraday_client.gui.image_cache import ImageCache
+
+
+def decode(path, width, height):
+    if not os.path.basename(path).endswith('.png'):
+        raise IOError('not an image')
+    return object()
+
+
+class ImageCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.load = mock.Mock(side_effect=decode)
+        self.cache = ImageCache(self.load, '/icons')
+
+    def test_images_are_decoded_once_and_shared(self):
+        icons = [self.cache.get('tux.png') for _ in range(100)]
+        self.assertTrue(all(icon is icons[0] for icon in icons))
+        self.load.assert_called_once_with('/icons/tux.png', -1, -1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (99, 1))
+
+    def test_every_size_is_decoded_apart(self):
+        small = self.cache.get('faraday_icon.png', 16, 16)
+        self.assertIsNot(self.cache.get('faraday_icon.png'), small)
+        self.assertIs(self.cache.get('faraday_icon.png', 16, 16), small)
+        self.assertEqual(self.load.call_count, 2)
+
+    def test_absolute_paths_share_the_cache(self):
+        self.assertIs(self.cache.get('/icons/tux.png'), self.cache.get('tux.png'))
+
+    def test_images_that_fail_are_not_decoded_again(self):
+        self.assertIsNone(self.cache.get('broken'))
+        self.assertIsNone(self.cache.get('broken'))
+        self.assertEqual(self.load.call_count, 1)
+
+    def test_preloaded_images_are_not_decoded_again(self):
+        self.cache.preload(['tux.png', ('faraday_icon.png', 16, 16)]).join()
+        self.cache.preload(['windows.png'], background=False)
+        self.assertEqual(self.load.call_count, 3)
+        self.cache.get('faraday_icon.png', 16, 16)
+        self.cache.get('windows.png')
+        self.assertEqual(self.load.call_count, 3)
+
+
+# I'm Py3
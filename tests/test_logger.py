@@ -0,0 +1,86 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import queue
+import logging
+import threading
+import unittest
+from unittest import mock
+
+from faraday_client.utils import logger as faraday_logger
+from faraday_client.utils.logger import BoundedQueueHandler, LogListener
+
+
+class CollectingHandler(logging.Handler):
+
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record.getMessage())
+        self.threads.add(threading.current_thread().name)
+
+
+def make_record(level, message):
+    return logging.LogRecord('faraday_client.test', level, __file__, 1, message, None, None)
+
+
+class QueuedLoggingTest(unittest.TestCase):
+
+    def test_records_are_written_by_the_logging_thread(self):
+        handler = CollectingHandler()
+        faraday_logger.add_handler(handler)
+        self.addCleanup(faraday_logger.remove_handler, handler)
+        faraday_logger.get_logger('test').warning('written %d', 1)
+        faraday_logger._listener.queue.join()
+        self.assertEqual(handler.records, ['written 1'])
+        self.assertNotIn(threading.current_thread().name, handler.threads)
+
+    def test_records_no_handler_writes_are_not_created(self):
+        root = logging.getLogger(faraday_logger.ROOT_LOGGER)
+        self.assertFalse(root.isEnabledFor(logging.DEBUG))
+        handler = CollectingHandler(logging.DEBUG)
+        faraday_logger.add_handler(handler)
+        self.assertTrue(root.isEnabledFor(logging.DEBUG))
+        faraday_logger.remove_handler(handler)
+        self.assertFalse(root.isEnabledFor(logging.DEBUG))
+
+    @mock.patch.object(faraday_logger, 'LOG_BLOCKING_TIMEOUT', 0.01)
+    def test_records_are_dropped_and_counted_when_the_queue_is_full(self):
+        queue_handler = BoundedQueueHandler(queue.Queue(2))
+        for level in (logging.DEBUG, logging.DEBUG, logging.DEBUG, logging.INFO, logging.ERROR):
+            queue_handler.handle(make_record(level, 'message'))
+        self.assertEqual(queue_handler.dropped, {'DEBUG': 1, 'INFO': 1, 'ERROR': 1})
+
+    def test_warnings_wait_for_room(self):
+        queue_handler = BoundedQueueHandler(queue.Queue(1))
+        handler = CollectingHandler()
+        listener = LogListener(queue_handler, handler)
+        queue_handler.handle(make_record(logging.INFO, 'first'))
+        listener.start()
+        queue_handler.handle(make_record(logging.WARNING, 'second'))
+        listener.stop()
+        self.assertEqual(handler.records, ['first', 'second'])
+        self.assertEqual(queue_handler.dropped, {})
+
+    def test_stop_writes_the_queued_records_and_the_drops(self):
+        queue_handler = BoundedQueueHandler(queue.Queue(3))
+        handler = CollectingHandler()
+        listener = LogListener(queue_handler, handler)
+        for number in range(5):
+            queue_handler.handle(make_record(logging.DEBUG, str(number)))
+        listener.start()
+        listener.stop()
+        listener.report_drops()
+        self.assertEqual(handler.records[:3], ['0', '1', '2'])
+        self.assertIn('2 records dropped', handler.records[-1])
+
+
+# I'm Py3
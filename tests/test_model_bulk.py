@@ -0,0 +1,282 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+from queue import Queue
+from unittest import mock
+
+from faraday_client.model import Modelactions
+from faraday_client.model.bulk import BulkCreateBatch, is_pending_id
+from faraday_client.model.controller import ModelController
+from faraday_client.persistence.server import models, server
+from faraday_client.persistence.server.server_io_exceptions import ConflictInDatabase
+from tests.fake_faraday_server import FakeFaradayServer
+
+
+def new_host(ip='127.0.0.1'):
+    return models.Host({'name': ip, 'ip': ip, 'os': 'linux'}, 'test_ws')
+
+
+def new_service(parent_id, port=22):
+    return models.Service({'name': 'ssh', 'protocol': 'tcp', 'ports': [port],
+                           'version': '', 'status': 'open', 'parent': parent_id,
+                           'parent_type': 'Host'}, 'test_ws')
+
+
+def new_vuln(parent_id, parent_type, name='vuln'):
+    return models.Vuln({'name': name, 'desc': 'a vuln', 'severity': 'high',
+                        'parent': parent_id, 'parent_type': parent_type}, 'test_ws')
+
+
+def build_controller(batch_size=250):
+    mappers_manager = mock.MagicMock()
+    mappers_manager.workspace_name = 'test_ws'
+    pending_actions = Queue()
+    controller = ModelController(mappers_manager, pending_actions,
+                                 batch_size=batch_size, batch_window=60)
+    return controller, mappers_manager, pending_actions
+
+
+def test_batch_nests_children_inside_parents():
+    batch = BulkCreateBatch(max_size=10, window=60)
+    host = new_host()
+    batch.add(host)
+    service = new_service(host.getID())
+    assert batch.accepts(service)
+    batch.add(service)
+    host_vuln = new_vuln(host.getID(), 'Host', 'host vuln')
+    service_vuln = new_vuln(service.getID(), 'Service', 'service vuln')
+    batch.add(host_vuln)
+    batch.add(service_vuln)
+    assert is_pending_id(host.getID())
+    assert batch.is_waiting(service)
+
+    objects = batch.take()
+    assert objects == [host, service, host_vuln, service_vuln]
+    assert not batch.is_waiting(service)
+    hosts = batch.build_hosts(objects)
+    assert len(hosts) == 1
+    assert hosts[0]['ip'] == '127.0.0.1'
+    assert [vuln['name'] for vuln in hosts[0]['vulnerabilities']] == ['host vuln']
+    assert hosts[0]['services'][0]['port'] == 22
+    assert [vuln['name'] for vuln in hosts[0]['services'][0]['vulnerabilities']] == ['service vuln']
+    assert len(batch) == 0
+
+
+def test_batch_rejects_children_of_server_objects():
+    batch = BulkCreateBatch(max_size=10, window=60)
+    assert not batch.accepts(new_vuln(35, 'Host'))
+
+
+def test_controller_sends_add_actions_in_one_request():
+    controller, mappers_manager, pending_actions = build_controller()
+    host = new_host()
+    controller.add_action((Modelactions.ADDHOST, host, None))
+    controller.processAllPendingActions()
+    mappers_manager.bulk_save.assert_called_once()
+    mappers_manager.save.assert_not_called()
+    assert host.getMetadata().update_controller_action == 'ModelControler.__add'
+
+    vulns = [new_vuln(host.getID(), 'Host', 'vuln {0}'.format(i)) for i in range(50)]
+    for vuln in vulns:
+        controller.add_action((Modelactions.ADDVULNHOST, vuln, None))
+    controller.processAllPendingActions()
+    assert mappers_manager.bulk_save.call_count == 2
+    hosts, = mappers_manager.bulk_save.call_args[0]
+    assert len(hosts[0]['vulnerabilities']) == 50
+    mappers_manager.save.assert_not_called()
+
+
+def test_controller_sends_batch_when_full():
+    controller, mappers_manager, pending_actions = build_controller(batch_size=5)
+    for i in range(12):
+        controller.add_action((Modelactions.ADDHOST, new_host('10.0.0.{0}'.format(i)), None))
+    for _ in range(12):
+        controller.processAction()
+    assert mappers_manager.bulk_save.call_count == 2
+    controller.flushAddBatch()
+    assert mappers_manager.bulk_save.call_count == 3
+
+
+def test_controller_sends_batch_before_other_actions():
+    controller, mappers_manager, pending_actions = build_controller()
+    controller.add_action((Modelactions.ADDHOST, new_host(), None))
+    controller.add_action((Modelactions.PLUGINEND, 'test', 1))
+    controller.processAction()
+    mappers_manager.bulk_save.assert_not_called()
+    controller.processAction()
+    mappers_manager.bulk_save.assert_called_once()
+
+
+def test_controller_falls_back_to_conflict_merge():
+    controller, mappers_manager, pending_actions = build_controller()
+    mappers_manager.bulk_save.side_effect = Exception('bulk_create not available')
+    answer = mock.MagicMock()
+    answer.json.return_value = {'object': {'id': 10, 'ip': '127.0.0.1', 'name': '127.0.0.1',
+                                           'os': 'windows'}}
+    mappers_manager.save.side_effect = [ConflictInDatabase(answer), 11]
+    host = new_host()
+    with mock.patch.object(controller, 'addUpdate') as add_update:
+        controller.add_action((Modelactions.ADDHOST, host, None))
+        controller.processAllPendingActions()
+        service = new_service(host.getID())
+        controller.add_action((Modelactions.ADDSERVICEHOST, service, None))
+        controller.processAllPendingActions()
+    assert host.getID() == 10
+    assert service.getID() == 11
+    assert service.getParent() == 10
+    add_update.assert_called_once()
+
+
+def test_controller_uses_the_ids_bulk_create_answers_with():
+    controller, mappers_manager, pending_actions = build_controller()
+    mappers_manager.bulk_save.return_value = {
+        'message': 'Created',
+        'hosts': [{'id': 10, 'created': True, 'vulnerabilities': [], 'credentials': [],
+                   'services': [{'id': 11, 'created': True, 'vulnerabilities': [{'id': 12, 'created': True}],
+                                 'credentials': []}]}]}
+    host = new_host()
+    pending_host_id = controller._add_batch.add(host)
+    service = new_service(pending_host_id)
+    controller._add_batch.add(service)
+    vuln = new_vuln(service.getID(), 'Service')
+    added = []
+    with mock.patch('faraday_client.model.controller.notifier') as notifier:
+        notifier.addObject.side_effect = lambda obj: added.append((obj, obj.getID()))
+        controller.add_action((Modelactions.ADDVULNSRV, vuln, None))
+        controller.processAllPendingActions()
+    assert (host.getID(), service.getID(), vuln.getID()) == (10, 11, 12)
+    assert (service.getParent(), vuln.getParent()) == (10, 11)
+    assert added == [(host, 10), (service, 11), (vuln, 12)]
+    mappers_manager.save.assert_not_called()
+
+    # children added later with the pending id of their parent get the real one
+    mappers_manager.save.return_value = 13
+    host_vuln = new_vuln(pending_host_id, 'Host')
+    controller.add_action((Modelactions.ADDVULNHOST, host_vuln, 3))
+    controller.processAllPendingActions()
+    mappers_manager.save.assert_called_once_with(host_vuln, 3)
+    assert host_vuln.getParent() == 10
+
+
+def test_objects_bulk_create_already_had_are_merged():
+    controller, mappers_manager, pending_actions = build_controller()
+    existing = {'id': 10, 'ip': '127.0.0.1', 'name': '127.0.0.1', 'os': 'windows'}
+    mappers_manager.bulk_save.return_value = {
+        'hosts': [{'id': 10, 'created': False, 'object': existing, 'services': [],
+                   'vulnerabilities': [], 'credentials': []}]}
+    host = new_host()
+    with mock.patch('faraday_client.model.controller.notifier') as notifier, \
+            mock.patch.object(controller, 'addUpdate') as add_update:
+        controller.add_action((Modelactions.ADDHOST, host, None))
+        controller.processAllPendingActions()
+    assert host.getID() == 10
+    old_obj, new_obj, command_id = add_update.call_args[0]
+    assert (old_obj.getID(), old_obj.getOS(), new_obj, command_id) == (10, 'windows', host, None)
+    notifier.addObject.assert_not_called()
+    mappers_manager.save.assert_not_called()
+
+
+def test_bulk_create_ids_of_the_server():
+    controller, mappers_manager, pending_actions = build_controller()
+    with FakeFaradayServer(hosts=1, services_per_host=0, vulns_per_service=0, vulns_per_host=0) as fake:
+        mappers_manager.bulk_save.side_effect = lambda hosts: server.bulk_create(fake.workspace_name, hosts)
+        existing_id, = fake.workspace.hosts
+        existing = new_host(fake.workspace.hosts[existing_id]['ip'])
+        host = new_host('192.168.0.1')
+        with mock.patch('faraday_client.model.controller.notifier') as notifier, \
+                mock.patch.object(controller, 'addUpdate') as add_update:
+            controller.add_action((Modelactions.ADDHOST, existing, None))
+            controller.add_action((Modelactions.ADDHOST, host, None))
+            controller.processAction()
+            controller.processAction()
+            # plugins keep using the pending id createAndAddHost returned
+            pending_host_id = host.getID()
+            controller.processAllPendingActions()
+            service = new_service(pending_host_id)
+            controller.add_action((Modelactions.ADDSERVICEHOST, service, None))
+            controller.processAllPendingActions()
+        assert existing.getID() == existing_id
+        assert host.getID() in fake.workspace.hosts
+        assert fake.workspace.services[service.getID()]['parent'] == host.getID()
+        assert service.getParent() == host.getID()
+        assert notifier.addObject.call_args_list == [mock.call(host), mock.call(service)]
+        assert add_update.call_args[0][1] is existing
+        assert fake.requests['POST bulk_create'] == 2
+
+
+def test_objects_keep_the_pending_id_if_bulk_create_has_no_ids():
+    controller, mappers_manager, pending_actions = build_controller()
+    mappers_manager.bulk_save.return_value = {'message': 'Created'}
+    host = new_host()
+    with mock.patch('faraday_client.model.controller.notifier') as notifier:
+        controller.add_action((Modelactions.ADDHOST, host, None))
+        controller.processAllPendingActions()
+    assert is_pending_id(host.getID())
+    # the GUI gets it from the changes stream, with its real id
+    notifier.addObject.assert_not_called()
+
+
+def existing_host_conflict(host_id):
+    answer = mock.MagicMock()
+    answer.json.return_value = {'object': {'id': host_id, 'ip': '127.0.0.1',
+                                           'name': '127.0.0.1', 'os': 'linux'}}
+    return ConflictInDatabase(answer)
+
+
+def test_objects_of_a_command_are_not_batched():
+    controller, mappers_manager, pending_actions = build_controller()
+    mappers_manager.save.return_value = 10
+    host = new_host()
+    controller.add_action((Modelactions.ADDHOST, host, 3))
+    controller.processAllPendingActions()
+    mappers_manager.bulk_save.assert_not_called()
+    mappers_manager.save.assert_called_once_with(host, 3)
+    assert host.getID() == 10
+
+
+def test_pending_ids_are_resolved_before_editing():
+    controller, mappers_manager, pending_actions = build_controller()
+    host = new_host()
+    controller.add_action((Modelactions.ADDHOST, host, None))
+    controller.processAllPendingActions()
+    pending_id = host.getID()
+    assert is_pending_id(pending_id)
+    mappers_manager.save.side_effect = [existing_host_conflict(10)]
+    copy = new_host()
+    copy.setID(pending_id)
+    controller.add_action((Modelactions.EDITHOST, copy, None))
+    controller.processAllPendingActions()
+    assert host.getID() == 10
+    assert copy.getID() == 10
+    mappers_manager.update.assert_called_once_with(copy, None)
+
+    # the mapping is kept, the server isn't asked again
+    copy.setID(pending_id)
+    controller.add_action((Modelactions.EDITHOST, copy, None))
+    controller.processAllPendingActions()
+    assert copy.getID() == 10
+    assert mappers_manager.save.call_count == 1
+
+
+def test_pending_ids_are_resolved_before_deleting():
+    controller, mappers_manager, pending_actions = build_controller()
+    host = new_host()
+    controller.add_action((Modelactions.ADDHOST, host, None))
+    controller.processAllPendingActions()
+    mappers_manager.save.side_effect = [existing_host_conflict(10)]
+    mappers_manager.find.return_value = host
+    controller.add_action((Modelactions.DELHOST, host.getID()))
+    with mock.patch.object(controller, 'removeConflictsByObject'):
+        controller.processAllPendingActions()
+    mappers_manager.remove.assert_called_once_with(10, 'Host')
+    controller.add_action((Modelactions.DELHOST, 'pending-unknown'))
+    controller.processAllPendingActions()
+    mappers_manager.remove.assert_called_once()
+
+
+# I'm Py3
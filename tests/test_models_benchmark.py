@@ -0,0 +1,72 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+Micro-benchmark of the construction of model objects, the way they are
+built when a workspace is loaded. Run it directly to print how many
+objects per second are constructed:
+
+    python -m tests.test_models_benchmark [amount]
+'''
+from __future__ import absolute_import
+
+import sys
+import time
+import unittest
+from unittest import mock
+
+from faraday_client.persistence.server import models
+
+BENCHMARK_OBJECTS = 20000
+
+
+def vuln_dictionaries(amount):
+    return [{'id': vuln_id,
+             'value': {'name': 'vuln {0}'.format(vuln_id), 'desc': 'description',
+                       'severity': 'high', 'parent': 1, 'parent_type': 'Host',
+                       'owner': 'faraday', 'refs': [], 'data': '',
+                       'metadata': {'creator': 'nmap', 'update_time': 0}}}
+            for vuln_id in range(1, amount + 1)]
+
+
+def objects_per_second(amount=BENCHMARK_OBJECTS):
+    dictionaries = vuln_dictionaries(amount)
+    start = time.perf_counter()
+    models._get_faraday_ready_objects('a_ws', dictionaries, 'vulns')
+    return amount / (time.perf_counter() - start)
+
+
+class ModelConstructionBenchmark(unittest.TestCase):
+
+    def test_objects_per_second(self):
+        rate = objects_per_second()
+        sys.stderr.write('\n{0:.0f} vulns constructed per second\n'.format(rate))
+        self.assertGreater(rate, 0)
+
+    def test_construction_does_not_inspect_the_stack_nor_allocate_events(self):
+        with mock.patch('traceback.extract_stack') as extract_stack, \
+                mock.patch.object(models, 'Event') as event:
+            vulns = models._get_faraday_ready_objects('a_ws', vuln_dictionaries(10), 'vulns')
+            host = models.Host({'name': '10.0.0.1', 'ip': '10.0.0.1'}, 'a_ws')
+        extract_stack.assert_not_called()
+        event.assert_not_called()
+        self.assertEqual(vulns[0].getMetadata(), {'creator': 'nmap', 'update_time': 0})
+        self.assertIsInstance(host.getMetadata(), models.Metadata)
+        self.assertEqual(host.getMetadata().update_controller_action, models.NO_CONTROLLER_ACTION)
+
+    def test_id_available_is_created_when_needed(self):
+        host = models.Host({'name': '10.0.0.1', 'ip': '10.0.0.1'}, 'a_ws')
+        self.assertFalse(host.id_available.is_set())
+        host.setID(5)
+        self.assertTrue(host.id_available.is_set())
+        self.assertEqual(host.getID(), 5)
+        self.assertTrue(models.Host({'id': 3, 'ip': '10.0.0.3'}, 'a_ws').id_available.is_set())
+
+
+if __name__ == '__main__':
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print('{0:.0f} vulns constructed per second'.format(objects_per_second(amount)))
+
+
+# I'm Py3
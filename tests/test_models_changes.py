@@ -0,0 +1,84 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import unittest
+from unittest import mock
+
+from faraday_client.persistence.server import models
+from faraday_client.persistence.server.identity_map import discard_identity_maps
+from faraday_client.persistence.server.server_io_exceptions import (
+    CantCommunicateWithServerError,
+    ResourceDoesNotExist
+)
+
+
+def host(host_id):
+    return {'id': host_id, 'ip': '10.0.0.{0}'.format(host_id),
+            'name': '10.0.0.{0}'.format(host_id), 'os': 'linux'}
+
+
+class ChangedObjectsTest(unittest.TestCase):
+
+    def setUp(self):
+        discard_identity_maps()
+        models._batch_fetch_unsupported.clear()
+
+    def tearDown(self):
+        discard_identity_maps()
+        models._batch_fetch_unsupported.clear()
+
+    def test_objects_are_built_from_the_change(self):
+        change = {'action': 'CREATE', 'id': 3, 'type': 'Host', 'object': host(3)}
+        obj = models.get_object_from_change('a_ws', change)
+        self.assertEqual(obj.ip, '10.0.0.3')
+        with mock.patch('faraday_client.persistence.server.server.get_hosts') as get_hosts:
+            self.assertIs(models.get_host('a_ws', 3), obj)
+        get_hosts.assert_not_called()
+
+    def test_changes_without_enough_data_are_not_built(self):
+        change = {'action': 'CREATE', 'id': 3, 'type': 'Service', 'object': {'name': 'ssh'}}
+        self.assertIsNone(models.get_object_from_change('a_ws', change))
+        self.assertIsNone(models.get_object_from_change('a_ws', {'action': 'CREATE', 'id': 3,
+                                                                 'type': 'Host'}))
+
+    @mock.patch('faraday_client.persistence.server.server.get_hosts')
+    @mock.patch('faraday_client.persistence.server.server.get_objects_by_id',
+                return_value=[{'id': 1, 'value': host(1)}, {'id': 2, 'value': host(2)}])
+    def test_missing_objects_are_fetched_together(self, get_objects_by_id, get_hosts):
+        objects = models.get_objects('a_ws', 'Host', [1, 2, 5])
+        self.assertEqual(sorted(objects), [1, 2])
+        get_objects_by_id.assert_called_once_with('a_ws', 'hosts', 'rows', [1, 2, 5])
+        get_hosts.assert_not_called()
+        models.get_objects('a_ws', 'Host', [1, 2])
+        get_objects_by_id.assert_called_once()
+
+    @mock.patch('faraday_client.persistence.server.server.get_hosts',
+                side_effect=[[host(1)], ResourceDoesNotExist('url'), [host(3)], [host(4)]])
+    @mock.patch('faraday_client.persistence.server.server.get_objects_by_id',
+                side_effect=ResourceDoesNotExist('url'))
+    def test_objects_are_fetched_one_by_one_without_filters(self, get_objects_by_id, get_hosts):
+        objects = models.get_objects('a_ws', 'Host', [1, 2])
+        self.assertEqual(list(objects), [1])
+        self.assertEqual(get_hosts.call_count, 2)
+        self.assertEqual(sorted(models.get_objects('a_ws', 'Host', [3, 4])), [3, 4])
+        get_objects_by_id.assert_called_once()
+
+    @mock.patch('faraday_client.persistence.server.server.get_hosts',
+                side_effect=[[host(1)], [host(2)]])
+    @mock.patch('faraday_client.persistence.server.server.get_objects_by_id',
+                side_effect=[CantCommunicateWithServerError(None, 'url', {}),
+                             [{'id': 3, 'value': host(3)}, {'id': 4, 'value': host(4)}]])
+    def test_objects_are_fetched_together_again_after_a_server_error(self, get_objects_by_id,
+                                                                     get_hosts):
+        self.assertEqual(sorted(models.get_objects('a_ws', 'Host', [1, 2])), [1, 2])
+        self.assertEqual(sorted(models.get_objects('a_ws', 'Host', [3, 4])), [3, 4])
+        self.assertEqual(get_objects_by_id.call_count, 2)
+        self.assertEqual(get_hosts.call_count, 2)
+
+
+# I'm Py3
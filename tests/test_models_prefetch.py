@@ -0,0 +1,86 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import unittest
+from unittest import mock
+
+from faraday_client.persistence.server import models
+from faraday_client.persistence.server.identity_map import discard_identity_maps
+
+HOSTS = [{'id': host_id, 'ip': '10.0.0.{0}'.format(host_id),
+          'name': '10.0.0.{0}'.format(host_id), 'os': 'linux'}
+         for host_id in (1, 2)]
+
+SERVICES = [{'id': 10 + host_id * 10 + port, 'name': 'svc', 'protocol': 'tcp',
+             'ports': port, 'version': '', 'status': 'open', 'parent': host_id}
+            for host_id in (1, 2) for port in (1, 2)]
+
+
+def vuln(vuln_id, parent, parent_type):
+    return {'id': vuln_id,
+            'value': {'name': 'vuln {0}'.format(vuln_id), 'desc': '', 'severity': 'high',
+                      'type': 'Vulnerability', 'parent': parent,
+                      'parent_type': parent_type}}
+
+
+VULNS = [vuln(100, 1, 'Host'), vuln(101, 21, 'Service'),
+         vuln(102, 22, 'Service'), vuln(103, 31, 'Service')]
+
+
+@mock.patch('faraday_client.persistence.server.server.get_all_vulns', return_value=VULNS)
+@mock.patch('faraday_client.persistence.server.server.get_services', return_value=SERVICES)
+@mock.patch('faraday_client.persistence.server.server.get_hosts', return_value=HOSTS)
+class PrefetchTest(unittest.TestCase):
+
+    def setUp(self):
+        discard_identity_maps()
+
+    def tearDown(self):
+        discard_identity_maps()
+
+    def test_walking_the_workspace_makes_one_request_per_kind(self, get_hosts,
+                                                              get_services, get_all_vulns):
+        services_by_host = {}
+        vulns_by_service = {}
+        with models.prefetch('a_ws'):
+            for host in models.get_hosts('a_ws'):
+                services_by_host[host.id] = [service.id for service in host.getServices()]
+                for service in host.getServices():
+                    vulns_by_service[service.id] = [v.id for v in service.getVulns()]
+                    self.assertIs(models.get_host('a_ws', service.getParent()), host)
+            host_vulns = [v.id for v in models.get_host('a_ws', 1).getVulns()]
+        self.assertEqual(services_by_host, {1: [21, 22], 2: [31, 32]})
+        self.assertEqual(vulns_by_service, {21: [101], 22: [102], 31: [103], 32: []})
+        self.assertEqual(host_vulns, [100, 101, 102])
+        get_hosts.assert_called_once_with('a_ws')
+        get_services.assert_called_once_with('a_ws')
+        get_all_vulns.assert_called_once_with('a_ws')
+
+    def test_accessors_ask_the_server_outside_of_the_scope(self, get_hosts,
+                                                           get_services, get_all_vulns):
+        with models.prefetch('a_ws'):
+            host = models.get_hosts('a_ws')[0]
+        host.getServices()
+        get_services.assert_called_once_with('a_ws', host_id=1)
+        with models.prefetch('another_ws'):
+            host.getVulns()
+        get_all_vulns.assert_called_once_with('a_ws', target='10.0.0.1')
+
+    def test_host_loader_only_loads_that_host(self, get_hosts, get_services, get_all_vulns):
+        host = models.Host(HOSTS[0], 'a_ws')
+        loader = models.WorkspacePrefetch('a_ws', host=host)
+        with models.prefetch('a_ws', loader):
+            self.assertEqual(models.get_hosts('a_ws'), [host])
+            host.getServices()
+        with models.prefetch('a_ws', loader):
+            host.getServices()
+        get_hosts.assert_not_called()
+        get_services.assert_called_once_with('a_ws', host_id=1)
+
+
+# I'm Py3
@@ -0,0 +1,108 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import unittest
+from unittest import mock
+
+from faraday_client.plugins.bulk_upload import BulkCreateUpload, iter_bulk_create_chunks
+from faraday_client.persistence.server.server_io_exceptions import (
+    CantCommunicateWithServerError,
+    ConflictInDatabase
+)
+from tests.fake_faraday_server import FakeFaradayServer
+
+
+def vuln(name):
+    return {'name': name, 'severity': 'low', 'desc': 'x' * 100}
+
+
+def plugin_hosts():
+    return [
+        {'ip': '10.0.0.1', 'vulnerabilities': [vuln('a'), vuln('b')],
+         'services': [{'name': 'ssh', 'port': 22, 'vulnerabilities': [vuln(str(i)) for i in range(5)]},
+                      {'name': 'http', 'port': 80}]},
+        {'ip': '10.0.0.2'},
+    ]
+
+
+def sent_vulns(chunks):
+    names = []
+    for hosts in chunks:
+        for host in hosts:
+            names += [v['name'] for v in host.get('vulnerabilities', [])]
+            for service in host.get('services', []):
+                names += [v['name'] for v in service.get('vulnerabilities', [])]
+    return names
+
+
+class BulkCreateChunksTest(unittest.TestCase):
+
+    def test_small_payloads_are_sent_in_one_chunk(self):
+        chunks = list(iter_bulk_create_chunks(plugin_hosts()))
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0], plugin_hosts())
+
+    def test_big_hosts_are_split_between_chunks(self):
+        chunks = list(iter_bulk_create_chunks(plugin_hosts(), max_objects=4))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(sent_vulns(chunks), ['a', 'b', '0', '1', '2', '3', '4'])
+        for hosts in chunks:
+            self.assertTrue(all('ip' in host for host in hosts))
+        self.assertEqual(chunks[-1][-1], {'ip': '10.0.0.2'})
+        ssh_chunks = [host for hosts in chunks for host in hosts
+                      if any(s['name'] == 'ssh' for s in host.get('services', []))]
+        self.assertGreater(len(ssh_chunks), 1)
+
+    def test_chunks_are_bounded_by_size(self):
+        chunks = list(iter_bulk_create_chunks(plugin_hosts(), max_bytes=400))
+        self.assertGreater(len(chunks), 2)
+        self.assertEqual(len(sent_vulns(chunks)), 7)
+
+
+class BulkCreateUploadTest(unittest.TestCase):
+
+    @mock.patch('faraday_client.plugins.bulk_upload.server.bulk_create',
+                return_value={'message': 'Created', 'command_id': 7})
+    def test_the_command_is_created_by_the_first_chunk(self, bulk_create):
+        upload = BulkCreateUpload('a_ws', plugin_hosts(), command={'tool': 'nmap'}, max_objects=4).send()
+        self.assertTrue(upload)
+        self.assertEqual(upload.sent_objects, 16)
+        self.assertEqual(bulk_create.call_count, 5)
+        commands = [call[1]['command'] for call in bulk_create.call_args_list]
+        self.assertEqual(commands, [{'tool': 'nmap'}] + [{'tool': 'nmap', 'id': 7}] * 4)
+
+    @mock.patch('faraday_client.plugins.bulk_upload.server.bulk_create', return_value={})
+    def test_the_chunks_are_linked_to_a_saved_command(self, bulk_create):
+        BulkCreateUpload('a_ws', plugin_hosts(), command={'tool': 'nmap'}, command_id=3,
+                         max_objects=4).send()
+        for call in bulk_create.call_args_list:
+            self.assertEqual(call[1], {'command': {'tool': 'nmap', 'id': 3}})
+
+    def test_a_big_report_creates_one_command(self):
+        with FakeFaradayServer(hosts=0) as fake:
+            upload = BulkCreateUpload(fake.workspace_name, plugin_hosts(),
+                                      command={'tool': 'nmap', 'command': 'nmap'}, max_objects=4)
+            self.assertTrue(upload.send())
+            self.assertEqual(len(upload.chunks), 5)
+            self.assertEqual(list(fake.workspace.commands), [upload.command_id])
+
+    @mock.patch('faraday_client.plugins.bulk_upload.server.bulk_create')
+    def test_failed_chunks_are_retried(self, bulk_create):
+        network_error = CantCommunicateWithServerError(None, 'url', {})
+        bulk_create.side_effect = [{}, network_error, ConflictInDatabase('answer'), {}, {}, {}, {}]
+        upload = BulkCreateUpload('a_ws', plugin_hosts(), max_objects=4)
+        upload.send(retry_delay=0)
+        self.assertEqual(len(upload.chunks), 5)
+        self.assertEqual([chunk.index for chunk in upload.failed], [2])
+        self.assertEqual(upload.chunks[1].attempts, 2)
+        self.assertFalse(upload)
+        upload.retry()
+        self.assertTrue(upload)
+
+
+# I'm Py3
@@ -10,7 +10,7 @@ import sys
 sys.path.append('.')
 import unittest
 from queue import Queue
-from unittest.mock import MagicMock as mock
+from unittest.mock import MagicMock as mock, patch
 
 import faraday_client.plugins.controller
 
@@ -99,5 +99,19 @@ class PluginControllerUnitTest(unittest.TestCase):
         self.controller.updatePluginSettings(plugin_id, new_settings)
         self.plugin1.updateSettings.assert_called_once_with(new_settings)
 
+    def test_outputs_are_paired_with_the_commands_in_order(self):
+        self.controller._is_command_malformed = mock(return_value=False)
+        self.controller.commands_queue = mock()
+        self.controller.plugin_sets[42] = [self.plugin1]
+        with patch('faraday_client.model.api.getActiveWorkspace'):
+            self.controller.processCommandInput(42, 'ping a', '/')
+            # the next command arrived before the output of the first one
+            self.controller.processCommandInput(42, 'ping b', '/')
+        self.assertTrue(self.controller.onCommandFinished(42, 0, 'output a'))
+        self.assertTrue(self.controller.onCommandFinished(42, 0, 'output b'))
+        self.assertFalse(self.controller.onCommandFinished(42, 0, 'output c'))
+        submitted = [args[0].params for args, _ in self.controller.commands_queue.submit.call_args_list]
+        self.assertEqual(submitted, ['a', 'b'])
+
 
 # I'm Py3
@@ -0,0 +1,72 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import os
+import sys
+import queue
+import shutil
+import tempfile
+import unittest
+
+from faraday_client.managers.report_watcher import ProcessedReports, ReportWatcher
+
+
+class ReportWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.reports = queue.Queue()
+        self.watchers = []
+
+    def tearDown(self):
+        for watcher in self.watchers:
+            watcher.stop()
+            watcher.join(5)
+        shutil.rmtree(self.path)
+
+    def start_watcher(self, **kwargs):
+        watcher = ReportWatcher(self.path, self.reports.put, poll_interval=0.05,
+                                stable_time=0.2, **kwargs)
+        self.watchers.append(watcher)
+        watcher.start()
+        return watcher
+
+    def write_report(self, name, content='<report/>'):
+        filename = os.path.join(self.path, name)
+        with open(filename, 'w') as report:
+            report.write(content)
+        return filename
+
+    def test_polling_reports_files_once_they_are_stable(self):
+        old_report = self.write_report('old.xml')
+        self.start_watcher(use_inotify=False)
+        self.assertEqual(self.reports.get(timeout=5), old_report)
+        os.remove(old_report)
+        new_report = self.write_report('new.xml')
+        self.write_report('.hidden.xml')
+        self.assertEqual(self.reports.get(timeout=5), new_report)
+        self.assertTrue(self.reports.empty())
+
+    @unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is only available on Linux')
+    def test_inotify_reports_closed_files(self):
+        watcher = self.start_watcher()
+        self.assertTrue(watcher.uses_inotify)
+        report = self.write_report('nmap.xml')
+        self.assertEqual(self.reports.get(timeout=5), report)
+
+    def test_processed_reports_are_remembered(self):
+        record_path = os.path.join(self.path, '.processed.json')
+        report = self.write_report('nmap.xml')
+        ProcessedReports(record_path).add(report)
+        processed_reports = ProcessedReports(record_path)
+        self.assertIn(report, processed_reports)
+        self.write_report('nmap.xml', '<another report="yes"/>')
+        self.assertNotIn(report, processed_reports)
+
+
+# I'm Py3
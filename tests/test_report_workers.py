@@ -0,0 +1,112 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from faraday_client.managers import reports_managers
+from faraday_client.managers.reports_managers import ReportJob, ReportManager, ReportWorkerPool
+
+
+class ReportWorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ReportWorkerPool(max_workers=2)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.pool.shutdown()
+
+    def blocked_process(self, result):
+        def process():
+            self.release.wait(5)
+            return result
+        return process
+
+    def test_big_reports_dont_block_the_others(self):
+        big = self.pool.submit('big.xml', self.blocked_process('big'))
+        small = self.pool.submit('small.xml', lambda: 'small')
+        self.assertTrue(small.wait(5))
+        self.assertEqual(small.result, 'small')
+        self.assertEqual(big.state, ReportJob.RUNNING)
+        self.release.set()
+        self.assertTrue(self.pool.wait(5))
+        self.assertEqual(big.state, ReportJob.DONE)
+
+    def test_jobs_with_the_same_key_keep_their_order(self):
+        processed = []
+        first = self.pool.submit('a.xml', self.blocked_process('first'), key='a_ws',
+                                 on_finish=lambda job: processed.append(job.result))
+        second = self.pool.submit('b.xml', lambda: 'second', key='a_ws',
+                                  on_finish=lambda job: processed.append(job.result))
+        other = self.pool.submit('c.xml', lambda: 'other', key='another_ws')
+        self.assertTrue(other.wait(5))
+        self.assertEqual(second.state, ReportJob.PENDING)
+        self.release.set()
+        self.assertTrue(self.pool.wait(5))
+        self.assertEqual(processed, ['first', 'second'])
+        self.assertEqual(first.state, ReportJob.DONE)
+
+    def test_pending_jobs_can_be_cancelled(self):
+        self.pool.submit('a.xml', self.blocked_process('a'), key='a_ws')
+        pending = self.pool.submit('b.xml', lambda: 'b', key='a_ws')
+        self.assertEqual(self.pool.progress(), {'pending': 1, 'running': 1})
+        self.assertEqual(self.pool.cancel('b.xml'), [pending])
+        self.assertTrue(pending.wait(1))
+        self.assertEqual(pending.state, ReportJob.CANCELLED)
+        self.assertIsNone(pending.result)
+
+    def test_failed_reports_are_reported(self):
+        def process():
+            raise ValueError('not a report')
+        job = self.pool.submit('a.xml', process)
+        self.assertTrue(job.wait(5))
+        self.assertEqual(job.state, ReportJob.FAILED)
+        self.assertIsInstance(job.error, ValueError)
+
+
+class ReportManagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        patcher = mock.patch.object(reports_managers.CONF, 'getReportPath', return_value=self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('faraday_client.managers.report_watcher.Inotify')
+        self.inotify = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.closed = threading.Event()
+        self.inotify.return_value.read.side_effect = self.read_no_events
+        self.inotify.return_value.close.side_effect = self.closed.set
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def read_no_events(self, timeout):
+        self.closed.wait(0.05)
+        return []
+
+    def test_the_watcher_is_opened_and_closed_by_the_running_manager(self):
+        manager = ReportManager(0.05, 'a_ws', mock.Mock())
+        self.inotify.assert_not_called()
+        manager.start()
+        manager.stop()
+        manager.join(5)
+        self.inotify.assert_called_once()
+        self.assertTrue(self.closed.wait(5))
+
+    def test_managers_never_started_open_no_watcher(self):
+        ReportManager(0.05, 'a_ws', mock.Mock()).stop()
+        self.inotify.assert_not_called()
+
+
+# I'm Py3
@@ -0,0 +1,173 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import gzip
+import zlib
+import json
+import base64
+import threading
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from tornado import gen
+from tornado.ioloop import IOLoop
+from tornado.testing import AsyncHTTPTestCase, gen_test
+
+from faraday_client.apis.rest import api
+
+
+class RESTApiTest(unittest.TestCase):
+
+    def setUp(self):
+        self.plugin_controller = mock.Mock()
+        self.app = api._create_app([api.PluginControllerAPI(self.plugin_controller),
+                                    api.ModelControllerAPI(mock.Mock())])
+
+    def test_big_requests_are_rejected(self):
+        self.app.config['MAX_CONTENT_LENGTH'] = 100
+        response = self.app.test_client().post('/cmd/output', json={'output': 'A' * 200})
+        self.assertEqual(response.status_code, 413)
+        self.plugin_controller.onCommandFinished.assert_not_called()
+
+
+class CommandOutputStreamTest(AsyncHTTPTestCase):
+
+    def get_app(self):
+        self.outputs = []
+        self.plugin_controller = mock.Mock()
+        self.plugin_controller.onCommandFinished.side_effect = self.on_command_finished
+        self.executor = ThreadPoolExecutor(2)
+        wsgi_app = api._create_app([api.PluginControllerAPI(self.plugin_controller)])
+        return api._create_tornado_app(wsgi_app, self.plugin_controller, self.executor)
+
+    def tearDown(self):
+        super().tearDown()
+        self.executor.shutdown()
+
+    def on_command_finished(self, pid, exit_code, output):
+        with output:
+            self.outputs.append((pid, exit_code, output.read()))
+        return True
+
+    def stream(self, chunks, headers=None, pid=1):
+        def body_producer(write):
+            for chunk in chunks:
+                write(chunk)
+        return self.fetch('/cmd/output/stream?pid={0}&exit_code=0'.format(pid), method='POST',
+                          body_producer=body_producer, headers=headers or {})
+
+    def test_gzipped_outputs_are_decompressed_while_received(self):
+        output = b'Nmap scan report for 10.0.0.1\n' * 10000
+        compressed = gzip.compress(output)
+        chunks = [compressed[i:i + 1000] for i in range(0, len(compressed), 1000)]
+        response = self.stream(chunks, {'Content-Encoding': 'gzip'})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(self.outputs, [(1, 0, output)])
+
+    def test_plain_outputs_are_accepted(self):
+        self.assertEqual(self.stream([b'PING ', b'10.0.0.1']).code, 200)
+        self.assertEqual(self.outputs, [(1, 0, b'PING 10.0.0.1')])
+
+    def test_too_big_outputs_are_rejected(self):
+        with mock.patch.object(api, 'REST_API_MAX_OUTPUT_SIZE', 10):
+            response = self.stream([b'0123456789', b'0123456789'])
+        self.assertEqual(response.code, 413)
+        self.plugin_controller.onCommandFinished.assert_not_called()
+
+    def test_gzip_bombs_are_rejected_while_decompressed(self):
+        decompressors = []
+        create_decompressor = zlib.decompressobj
+
+        def decompressobj(*args):
+            decompressors.append(create_decompressor(*args))
+            return decompressors[-1]
+
+        compressed = gzip.compress(b'\0' * 10 * 1024 * 1024)
+        with mock.patch.object(api, 'REST_API_MAX_OUTPUT_SIZE', 1024 * 1024), \
+                mock.patch.object(api.zlib, 'decompressobj', decompressobj):
+            response = self.stream([compressed], {'Content-Encoding': 'gzip'})
+        self.assertEqual(response.code, 413)
+        self.plugin_controller.onCommandFinished.assert_not_called()
+        # it stopped decompressing once the output was too big
+        self.assertTrue(decompressors[0].unconsumed_tail)
+
+    def test_other_routes_are_served_by_flask(self):
+        self.plugin_controller.processCommandInput.return_value = (None, None)
+        cmd = base64.b64encode(b'ls').decode()
+        response = self.fetch('/cmd/input', method='POST',
+                              body='{{"pid": 1, "cmd": "{0}", "pwd": "{0}"}}'.format(cmd),
+                              headers={'Content-Type': 'application/json'})
+        self.assertEqual(response.code, 200)
+        self.assertIn(b'no plugin available', response.body)
+
+
+class HeavyRequestsTest(AsyncHTTPTestCase):
+
+    def get_app(self):
+        self.release = threading.Event()
+        self.running = threading.Semaphore(0)
+        self.plugin_controller = mock.Mock()
+        self.plugin_controller.onCommandFinished.side_effect = self.on_command_finished
+        self.plugin_controller.processCommandInput.return_value = ('nmap', 'nmap -oX x')
+        # one thread for the quick requests, the heavy ones can't take it
+        self.executor = ThreadPoolExecutor(1)
+        self.heavy_executor = ThreadPoolExecutor(api.REST_API_HEAVY_REQUESTS)
+        controllers = [api.PluginControllerAPI(self.plugin_controller)]
+        wsgi_app = api._create_app(controllers)
+        return api._create_tornado_app(wsgi_app, self.plugin_controller, self.executor,
+                                       self.heavy_executor, api._heavy_paths(controllers))
+
+    def tearDown(self):
+        self.release.set()
+        super().tearDown()
+        self.executor.shutdown()
+        self.heavy_executor.shutdown()
+
+    def on_command_finished(self, pid, exit_code, output):
+        self.running.release()
+        self.release.wait(5)
+        return True
+
+    def post(self, path, data):
+        return self.http_client.fetch(self.get_url(path), method='POST', body=json.dumps(data),
+                                      headers={'Content-Type': 'application/json'})
+
+    @gen_test
+    async def test_heavy_requests_dont_take_the_workers_of_the_rest(self):
+        output = base64.b64encode(b'output').decode()
+        outputs = [self.post('/cmd/output', {'pid': pid, 'exit_code': 0, 'output': output})
+                   for pid in range(api.REST_API_HEAVY_REQUESTS + 1)]
+        loop = IOLoop.current()
+        for _ in range(api.REST_API_HEAVY_REQUESTS):
+            self.assertTrue(await loop.run_in_executor(None, self.running.acquire, True, 5))
+        self.assertFalse(await loop.run_in_executor(None, self.running.acquire, True, 0.2))
+        cmd = base64.b64encode(b'nmap').decode()
+        response = await self.post('/cmd/input', {'pid': 10, 'pwd': cmd, 'cmd': cmd})
+        self.assertEqual(response.code, 200)
+        self.release.set()
+        responses = await gen.multi(outputs)
+        self.assertEqual([response.code for response in responses], [200] * len(outputs))
+
+    @gen_test
+    async def test_streamed_outputs_dont_take_the_workers_of_the_rest(self):
+        outputs = [self.http_client.fetch(
+            self.get_url('/cmd/output/stream?pid={0}&exit_code=0'.format(pid)),
+            method='POST', body=b'output') for pid in range(api.REST_API_HEAVY_REQUESTS)]
+        loop = IOLoop.current()
+        for _ in range(api.REST_API_HEAVY_REQUESTS):
+            self.assertTrue(await loop.run_in_executor(None, self.running.acquire, True, 5))
+        cmd = base64.b64encode(b'nmap').decode()
+        response = await self.post('/cmd/input', {'pid': 10, 'pwd': cmd, 'cmd': cmd})
+        self.assertEqual(response.code, 200)
+        self.release.set()
+        responses = await gen.multi(outputs)
+        self.assertEqual([response.code for response in responses], [200] * len(outputs))
+
+
+# I'm Py3
@@ -0,0 +1,127 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import os
+import sys
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.getcwd()))
+from faraday_client.persistence.server import server
+from faraday_client.persistence.server import transport
+
+server.FARADAY_UP = False
+
+
+class CountingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accepted_connections = 0
+        self.received_cookies = []
+
+    def get_request(self):
+        request = super().get_request()
+        self.accepted_connections += 1
+        return request
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _answer(self, status=200, body=None, headers=None):
+        payload = json.dumps(body or {}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        self.server.received_cookies.append(self.headers.get('Cookie'))
+        if self.path.startswith('/_api/v3/info'):
+            self._answer(body={'Faraday Server': 'Running'})
+        elif self.path.startswith('/_api/session'):
+            if 'faraday_session_2=secret' in (self.headers.get('Cookie') or ''):
+                self._answer(body={'username': 'faraday'})
+            else:
+                self._answer(status=401)
+        else:
+            self._answer(body={'ok': True})
+
+    def do_POST(self):
+        self._read_body()
+        if self.path.startswith('/_api/login'):
+            self._answer(headers={'Set-Cookie': 'faraday_session_2=secret; Path=/'})
+        else:
+            self._answer(status=201, body={'id': 1})
+
+    def do_PUT(self):
+        self._read_body()
+        self._answer(body={'id': 1})
+
+
+class ServerTransportTest(unittest.TestCase):
+
+    def setUp(self):
+        transport.reset_transport()
+        self.http_server = CountingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.url = 'http://127.0.0.1:{0}'.format(self.http_server.server_address[1])
+        self.server_thread = threading.Thread(target=self.http_server.serve_forever)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+
+    def tearDown(self):
+        transport.reset_transport()
+        self.http_server.shutdown()
+        self.http_server.server_close()
+
+    def test_transport_is_shared(self):
+        self.assertIs(transport.get_transport(), transport.get_transport())
+
+    def test_requests_reuse_the_same_connection(self):
+        for _ in range(20):
+            server._get(self.url + '/_api/v3/ws/a_ws/hosts')
+        server._put(self.url + '/_api/v3/ws/a_ws/hosts/1', expected_response=200, ip='127.0.0.1')
+        server._post(self.url + '/_api/v3/ws/a_ws/hosts', ip='127.0.0.1')
+        self.assertTrue(server.check_server_url(self.url))
+        self.assertEqual(self.http_server.accepted_connections, 1)
+
+    def test_only_the_given_cookies_are_sent(self):
+        cookies = server.login_user(self.url, 'faraday', 'password')
+        self.assertEqual(cookies.get('faraday_session_2'), 'secret')
+        self.assertFalse(server.is_authenticated(self.url, {}))
+        self.assertIsNone(self.http_server.received_cookies[-1])
+        self.assertTrue(server.is_authenticated(self.url, cookies))
+        self.assertIn('faraday_session_2=secret', self.http_server.received_cookies[-1])
+        self.assertEqual(self.http_server.accepted_connections, 1)
+
+    def test_pool_size_limits_connections_per_host(self):
+        transport._transport = transport.ServerTransport(pool_maxsize=2, pool_block=True)
+        threads = [threading.Thread(target=server._get, args=(self.url + '/_api/v3/ws',))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLessEqual(self.http_server.accepted_connections, 2)
+
+
+# I'm Py3
@@ -0,0 +1,112 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+'''
+from __future__ import absolute_import
+
+import time
+import threading
+import unittest
+from unittest import mock
+
+from faraday_client.persistence.server import server, workspace_stats
+from faraday_client.persistence.server.workspace_stats import WorkspaceStats
+from tests.fake_faraday_server import FakeFaradayServer
+
+
+def summary():
+    return {'hosts': 2, 'services': 3, 'interfaces': 0, 'total_vulns': 5,
+            'std_vulns': 4, 'web_vulns': 1, 'notes': 0}
+
+
+class WorkspaceStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fetch = mock.Mock(side_effect=lambda workspace_name: summary())
+        self.stats = WorkspaceStats('a_ws', fetch=self.fetch)
+        self.stats.follow()
+
+    def test_the_summary_is_fetched_once(self):
+        for _ in range(5):
+            self.assertEqual(self.stats.get(), summary())
+        self.fetch.assert_called_once_with('a_ws')
+
+    def test_concurrent_callers_share_one_fetch(self):
+        def slow_fetch(workspace_name):
+            time.sleep(0.1)
+            return summary()
+        self.fetch.side_effect = slow_fetch
+        threads = [threading.Thread(target=self.stats.get) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_stale_summaries_are_fetched_again(self):
+        self.stats.get()
+        self.stats.follow(False)
+        self.stats.get()
+        with mock.patch.object(workspace_stats.time, 'time', return_value=time.time() + 10):
+            self.stats.get()
+        self.assertEqual(self.fetch.call_count, 3)
+
+    def test_created_and_deleted_objects_change_the_counters(self):
+        self.stats.get()
+        for change in ({'action': 'CREATE', 'type': 'Host', 'id': 9},
+                       {'action': 'CREATE', 'type': 'VulnerabilityWeb', 'id': 10},
+                       {'action': 'DELETE', 'type': 'Vulnerability', 'id': 1},
+                       {'action': 'UPDATE', 'type': 'Service', 'id': 2}):
+            self.stats.apply_change(change)
+        self.assertEqual(self.stats.get(), dict(summary(), hosts=3, total_vulns=5, std_vulns=3,
+                                                web_vulns=2))
+        self.fetch.assert_called_once_with('a_ws')
+
+    def test_deleted_hosts_need_a_new_summary(self):
+        self.stats.get()
+        self.stats.apply_change({'action': 'DELETE', 'type': 'Host', 'id': 1})
+        self.stats.get()
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_summaries_fetched_while_the_workspace_changed_are_not_kept(self):
+        def fetch_while_created(workspace_name):
+            self.stats.apply_change({'action': 'CREATE', 'type': 'Host', 'id': 9})
+            return summary()
+        self.fetch.side_effect = fetch_while_created
+        self.assertEqual(self.stats.get(), summary())
+        self.fetch.side_effect = lambda workspace_name: dict(summary(), hosts=3)
+        self.assertEqual(self.stats.get()['hosts'], 3)
+        self.assertEqual(self.stats.get()['hosts'], 3)
+        self.assertEqual(self.fetch.call_count, 2)
+
+
+class WorkspaceSummaryTest(unittest.TestCase):
+
+    def setUp(self):
+        workspace_stats.discard_workspace_stats()
+        self.addCleanup(workspace_stats.discard_workspace_stats)
+
+    def test_the_counts_are_taken_from_one_request(self):
+        with FakeFaradayServer(hosts=4, services_per_host=2, vulns_per_service=1,
+                               vulns_per_host=0) as fake:
+            workspace_stats.get_workspace_stats(fake.workspace_name).follow()
+            self.assertEqual(server.get_workspace_numbers(fake.workspace_name), (4, 8, 8))
+            self.assertEqual(server.get_hosts_number(fake.workspace_name), 4)
+            self.assertEqual(server.get_services_number(fake.workspace_name), 8)
+            self.assertEqual(server.get_interfaces_number(fake.workspace_name), 0)
+            self.assertEqual(server.get_vulns_number(fake.workspace_name), 8)
+            self.assertEqual(fake.requests['GET workspace'], 1)
+
+    def test_local_changes_fetch_the_summary_again(self):
+        with FakeFaradayServer(hosts=4, services_per_host=2, vulns_per_service=1,
+                               vulns_per_host=0) as fake:
+            workspace_stats.get_workspace_stats(fake.workspace_name).follow()
+            self.assertEqual(server.get_hosts_number(fake.workspace_name), 4)
+            server.create_host(fake.workspace_name, None, '10.0.0.100', 'linux')
+            self.assertEqual(server.get_hosts_number(fake.workspace_name), 5)
+            self.assertEqual(fake.requests['GET workspace'], 2)
+
+
+# I'm Py3
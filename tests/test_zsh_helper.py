@@ -0,0 +1,178 @@
+'''
+Faraday Penetration Test IDE
+Copyright (C) 2020  Infobyte LLC (http://www.infobytesec.com/)
+See the file 'doc/LICENSE' for the license information
+
+Tests of the zsh helper and a benchmark of the latency it adds to every
+prompt. Run it directly to print it:
+
+    python -m tests.test_zsh_helper [prompts]
+'''
+from __future__ import absolute_import
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import threading
+import subprocess
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.testing import bind_unused_port
+
+from faraday_client.apis.rest import api
+from faraday_client.zsh import plugin_controller_client
+from faraday_client.zsh.plugin_controller_client import ZshHelper, escape
+
+CONFIG = '<faraday><last_workspace>{0}</last_workspace></faraday>'
+
+
+def write_config(path, workspace):
+    with open(path, 'w') as config:
+        config.write(CONFIG.format(workspace))
+
+
+def prompt_latency(prompts=100):
+    """Return the mean seconds the helper and the old grep pipeline take
+    to answer the workspace of a prompt."""
+    path = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(path, '.faraday', 'config'))
+        config_path = os.path.join(path, '.faraday', 'config', 'user.xml')
+        write_config(config_path, 'a_ws')
+        # started the way faraday.zsh does it, once per shell
+        helper = subprocess.Popen(
+            [sys.executable, plugin_controller_client.__file__],
+            env=dict(os.environ, HOME=path), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            universal_newlines=True, bufsize=1)
+        helper.stdin.write('0\tstatus\n')
+        helper.stdin.flush()
+        helper.stdout.readline()
+        start = time.perf_counter()
+        for request_id in range(prompts):
+            helper.stdin.write('{0}\tworkspace\n'.format(request_id))
+            helper.stdin.flush()
+            helper.stdout.readline()
+        helper_latency = (time.perf_counter() - start) / prompts
+        helper.stdin.close()
+        helper.wait()
+        start = time.perf_counter()
+        for _ in range(prompts):
+            subprocess.check_output("cat {0} | grep '<last_workspace' | cut -d '>' -f 2 | "
+                                    "cut -d '<' -f 1".format(config_path), shell=True)
+        grep_latency = (time.perf_counter() - start) / prompts
+    finally:
+        shutil.rmtree(path)
+    return helper_latency, grep_latency
+
+
+class ZshHelperTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.path, 'user.xml')
+        write_config(self.config_path, 'a_ws')
+        self.outputs = []
+        self.plugin_controller = mock.Mock()
+        self.plugin_controller.processCommandInput.return_value = ('nmap', 'nmap -oX /tmp/x\t-v')
+        self.plugin_controller.onCommandFinished.side_effect = self.on_command_finished
+        sock, port = bind_unused_port()
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            self.executor = ThreadPoolExecutor(2)
+            wsgi_app = api._create_app([api.PluginControllerAPI(self.plugin_controller),
+                                        api.ModelControllerAPI(mock.Mock())])
+            self.server = HTTPServer(api._create_tornado_app(wsgi_app, self.plugin_controller, self.executor))
+            self.server.add_sockets([sock])
+            self.loop = IOLoop.current()
+            started.set()
+            self.loop.start()
+        self.thread = threading.Thread(target=serve, daemon=True)
+        self.thread.start()
+        started.wait(5)
+        self.helper = ZshHelper('127.0.0.1', port, self.config_path)
+
+    def tearDown(self):
+        self.loop.add_callback(self.loop.stop)
+        self.thread.join(5)
+        self.executor.shutdown()
+        shutil.rmtree(self.path)
+
+    def on_command_finished(self, pid, exit_code, output):
+        with output:
+            self.outputs.append((pid, exit_code, output.read()))
+        return True
+
+    def test_commands_and_outputs_are_sent(self):
+        cmd = 'nmap 10.0.0.1\nping'
+        answer = self.helper.handle('1\tinput\t42\t/root\t{0}\n'.format(escape(cmd)))
+        self.assertEqual(answer.split('\t'), ['1', 'ok', 'nmap', 'nmap -oX /tmp/x\\t-v'])
+        self.plugin_controller.processCommandInput.assert_called_once_with(42, cmd, '/root')
+        output = os.path.join(self.path, 'output')
+        with open(output, 'wb') as output_file:
+            output_file.write(b'Nmap scan report\n' * 1000)
+        self.assertEqual(self.helper.handle('2\toutput\t42\t0\t{0}'.format(output)), '2\tok')
+        self.helper._outputs.join()
+        self.assertEqual(self.outputs, [(42, 0, b'Nmap scan report\n' * 1000)])
+        self.assertFalse(os.path.exists(output))
+
+    def test_commands_are_answered_while_an_output_is_sent(self):
+        uploading = threading.Event()
+        upload_done = threading.Event()
+
+        def slow_upload(pid, exit_code, output):
+            uploading.set()
+            upload_done.wait(10)
+            return self.on_command_finished(pid, exit_code, output)
+
+        self.plugin_controller.onCommandFinished.side_effect = slow_upload
+        output = os.path.join(self.path, 'output')
+        with open(output, 'wb') as output_file:
+            output_file.write(b'PING\n')
+        self.helper.handle('1\toutput\t42\t0\t{0}'.format(output))
+        self.assertTrue(uploading.wait(5))
+        start = time.perf_counter()
+        answer = self.helper.handle('2\tinput\t42\t/root\tnmap')
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(answer.split('\t')[:2], ['2', 'ok'])
+        upload_done.set()
+        self.helper._outputs.join()
+        self.assertEqual(self.outputs, [(42, 0, b'PING\n')])
+
+    def test_workspace_is_read_when_the_config_changes(self):
+        self.assertEqual(self.helper.handle('1\tworkspace'), '1\ta_ws')
+        with mock.patch.object(plugin_controller_client, 'open') as open_config:
+            self.assertEqual(self.helper.handle('2\tworkspace'), '2\ta_ws')
+        open_config.assert_not_called()
+        write_config(self.config_path, 'another_ws_with_a_longer_name')
+        self.assertEqual(self.helper.handle('3\tworkspace'), '3\tanother_ws_with_a_longer_name')
+
+    def test_failed_requests_are_answered(self):
+        self.assertEqual(self.helper.handle('1\tstatus'), '1\t200')
+        self.assertEqual(self.helper.handle('2\tunknown'), '2\terror')
+        self.assertEqual(self.helper.handle('3\tinput\tnot_a_pid\t/\tls'), '3\terror')
+
+    def test_prompt_latency(self):
+        helper_latency, grep_latency = prompt_latency(20)
+        sys.stderr.write('\nzsh prompt latency: helper {0:.2f}ms, grep pipeline {1:.2f}ms\n'.format(
+            helper_latency * 1000, grep_latency * 1000))
+        # a few ms are starting a process, the helper answers in microseconds
+        self.assertLess(helper_latency, 0.05)
+
+
+if __name__ == '__main__':
+    prompts = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    helper_latency, grep_latency = prompt_latency(prompts)
+    print('Latency added to every prompt: helper {0:.2f}ms, grep pipeline {1:.2f}ms'.format(
+        helper_latency * 1000, grep_latency * 1000))
+
+
+# I'm Py3